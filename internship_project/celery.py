@@ -1,8 +1,16 @@
+import json
+import logging
 import os
+import resource
+import time
+from collections import defaultdict
+
 from celery import Celery
-from django.conf import settings
+from celery.signals import before_task_publish, task_prerun, task_postrun
 
 # Set the default Django settings module for the 'celery' program.
+# This module is imported by every Django process (see __init__.py), so the
+# default stays the full settings; workers select settings_worker explicitly.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'internship_project.settings')
 
 app = Celery('internship_project')
@@ -17,3 +25,125 @@ app.autodiscover_tasks()
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
+
+
+# Task instrumentation: queue latency, runtime, DB queries and memory per task.
+# Tasks slower than TASK_SLOW_THRESHOLD_SECONDS are appended to TASK_SLOW_LOG_PATH
+# as JSON lines (see the slow_tasks management command).
+
+metrics_logger = logging.getLogger('internship_project.task_metrics')
+_running = {}
+
+
+class QueryRecorder:
+    """Django execute wrapper that counts queries and their time per SQL statement"""
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.by_sql = defaultdict(lambda: [0, 0.0])
+    
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.total += elapsed
+            stats = self.by_sql[sql]
+            stats[0] += 1
+            stats[1] += elapsed
+    
+    def top(self, limit=5):
+        ranked = sorted(self.by_sql.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [
+            {'sql': sql[:500], 'count': count, 'total_ms': round(total * 1000, 2)}
+            for sql, (count, total) in ranked
+        ]
+
+
+@before_task_publish.connect
+def stamp_publish_time(headers=None, **kwargs):
+    if headers is not None:
+        headers['published_at'] = time.time()
+
+
+def _current_rss_kb():
+    """Resident set size right now in KB (Linux /proc), or None where unavailable"""
+    try:
+        with open('/proc/self/statm', 'rb') as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * resource.getpagesize() // 1024
+
+
+def _published_at(request):
+    published_at = getattr(request, 'published_at', None)
+    if published_at is None:
+        published_at = (getattr(request, 'headers', None) or {}).get('published_at')
+    return published_at
+
+
+@task_prerun.connect
+def start_task_metrics(task_id=None, task=None, **kwargs):
+    from django.db import connections
+    
+    recorder = QueryRecorder()
+    for connection in connections.all():
+        connection.execute_wrappers.append(recorder)
+    
+    published_at = _published_at(task.request)
+    _running[task_id] = {
+        'recorder': recorder,
+        'started': time.perf_counter(),
+        'queue_latency': time.time() - published_at if published_at else None,
+        'rss': _current_rss_kb(),
+        'maxrss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+@task_postrun.connect
+def finish_task_metrics(task_id=None, task=None, state=None, **kwargs):
+    from django.conf import settings
+    from django.db import connections
+    
+    metrics = _running.pop(task_id, None)
+    if metrics is None:
+        return
+    recorder = metrics['recorder']
+    for connection in connections.all():
+        if recorder in connection.execute_wrappers:
+            connection.execute_wrappers.remove(recorder)
+    
+    runtime = time.perf_counter() - metrics['started']
+    rss = _current_rss_kb()
+    record = {
+        'ts': time.time(),
+        'task': task.name,
+        'task_id': task_id,
+        'state': state,
+        'runtime_ms': round(runtime * 1000, 2),
+        'queue_latency_ms': round(metrics['queue_latency'] * 1000, 2) if metrics['queue_latency'] is not None else None,
+        'db_queries': recorder.count,
+        'db_time_ms': round(recorder.total * 1000, 2),
+        # Memory the task left behind (can be negative); None off Linux
+        'rss_delta_kb': rss - metrics['rss'] if rss is not None and metrics['rss'] is not None else None,
+        # ru_maxrss is the process's all-time peak RSS in KB (Linux): this is only non-zero
+        # when the task pushed the worker past its previous peak
+        'maxrss_delta_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - metrics['maxrss'],
+    }
+    metrics_logger.info(
+        f"{record['task']} {record['state']} in {record['runtime_ms']}ms "
+        f"(queued {record['queue_latency_ms']}ms, {record['db_queries']} queries / {record['db_time_ms']}ms)"
+    )
+    
+    if runtime >= settings.TASK_SLOW_THRESHOLD_SECONDS:
+        record['top_queries'] = recorder.top()
+        try:
+            os.makedirs(os.path.dirname(settings.TASK_SLOW_LOG_PATH), exist_ok=True)
+            with open(settings.TASK_SLOW_LOG_PATH, 'a', encoding='utf-8') as log_file:
+                log_file.write(json.dumps(record) + '\n')
+        except OSError as e:
+            metrics_logger.warning(f"Could not write slow task log: {str(e)}")
@@ -58,6 +58,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'main_app.db_router.ReplicaPinMiddleware',
+    'main_app.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'internship_project.urls'
@@ -95,6 +97,21 @@ DATABASES = {
     }
 }
 
+# Optional streaming replica used by analytics, reports and exports (main_app/db_router.py)
+if env.str('POSTGRES_REPLICA_HOST', default=''):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': env.str('POSTGRES_REPLICA_DB', default=DATABASES['default']['NAME']),
+        'HOST': env.str('POSTGRES_REPLICA_HOST'),
+        'PORT': env.str('POSTGRES_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['main_app.db_router.ReplicaRouter']
+REPLICA_MAX_LAG_SECONDS = env.float('REPLICA_MAX_LAG_SECONDS', default=10.0)
+REPLICA_LAG_CHECK_INTERVAL = env.float('REPLICA_LAG_CHECK_INTERVAL', default=5.0)
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=15)
+
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -104,6 +121,30 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'main_app.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'main_app.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Redis sliding-window throttles (main_app/throttling.py); views may add endpoint scopes
+    'DEFAULT_THROTTLE_CLASSES': [
+        'main_app.throttling.AnonIPThrottle',
+        'main_app.throttling.UserThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': env.str('THROTTLE_RATE_ANON', default='60/min'),
+        'user': env.str('THROTTLE_RATE_USER', default='600/min'),
+        'public': env.str('THROTTLE_RATE_PUBLIC', default='120/min'),
+        'register': env.str('THROTTLE_RATE_REGISTER', default='10/hour'),
+        'login': env.str('THROTTLE_RATE_LOGIN', default='20/min'),
+        'login_username': env.str('THROTTLE_RATE_LOGIN_USERNAME', default='5/min'),
+    },
+    # Number of trusted reverse proxies in front of Django; 0 keys throttles on REMOTE_ADDR and ignores X-Forwarded-For
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=0),
 }
 
 from datetime import timedelta
@@ -113,14 +154,91 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
 }
 
-CELERY_BROKER_URL = env.str('REDIS_URL', default='redis://localhost:6379/0')
-CELERY_RESULT_BACKEND = env.str('REDIS_URL', default='redis://localhost:6379/0')
+REDIS_URL = env.str('REDIS_URL', default='redis://localhost:6379/0')
+# Seconds before a Redis command or connection attempt gives up (main_app.redis_client),
+# so an unreachable Redis fails fast instead of hanging the bot or a request
+REDIS_SOCKET_TIMEOUT = env.float('REDIS_SOCKET_TIMEOUT', default=5.0)
+REDIS_CONNECT_TIMEOUT = env.float('REDIS_CONNECT_TIMEOUT', default=2.0)
+
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 
-TELEGRAM_BOT_TOKEN = env.str('TELEGRAM_BOT_TOKEN')
+# Tasks running longer than this are written to the slow task log with their top SQL
+TASK_SLOW_THRESHOLD_SECONDS = env.float('TASK_SLOW_THRESHOLD_SECONDS', default=5.0)
+TASK_SLOW_LOG_PATH = env.str('TASK_SLOW_LOG_PATH', default=str(BASE_DIR / 'logs' / 'slow_tasks.jsonl'))
+
+# Optional here so processes that never talk to Telegram can start without it
+TELEGRAM_BOT_TOKEN = env.str('TELEGRAM_BOT_TOKEN', default='')
+# Override to point the bot and task sender at a local fake Bot API server
+TELEGRAM_API_BASE_URL = env.str('TELEGRAM_API_BASE_URL', default='https://api.telegram.org')
+
+# Multi-bot runtime (run_telegram_bot --multi): how often BotConfig rows are re-read,
+# and the connection pool shared by all hosted bots for Bot API calls
+BOT_RELOAD_SECONDS = env.int('BOT_RELOAD_SECONDS', default=30)
+TELEGRAM_BOT_POOL_SIZE = env.int('TELEGRAM_BOT_POOL_SIZE', default=64)
+
+# Receive updates through a webhook instead of long polling when set
+TELEGRAM_WEBHOOK_URL = env.str('TELEGRAM_WEBHOOK_URL', default='')
+TELEGRAM_WEBHOOK_LISTEN = env.str('TELEGRAM_WEBHOOK_LISTEN', default='0.0.0.0')
+TELEGRAM_WEBHOOK_PORT = env.int('TELEGRAM_WEBHOOK_PORT', default=8443)
+TELEGRAM_WEBHOOK_PATH = env.str('TELEGRAM_WEBHOOK_PATH', default='telegram')
+TELEGRAM_WEBHOOK_SECRET = env.str('TELEGRAM_WEBHOOK_SECRET', default='')
+
+# Outbound sender used by Celery tasks (rate is shared across all workers)
+TELEGRAM_SEND_RATE = env.float('TELEGRAM_SEND_RATE', default=25.0)
+TELEGRAM_SEND_BURST = env.int('TELEGRAM_SEND_BURST', default=30)
+TELEGRAM_SEND_POOL_SIZE = env.int('TELEGRAM_SEND_POOL_SIZE', default=20)
+TELEGRAM_SEND_MAX_RETRIES = env.int('TELEGRAM_SEND_MAX_RETRIES', default=4)
+TELEGRAM_BROADCAST_BATCH_SIZE = env.int('TELEGRAM_BROADCAST_BATCH_SIZE', default=500)
+# Scheduled broadcasts: how often due deliveries are sent, and at most how many batches per run
+BROADCAST_DISPATCH_SECONDS = env.int('BROADCAST_DISPATCH_SECONDS', default=10)
+BROADCAST_DISPATCH_MAX_BATCHES = env.int('BROADCAST_DISPATCH_MAX_BATCHES', default=10)
+
+# Active user HyperLogLog sketches (one per day)
+ACTIVE_USERS_RETENTION_DAYS = env.int('ACTIVE_USERS_RETENTION_DAYS', default=400)
+# Also keep exact per-day Redis sets so sketch error can be validated
+ACTIVE_USERS_EXACT_TRACKING = env.bool('ACTIVE_USERS_EXACT_TRACKING', default=False)
+
+# In-process TelegramUser cache used by the bot
+TELEGRAM_USER_CACHE_SIZE = env.int('TELEGRAM_USER_CACHE_SIZE', default=10000)
+TELEGRAM_USER_CACHE_TTL = env.int('TELEGRAM_USER_CACHE_TTL', default=300)
+
+# Bot interactions are buffered in the bot process and written in batches
+INTERACTION_LOG_BATCH_SIZE = env.int('INTERACTION_LOG_BATCH_SIZE', default=500)
+INTERACTION_LOG_FLUSH_SECONDS = env.float('INTERACTION_LOG_FLUSH_SECONDS', default=2.0)
+
+# Celery tasks started from the bot go through an in-memory outbox so the event loop never waits on the broker
+TASK_OUTBOX_SIZE = env.int('TASK_OUTBOX_SIZE', default=10000)
+TASK_OUTBOX_BATCH_SIZE = env.int('TASK_OUTBOX_BATCH_SIZE', default=100)
+TASK_OUTBOX_MAX_AGE = env.int('TASK_OUTBOX_MAX_AGE', default=300)
+TASK_OUTBOX_SHUTDOWN_TIMEOUT = env.float('TASK_OUTBOX_SHUTDOWN_TIMEOUT', default=5.0)
+# Updates whose update_id was already processed (by this or another bot replica) are dropped
+UPDATE_DEDUP_ENABLED = env.bool('UPDATE_DEDUP_ENABLED', default=True)
+UPDATE_DEDUP_LOCAL_SIZE = env.int('UPDATE_DEDUP_LOCAL_SIZE', default=10000)
+UPDATE_DEDUP_TTL = env.int('UPDATE_DEDUP_TTL', default=86400)
+# Event loop stalls longer than this are logged by the bot
+LOOP_LAG_WARN_MS = env.int('LOOP_LAG_WARN_MS', default=100)
+
+# On-demand sampling profiler (main_app.profiling); switched on from the admin or with SIGUSR2
+PROFILING_ENABLED = env.bool('PROFILING_ENABLED', default=True)
+PROFILING_DIR = Path(env.str('PROFILING_DIR', default=str(BASE_DIR / 'profiles')))
+PROFILING_INTERVAL_MS = env.float('PROFILING_INTERVAL_MS', default=5.0)
+PROFILING_POLL_SECONDS = env.float('PROFILING_POLL_SECONDS', default=5.0)
+PROFILING_SIGNAL_SAMPLE_RATE = env.float('PROFILING_SIGNAL_SAMPLE_RATE', default=1.0)
+PROFILING_SIGNAL_SECONDS = env.int('PROFILING_SIGNAL_SECONDS', default=60)
+
+# Interactions older than this are moved out of PostgreSQL by cleanup_old_interactions
+INTERACTION_RETENTION_DAYS = env.int('INTERACTION_RETENTION_DAYS', default=30)
+# Archive them to ARCHIVE_ROOT first instead of discarding them
+ARCHIVE_INTERACTIONS = env.bool('ARCHIVE_INTERACTIONS', default=True)
+ARCHIVE_ROOT = Path(env.str('ARCHIVE_ROOT', default=str(BASE_DIR / 'archive')))
+
+# Directory where DataExport chunk files are written
+EXPORT_ROOT = Path(env.str('EXPORT_ROOT', default=str(BASE_DIR / 'exports')))
 # TELEGRAM_CHAT_ID = env.str('TELEGRAM_CHAT_ID')
 
 
@@ -170,9 +288,13 @@ EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
-EMAIL_HOST_USER = env.str('EMAIL_HOST_USER')
-EMAIL_HOST_PASSWORD = env.str('EMAIL_HOST_PASSWORD')
-DEFAULT_FROM_EMAIL = env.str('EMAIL_HOST_USER')
+EMAIL_HOST_USER = env.str('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = env.str('EMAIL_HOST_PASSWORD', default='')
+DEFAULT_FROM_EMAIL = env.str('DEFAULT_FROM_EMAIL', default=EMAIL_HOST_USER)
+# Welcome emails for bulk-created users are sent in batches over one SMTP connection
+WELCOME_EMAIL_BATCH_SIZE = env.int('WELCOME_EMAIL_BATCH_SIZE', default=100)
+# Largest batch accepted by POST /api/register/bulk/ (use bulk_register_users for more)
+BULK_REGISTER_MAX_USERS = env.int('BULK_REGISTER_MAX_USERS', default=1000)
 
 from celery.schedules import crontab
 
@@ -182,6 +304,14 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'main_app.tasks.generate_daily_report',
         'schedule': crontab(hour=9, minute=0),  # 9 AM daily
     },
+    'flush-last-seen': {
+        'task': 'main_app.tasks.flush_last_seen',
+        'schedule': env.int('LAST_SEEN_FLUSH_SECONDS', default=60),
+    },
+    'dispatch-broadcasts': {
+        'task': 'main_app.tasks.dispatch_broadcasts',
+        'schedule': BROADCAST_DISPATCH_SECONDS,
+    },
     'cleanup-old-interactions': {
         'task': 'main_app.tasks.cleanup_old_interactions',
         'schedule': crontab(hour=2, minute=0, day_of_week=1),  # Monday 2 AM
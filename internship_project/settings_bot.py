@@ -0,0 +1,22 @@
+"""
+Lean settings for the Telegram bot process.
+
+The bot only needs the ORM, auth models and Celery publishing, so the
+admin, sessions, messages, static files and DRF apps are left out to
+keep startup fast. Use with:
+
+    python manage.py run_telegram_bot --settings=internship_project.settings_bot
+"""
+
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'main_app',
+]
+
+MIDDLEWARE = []
+
+# The bot never sends email
+EMAIL_BACKEND = 'django.core.mail.backends.dummy.EmailBackend'
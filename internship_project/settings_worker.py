@@ -0,0 +1,18 @@
+"""
+Lean settings for Celery workers and beat.
+
+Workers need the ORM, auth models and email, but not the admin or DRF.
+Select it in the worker's environment:
+
+    DJANGO_SETTINGS_MODULE=internship_project.settings_worker celery -A internship_project worker
+"""
+
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'main_app',
+]
+
+MIDDLEWARE = []
@@ -0,0 +1,153 @@
+"""
+Account creation outside the single-user registration endpoint.
+
+bulk_register_users() creates many API users at once. Rows are
+validated in memory, and usernames are checked against the database
+with one query per batch. Passwords are hashed on a thread pool
+(PBKDF2, Argon2 and bcrypt release the GIL while hashing, so this uses
+every core). Users and their profiles are then inserted with
+bulk_create in one transaction per batch. Welcome emails are queued
+only after the transaction commits, a few send_welcome_emails tasks per
+batch instead of one task per user.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_FIELDS = ('username', 'email', 'password', 'first_name', 'last_name')
+NAME_MAX_LENGTH = 150
+EMAIL_MAX_LENGTH = User._meta.get_field('email').max_length
+
+
+def enqueue_welcome_emails(user_ids):
+    """Publish send_welcome_emails tasks for the users, over one broker connection"""
+    from celery import current_app
+    from .tasks import send_welcome_emails
+
+    batch_size = settings.WELCOME_EMAIL_BATCH_SIZE
+    with current_app.producer_or_acquire() as producer:
+        for start in range(0, len(user_ids), batch_size):
+            send_welcome_emails.apply_async((user_ids[start:start + batch_size],), producer=producer)
+
+
+def _validate(row):
+    for field in ACCOUNT_FIELDS:
+        if row.get(field) is not None and not isinstance(row[field], str):
+            return f"{field} must be a string"
+    username = (row.get('username') or '').strip()
+    if not username:
+        return 'username is required'
+    if len(username) > NAME_MAX_LENGTH:
+        return f"username is longer than {NAME_MAX_LENGTH} characters"
+    try:
+        User.username_validator(username)
+    except ValidationError:
+        return 'username may only contain letters, digits and @/./+/-/_'
+    if not row.get('password'):
+        return 'password is required'
+    if row.get('email'):
+        if len(row['email']) > EMAIL_MAX_LENGTH:
+            return f"email is longer than {EMAIL_MAX_LENGTH} characters"
+        try:
+            validate_email(row['email'])
+        except ValidationError:
+            return 'email is not valid'
+    for field in ('first_name', 'last_name'):
+        if len(row.get(field) or '') > NAME_MAX_LENGTH:
+            return f"{field} is longer than {NAME_MAX_LENGTH} characters"
+    return None
+
+
+def _register_batch(batch, hasher_pool, send_emails):
+    """Create one batch of validated rows; returns the created users"""
+    passwords = list(hasher_pool.map(make_password, [row['password'] for _, row in batch]))
+    users = [
+        User(
+            username=row['username'].strip(),
+            email=User.objects.normalize_email(row.get('email') or ''),
+            first_name=row.get('first_name') or '',
+            last_name=row.get('last_name') or '',
+            password=password,
+        )
+        for (_, row), password in zip(batch, passwords)
+    ]
+    with transaction.atomic():
+        # PostgreSQL returns the new ids, which the profiles and emails need
+        User.objects.bulk_create(users)
+        UserProfile.objects.bulk_create([UserProfile(user=user) for user in users])
+        if send_emails:
+            transaction.on_commit(partial(enqueue_welcome_emails, [user.id for user in users if user.email]), robust=True)
+    return users
+
+
+def bulk_register_users(rows, batch_size=1000, workers=None, send_emails=True):
+    """
+    Create users from an iterable of dicts with ACCOUNT_FIELDS keys.
+
+    Invalid rows and usernames that already exist are skipped and listed
+    in result['errors'] as {'row', 'username', 'reason'}. Returns counts,
+    the created usernames and the errors. A batch that hits a username
+    created concurrently by someone else is checked and inserted once more.
+    """
+    result = {'rows': 0, 'created': 0, 'rejected': 0, 'usernames': [], 'errors': []}
+    seen = set()
+
+    def reject(row_no, row, reason):
+        result['rejected'] += 1
+        result['errors'].append({'row': row_no, 'username': row.get('username') or '', 'reason': reason})
+
+    def flush(batch, retry=True):
+        existing = set(
+            User.objects.filter(username__in=[row['username'].strip() for _, row in batch])
+            .values_list('username', flat=True)
+        )
+        valid = []
+        for row_no, row in batch:
+            if row['username'].strip() in existing:
+                reject(row_no, row, 'username already exists')
+            else:
+                valid.append((row_no, row))
+        if valid:
+            try:
+                users = _register_batch(valid, hasher_pool, send_emails)
+            except IntegrityError:
+                if not retry:
+                    raise
+                # Taken between the check and the insert; the batch was rolled back
+                flush(valid, retry=False)
+                return
+            result['created'] += len(users)
+            result['usernames'].extend(user.username for user in users)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as hasher_pool:
+        batch = []
+        for row_no, row in enumerate(rows, 1):
+            result['rows'] += 1
+            reason = _validate(row)
+            if reason is None and row['username'].strip() in seen:
+                reason = 'duplicate username in input'
+            if reason is not None:
+                reject(row_no, row, reason)
+                continue
+            seen.add(row['username'].strip())
+            batch.append((row_no, row))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+    logger.info(f"Bulk registration: {result['created']} created, {result['rejected']} rejected of {result['rows']} rows")
+    return result
@@ -0,0 +1,151 @@
+"""
+Daily/weekly/monthly active user counts backed by Redis HyperLogLog.
+
+Every interacting Telegram user is PFADDed into the current day's sketch
+for their bot and into one across all bots. Counting uniques over a
+window is a PFCOUNT across the day keys, which Redis answers by merging
+the sketches (~0.81% standard error) in constant memory, independent of
+how many interactions were logged.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+HLL_KEY_PREFIX = 'tbot:active_users:hll'
+EXACT_KEY_PREFIX = 'tbot:active_users:set'
+ALL_BOTS = 'all'
+
+
+def _day_key(prefix, day, bot_id=ALL_BOTS):
+    if bot_id == ALL_BOTS:
+        return f"{prefix}:{day:%Y%m%d}"
+    return f"{prefix}:bot:{bot_id or 'default'}:{day:%Y%m%d}"
+
+
+def _window_days(days, end=None):
+    end = end or timezone.now().date()
+    return [end - timedelta(days=offset) for offset in range(days)]
+
+
+def record_active_user(telegram_user_id, when=None, bot_id=None):
+    """
+    Record that a Telegram user was active on the given (or current) day.
+
+    The user goes into the bot's own sketch and into the all-bots sketch,
+    which is their union, so global counts need no list of bots.
+    """
+    day = (when or timezone.now()).date()
+    ttl = settings.ACTIVE_USERS_RETENTION_DAYS * 86400
+
+    pipe = get_redis().pipeline(transaction=False)
+    for scope in (bot_id, ALL_BOTS):
+        key = _day_key(HLL_KEY_PREFIX, day, scope)
+        pipe.pfadd(key, telegram_user_id)
+        pipe.expire(key, ttl)
+        if settings.ACTIVE_USERS_EXACT_TRACKING:
+            exact_key = _day_key(EXACT_KEY_PREFIX, day, scope)
+            pipe.sadd(exact_key, telegram_user_id)
+            pipe.expire(exact_key, ttl)
+    pipe.execute()
+
+
+def count_active_users(days=1, end=None, bot_id=ALL_BOTS):
+    """
+    Estimated unique active users over the `days` days ending on `end`
+    (inclusive), for one bot (None for the default bot) or all of them
+    """
+    keys = [_day_key(HLL_KEY_PREFIX, day, bot_id) for day in _window_days(days, end)]
+    return get_redis().pfcount(*keys)
+
+
+def daily_active_users(end=None, bot_id=ALL_BOTS):
+    return count_active_users(1, end, bot_id)
+
+
+def weekly_active_users(end=None, bot_id=ALL_BOTS):
+    return count_active_users(7, end, bot_id)
+
+
+def monthly_active_users(end=None, bot_id=ALL_BOTS):
+    return count_active_users(30, end, bot_id)
+
+
+def exact_active_users(days=1, end=None, bot_id=ALL_BOTS):
+    """
+    Exact unique active users over the same window.
+
+    Uses the exact Redis sets when ACTIVE_USERS_EXACT_TRACKING is on,
+    otherwise falls back to a DISTINCT count of Telegram ids (what the
+    sketches hold) over BotInteraction.
+    """
+    window = _window_days(days, end)
+    if settings.ACTIVE_USERS_EXACT_TRACKING:
+        keys = [_day_key(EXACT_KEY_PREFIX, day, bot_id) for day in window]
+        return len(get_redis().sunion(keys)), 'redis'
+
+    from .models import BotInteraction
+    interactions = BotInteraction.objects.filter(
+        timestamp__date__gte=window[-1],
+        timestamp__date__lte=window[0],
+    )
+    if bot_id != ALL_BOTS:
+        interactions = interactions.filter(telegram_user__bot_id=bot_id)
+    count = interactions.values('telegram_user__telegram_user_id').distinct().count()
+    return count, 'database'
+
+
+def validate_active_users(days=1, end=None, bot_id=ALL_BOTS):
+    """Compare the sketch estimate against an exact count for one window"""
+    estimate = count_active_users(days, end, bot_id)
+    exact, source = exact_active_users(days, end, bot_id)
+    error = (estimate - exact) / exact * 100 if exact else 0.0
+    return {
+        'days': days,
+        'estimate': estimate,
+        'exact': exact,
+        'exact_source': source,
+        'error_pct': round(error, 3),
+    }
+
+
+def backfill_active_users(day, batch_size=10000):
+    """Add one day's users from BotInteraction rows to the sketches (PFADD is idempotent)"""
+    from .models import BotInteraction
+
+    rows = BotInteraction.objects.filter(
+        timestamp__date=day
+    ).values_list('telegram_user__bot_id', 'telegram_user__telegram_user_id').distinct().order_by()
+
+    client = get_redis()
+    keys = set()
+    batch = defaultdict(list)  # sketch key -> telegram ids
+    total = 0
+
+    def flush():
+        pipe = client.pipeline(transaction=False)
+        for key, telegram_ids in batch.items():
+            pipe.pfadd(key, *telegram_ids)
+        pipe.execute()
+        keys.update(batch)
+        batch.clear()
+
+    for bot_id, telegram_user_id in rows.iterator(chunk_size=batch_size):
+        batch[_day_key(HLL_KEY_PREFIX, day, bot_id)].append(telegram_user_id)
+        batch[_day_key(HLL_KEY_PREFIX, day)].append(telegram_user_id)
+        total += 1
+        if total % batch_size == 0:
+            flush()
+    if batch:
+        flush()
+    for key in keys:
+        client.expire(key, settings.ACTIVE_USERS_RETENTION_DAYS * 86400)
+
+    logger.info(f"Backfilled active user sketches for {day}: {total} (bot, user) pairs")
+    return total
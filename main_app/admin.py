@@ -1,13 +1,59 @@
+from django.conf import settings
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import TelegramUser, UserProfile, BotInteraction, BroadcastMessage
+from .models import BotConfig, TelegramUser, UserProfile, BotInteraction, BroadcastMessage, BroadcastDelivery, DailyReport, DataExport, ProfilingSession
+from .search import TelegramUserSearchMixin
+from .user_cache import publish_invalidation
+
+def start_export(request, dataset, telegram_users=None, start_date=None, end_date=None):
+    from .tasks import export_data
+    export = DataExport.objects.create(
+        dataset=dataset,
+        start_date=start_date,
+        end_date=end_date,
+        created_by=request.user,
+    )
+    if telegram_users is not None:
+        export.telegram_users.set(telegram_users)
+    export_data.delay(export.id)
+    return export
+
+@admin.register(BotConfig)
+class BotConfigAdmin(admin.ModelAdmin):
+    list_display = ('name', 'username', 'masked_token', 'is_active', 'user_count', 'updated_at')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'username')
+    readonly_fields = ('created_at', 'updated_at')
+    
+    def masked_token(self, obj):
+        bot_id, _, secret = obj.token.partition(':')
+        return f"{bot_id}:…{secret[-4:]}"
+    masked_token.short_description = 'Token'
+    
+    def user_count(self, obj):
+        return obj.telegram_users.count()
+    user_count.short_description = 'Users'
+    
+    actions = ['activate_bots', 'deactivate_bots']
+    
+    def activate_bots(self, request, queryset):
+        queryset.update(is_active=True)
+        self.message_user(request, f"{queryset.count()} bots will start within {settings.BOT_RELOAD_SECONDS}s")
+    activate_bots.short_description = "Start selected bots"
+    
+    def deactivate_bots(self, request, queryset):
+        queryset.update(is_active=False)
+        self.message_user(request, f"{queryset.count()} bots will stop within {settings.BOT_RELOAD_SECONDS}s")
+    deactivate_bots.short_description = "Stop selected bots"
 
 @admin.register(TelegramUser)
-class TelegramUserAdmin(admin.ModelAdmin):
-    list_display = ('telegram_username', 'full_name', 'telegram_user_id', 'is_active', 'days_since_joined', 'last_interaction', 'interaction_count')
-    list_filter = ('is_active', 'created_at', 'last_interaction')
+class TelegramUserAdmin(TelegramUserSearchMixin, admin.ModelAdmin):
+    list_display = ('telegram_username', 'full_name', 'telegram_user_id', 'bot', 'is_active', 'days_since_joined', 'last_interaction', 'interaction_count')
+    list_filter = ('bot', 'is_active', 'created_at', 'last_interaction')
+    list_select_related = ('bot',)
     search_fields = ('telegram_username', 'first_name', 'last_name', 'telegram_user_id')
     readonly_fields = ('created_at', 'days_since_joined', 'interaction_count')
     list_per_page = 25
@@ -21,30 +67,80 @@ class TelegramUserAdmin(admin.ModelAdmin):
         return obj.days_since_joined
     days_since_joined.short_description = 'Days Active'
     
-    actions = ['mark_as_inactive', 'mark_as_active']
+    actions = ['mark_as_inactive', 'mark_as_active', 'export_users', 'export_user_interactions']
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        publish_invalidation([obj.telegram_user_id])
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        publish_invalidation([obj.telegram_user_id])
+    
+    def delete_queryset(self, request, queryset):
+        telegram_user_ids = list(queryset.values_list('telegram_user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        publish_invalidation(telegram_user_ids)
     
     def mark_as_inactive(self, request, queryset):
+        # The queryset may filter on is_active, so collect ids before updating
+        telegram_user_ids = list(queryset.values_list('telegram_user_id', flat=True))
         queryset.update(is_active=False)
+        publish_invalidation(telegram_user_ids)
     mark_as_inactive.short_description = "Mark selected users as inactive"
     
     def mark_as_active(self, request, queryset):
+        # The queryset may filter on is_active, so collect ids before updating
+        telegram_user_ids = list(queryset.values_list('telegram_user_id', flat=True))
         queryset.update(is_active=True)
+        publish_invalidation(telegram_user_ids)
     mark_as_active.short_description = "Mark selected users as active"
+    
+    def export_users(self, request, queryset):
+        export = start_export(request, 'users', telegram_users=queryset)
+        self.message_user(request, f"Export #{export.id} started for {queryset.count()} users")
+    export_users.short_description = "Export selected users (CSV)"
+    
+    def export_user_interactions(self, request, queryset):
+        export = start_export(request, 'interactions', telegram_users=queryset)
+        self.message_user(request, f"Export #{export.id} started for interactions of {queryset.count()} users")
+    export_user_interactions.short_description = "Export interactions of selected users (CSV)"
 
 @admin.register(BotInteraction)
-class BotInteractionAdmin(admin.ModelAdmin):
-    list_display = ('telegram_user', 'interaction_type', 'command_or_data', 'timestamp')
-    list_filter = ('interaction_type', 'timestamp')
+class BotInteractionAdmin(TelegramUserSearchMixin, admin.ModelAdmin):
+    list_display = ('telegram_user', 'bot', 'interaction_type', 'command_or_data', 'timestamp')
+    list_filter = ('bot', 'interaction_type', 'timestamp')
+    list_select_related = ('telegram_user', 'bot')
     search_fields = ('telegram_user__telegram_username', 'command_or_data')
+    search_text_fields = ('command_or_data',)
+    search_user_field = 'telegram_user'
     readonly_fields = ('timestamp',)
     date_hierarchy = 'timestamp'
+    
+    actions = ['export_interactions']
+    
+    def export_interactions(self, request, queryset):
+        from datetime import timedelta
+        from django.db.models import Max, Min
+        
+        # Export the time span covered by the selection rather than a list of ids
+        span = queryset.aggregate(start=Min('timestamp'), end=Max('timestamp'))
+        if span['start'] is None:
+            return
+        export = start_export(
+            request, 'interactions',
+            start_date=span['start'],
+            end_date=span['end'] + timedelta(microseconds=1),
+        )
+        self.message_user(request, f"Export #{export.id} started for {span['start']:%Y-%m-%d} - {span['end']:%Y-%m-%d}")
+    export_interactions.short_description = "Export interactions in the selected time span (CSV)"
 
 @admin.register(BroadcastMessage)
 class BroadcastMessageAdmin(admin.ModelAdmin):
-    list_display = ('title', 'created_by', 'created_at', 'is_sent', 'delivery_stats')
-    list_filter = ('is_sent', 'created_at')
+    list_display = ('title', 'bot', 'created_by', 'created_at', 'scheduled_at', 'send_window_minutes', 'is_sent', 'delivery_stats')
+    list_filter = ('bot', 'is_sent', 'created_at', 'scheduled_at')
     search_fields = ('title', 'message')
-    readonly_fields = ('created_at', 'sent_at', 'total_recipients', 'successful_sends', 'failed_sends')
+    readonly_fields = ('created_at', 'planned_at', 'sent_at', 'total_recipients', 'successful_sends', 'failed_sends')
     
     def delivery_stats(self, obj):
         if obj.is_sent:
@@ -53,17 +149,43 @@ class BroadcastMessageAdmin(admin.ModelAdmin):
                 obj.successful_sends,
                 obj.total_recipients
             )
+        if obj.planned_at:
+            return format_html(
+                '<span style="color: orange;">📅 {} recipients from {}</span>',
+                obj.total_recipients,
+                timezone.localtime(obj.scheduled_at or obj.planned_at).strftime('%Y-%m-%d %H:%M')
+            )
         return format_html('<span style="color: orange;">⏳ Pending</span>')
     delivery_stats.short_description = 'Delivery Status'
     
     actions = ['send_broadcast']
     
     def send_broadcast(self, request, queryset):
-        from .tasks import broadcast_message_to_users
-        for broadcast in queryset.filter(is_sent=False):
-            broadcast_message_to_users.delay(broadcast.id)
-        self.message_user(request, f"Broadcasting {queryset.count()} messages...")
-    send_broadcast.short_description = "Send selected broadcasts"
+        from .tasks import broadcast_message_to_users, schedule_broadcast
+        pending = queryset.filter(is_sent=False, planned_at__isnull=True)
+        for broadcast in pending:
+            # Broadcasts with a start time or window are spread out; others go out at once
+            if broadcast.is_scheduled:
+                schedule_broadcast.delay(broadcast.id)
+            else:
+                broadcast_message_to_users.delay(broadcast.id)
+        self.message_user(request, f"Broadcasting {pending.count()} messages...")
+    send_broadcast.short_description = "Send selected broadcasts (scheduled ones at their start time)"
+
+@admin.register(BroadcastDelivery)
+class BroadcastDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('broadcast', 'telegram_user_id', 'send_at', 'status', 'attempted_at', 'error')
+    list_filter = ('status', 'broadcast')
+    search_fields = ('telegram_user_id',)
+    readonly_fields = ('broadcast', 'telegram_user_id', 'send_at', 'status', 'attempted_at', 'error')
+    list_select_related = ('broadcast',)
+    show_full_result_count = False
+
+@admin.register(DailyReport)
+class DailyReportAdmin(admin.ModelAdmin):
+    list_display = ('date', 'new_users', 'total_users', 'active_users', 'interactions', 'commands', 'callbacks', 'computed_at')
+    date_hierarchy = 'date'
+    readonly_fields = ('date', 'new_users', 'total_users', 'active_users', 'interactions', 'commands', 'callbacks', 'computed_at')
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -71,3 +193,78 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_filter = ('created_at',)
     search_fields = ('user__username', 'user__email')
     readonly_fields = ('created_at',)
+
+@admin.register(DataExport)
+class DataExportAdmin(admin.ModelAdmin):
+    list_display = ('id', 'dataset', 'export_format', 'status', 'rows_exported', 'file_count', 'created_by', 'created_at', 'completed_at')
+    list_filter = ('dataset', 'export_format', 'status', 'created_at')
+    readonly_fields = ('status', 'last_exported_id', 'rows_exported', 'files', 'error', 'created_at', 'updated_at', 'completed_at')
+    raw_id_fields = ('telegram_users',)
+    
+    def file_count(self, obj):
+        return len(obj.files)
+    file_count.short_description = 'Files'
+    
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+    
+    actions = ['run_export']
+    
+    def run_export(self, request, queryset):
+        from datetime import timedelta
+        from django.db.models import Q
+        from .tasks import export_data
+        # Claim each export before queueing it, so double clicks or two admins
+        # cannot run the same export twice. A "running" export that has not
+        # written a chunk for an hour belongs to a dead worker and is resumed
+        now = timezone.now()
+        claimable = Q(status__in=['pending', 'failed']) | Q(status='running', updated_at__lt=now - timedelta(hours=1))
+        started = 0
+        for export_id in queryset.filter(claimable).values_list('id', flat=True):
+            if DataExport.objects.filter(claimable, id=export_id).update(status='running', error='', updated_at=now):
+                export_data.delay(export_id)
+                started += 1
+        self.message_user(request, f"Started or resumed {started} exports; completed and running exports were skipped")
+    run_export.short_description = "Start / resume selected exports"
+
+@admin.register(ProfilingSession)
+class ProfilingSessionAdmin(admin.ModelAdmin):
+    """Adding a session switches profiling on in every web and bot process"""
+    list_display = ('__str__', 'duration_minutes', 'started_by', 'started_at', 'ends_at', 'stopped_at', 'is_running')
+    readonly_fields = ('started_by', 'started_at', 'ends_at', 'stopped_at')
+    
+    def is_running(self, obj):
+        return obj.is_running
+    is_running.boolean = True
+    is_running.short_description = 'Running'
+    
+    def save_model(self, request, obj, form, change):
+        from datetime import timedelta
+        from .profiling import publish_state
+        
+        # Only one session at a time; a new one replaces whatever is running
+        ProfilingSession.objects.filter(stopped_at__isnull=True).exclude(pk=obj.pk).update(stopped_at=timezone.now())
+        if not change:
+            obj.started_by = request.user
+        obj.ends_at = timezone.now() + timedelta(minutes=obj.duration_minutes)
+        obj.stopped_at = None
+        super().save_model(request, obj, form, change)
+        publish_state(obj.sample_rate, obj.target_list, obj.ends_at)
+        self.message_user(
+            request,
+            f"Profiling {obj.sample_rate:.0%} of {obj.get_targets_display().lower()} until {obj.ends_at:%H:%M} UTC; "
+            f"profiles are written to {settings.PROFILING_DIR}"
+        )
+    
+    actions = ['stop_sessions']
+    
+    def stop_sessions(self, request, queryset):
+        from .profiling import clear_state
+        
+        stopped = queryset.filter(stopped_at__isnull=True).update(stopped_at=timezone.now())
+        if not ProfilingSession.objects.filter(stopped_at__isnull=True, ends_at__gt=timezone.now()).exists():
+            clear_state()
+        self.message_user(request, f"Stopped {stopped} profiling sessions")
+    stop_sessions.short_description = "Stop selected profiling sessions"
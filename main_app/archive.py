@@ -0,0 +1,167 @@
+"""
+Cold storage for old BotInteraction rows.
+
+Interactions past the hot retention window are moved, one day at a time,
+into gzip-compressed CSV files under
+
+    ARCHIVE_ROOT/interactions/day=YYYY-MM-DD/part-<first_id>-<last_id>.csv.gz
+
+The layout is Hive-style partitioned with a fixed, typed header, so the
+files can be read directly by DuckDB, pandas or Spark. scan_archive() and
+summarize_archive() answer historical questions from the files alone
+without touching PostgreSQL.
+"""
+import csv
+import gzip
+import logging
+import os
+from collections import Counter
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .pg_copy import copy_query_out
+
+logger = logging.getLogger(__name__)
+
+# bot_id comes last so files written before it existed keep a prefix of the header
+ARCHIVE_COLUMNS = ('id', 'telegram_user_id', 'telegram_username', 'interaction_type', 'command_or_data', 'timestamp', 'bot_id')
+ARCHIVE_QUERY = """
+    SELECT i.id, u.telegram_user_id, u.telegram_username, i.interaction_type, i.command_or_data, i.timestamp, i.bot_id
+    FROM main_app_botinteraction i
+    JOIN main_app_telegramuser u ON u.id = i.telegram_user_id
+    WHERE i.timestamp >= %s AND i.timestamp < %s AND i.id <= %s
+    ORDER BY i.id
+"""
+
+
+def _interactions_root():
+    return settings.ARCHIVE_ROOT / 'interactions'
+
+
+def _partition_dir(day):
+    return _interactions_root() / f"day={day.isoformat()}"
+
+
+def _day_bounds(day):
+    start = datetime.combine(day, dt_time.min, tzinfo=dt_timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def archive_day(day):
+    """
+    Move one day of interactions to the archive and return the row count.
+
+    The file is fully written and fsynced before the rows are deleted, and
+    the delete commits only after that, so a crash can at worst leave rows
+    in both places; re-running rewrites the same id range file.
+    """
+    from .models import BotInteraction
+
+    start, end = _day_bounds(day)
+    with transaction.atomic():
+        bounds = BotInteraction.objects.filter(
+            timestamp__gte=start, timestamp__lt=end
+        ).aggregate(first_id=Min('id'), last_id=Max('id'))
+        first_id, last_id = bounds['first_id'], bounds['last_id']
+        if first_id is None:
+            return 0
+
+        directory = _partition_dir(day)
+        os.makedirs(directory, exist_ok=True)
+        path = directory / f"part-{first_id}-{last_id}.csv.gz"
+        tmp_path = path.with_name(path.name + '.tmp')
+
+        with connection.cursor() as cursor:
+            with open(tmp_path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) as fileobj:
+                rows = copy_query_out(cursor, ARCHIVE_QUERY, [start, end, last_id], fileobj)
+                fileobj.flush()
+                raw.flush()
+                os.fsync(raw.fileno())
+            os.replace(tmp_path, path)
+
+            cursor.execute(
+                f"DELETE FROM {BotInteraction._meta.db_table} WHERE timestamp >= %s AND timestamp < %s AND id <= %s",
+                [start, end, last_id]
+            )
+            deleted = cursor.rowcount
+
+        if deleted != rows:
+            # Rows deleted without being archived (e.g. their user vanished mid-run): keep them
+            raise RuntimeError(f"Archive of {day} wrote {rows} rows but would delete {deleted}; rolled back")
+
+    logger.info(f"Archived {rows} interactions for {day} to {path}")
+    return rows
+
+
+def archive_cutoff(older_than_days=None):
+    """Start (UTC midnight) of the first day that is not archived yet"""
+    older_than_days = older_than_days or settings.INTERACTION_RETENTION_DAYS
+    cutoff_day = (timezone.now() - timedelta(days=older_than_days)).astimezone(dt_timezone.utc).date()
+    return _day_bounds(cutoff_day)[0]
+
+
+def archive_interactions(older_than_days=None):
+    """Archive every full day of interactions before archive_cutoff()"""
+    from .models import BotInteraction
+
+    cutoff_day = archive_cutoff(older_than_days).date()
+    oldest = BotInteraction.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+    if oldest is None:
+        return 0
+
+    total = 0
+    day = oldest.astimezone(dt_timezone.utc).date()
+    while day < cutoff_day:
+        total += archive_day(day)
+        day += timedelta(days=1)
+    return total
+
+
+def _archived_days(start, end):
+    """Partition directories between start and end (inclusive), pruned by name"""
+    root = _interactions_root()
+    if not root.exists():
+        return []
+    days = []
+    for entry in root.iterdir():
+        if entry.is_dir() and entry.name.startswith('day='):
+            day = date.fromisoformat(entry.name[len('day='):])
+            if start <= day <= end:
+                days.append((day, entry))
+    return sorted(days)
+
+
+def scan_archive(start, end, columns=None):
+    """
+    Yield archived interactions between start and end (dates, inclusive)
+    as dicts, limited to `columns` when given. Columns missing from older
+    files (bot_id) come back empty.
+    """
+    for _, directory in _archived_days(start, end):
+        for path in sorted(directory.glob('part-*.csv.gz')):
+            with gzip.open(path, 'rt', newline='', encoding='utf-8') as fileobj:
+                for row in csv.DictReader(fileobj):
+                    if columns:
+                        row = {name: row.get(name, '') for name in columns}
+                    yield row
+
+
+def summarize_archive(start, end, group_by='day'):
+    """
+    Aggregate archived interactions between start and end.
+
+    group_by is 'day', 'interaction_type' or 'command_or_data'. Returns
+    (Counter of interactions per group, number of unique Telegram users).
+    A person talking to two bots counts as two users, as in the database.
+    """
+    counts = Counter()
+    users = set()
+    for row in scan_archive(start, end, columns=('bot_id', 'telegram_user_id', 'interaction_type', 'command_or_data', 'timestamp')):
+        key = row['timestamp'][:10] if group_by == 'day' else row[group_by]
+        counts[key] += 1
+        users.add((row['bot_id'], row['telegram_user_id']))
+    return counts, len(users)
@@ -0,0 +1,150 @@
+"""
+Multi-bot runtime: many Telegram bots in one process and event loop.
+
+Active BotConfig rows (plus the TELEGRAM_BOT_TOKEN bot, if set) are each
+run as an Application polling for updates. All of them share the Django
+DB connections, the TelegramUser cache, the interaction log and one
+HTTP connection pool for Bot API calls, so an extra bot costs a polling
+connection and its handlers rather than a whole process.
+
+The BotConfig table is re-read every BOT_RELOAD_SECONDS: new or
+re-activated bots are started, deactivated or deleted ones are stopped,
+and a changed token restarts that bot, all without a process restart.
+"""
+import asyncio
+import logging
+import signal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from telegram import Update
+from telegram.request import HTTPXRequest
+
+from .profiling import toggle_from_signal
+from .task_outbox import get_task_outbox
+from .telegram_bot import build_application, interaction_log, loop_lag
+from .update_dedup import get_update_deduplicator
+from .user_cache import get_user_cache
+
+logger = logging.getLogger(__name__)
+
+
+class SharedHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest that survives the shutdown of the Applications using it"""
+
+    async def shutdown(self):
+        # Called by every Application on shutdown; only close() really closes the pool
+        pass
+
+    async def close(self):
+        await super().shutdown()
+
+
+def _load_bot_configs():
+    from .models import BotConfig
+
+    bots = {
+        bot_id: (name, token)
+        for bot_id, name, token in BotConfig.objects.filter(is_active=True).values_list('id', 'name', 'token')
+    }
+    if settings.TELEGRAM_BOT_TOKEN:
+        bots[None] = ('default', settings.TELEGRAM_BOT_TOKEN)
+    return bots
+
+
+class BotRuntime:
+    def __init__(self, reload_interval=None, pool_size=None):
+        self.reload_interval = reload_interval or settings.BOT_RELOAD_SECONDS
+        self.request = SharedHTTPXRequest(connection_pool_size=pool_size or settings.TELEGRAM_BOT_POOL_SIZE)
+        self.applications = {}  # bot_id -> (token, Application)
+        self._failed = {}       # bot_id -> token that could not be started
+        self._stopping = asyncio.Event()
+
+    async def _start_bot(self, bot_id, name, token):
+        application = build_application(token, bot_id=bot_id, request=self.request, standalone=False)
+        try:
+            await application.initialize()
+            await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+            await application.start()
+        except Exception as e:
+            # Typically an invalid or revoked token; retried once the token changes
+            logger.error(f"Could not start bot {name}: {str(e)}")
+            self._failed[bot_id] = token
+            try:
+                await application.shutdown()
+            except Exception:
+                pass
+            return
+        self.applications[bot_id] = (token, application)
+        self._failed.pop(bot_id, None)
+        logger.info(f"Started bot {name} (@{application.bot.username})")
+
+    async def _stop_bot(self, bot_id):
+        token, application = self.applications.pop(bot_id)
+        try:
+            if application.updater.running:
+                await application.updater.stop()
+            if application.running:
+                await application.stop()
+            await application.shutdown()
+        except Exception as e:
+            logger.warning(f"Error stopping bot {bot_id}: {str(e)}")
+        logger.info(f"Stopped bot {bot_id or 'default'}")
+
+    async def sync(self):
+        """Start, stop and restart bots to match the database"""
+        configs = await sync_to_async(_load_bot_configs)()
+        self._failed = {bot_id: token for bot_id, token in self._failed.items() if bot_id in configs}
+        for bot_id, (token, _) in list(self.applications.items()):
+            if bot_id not in configs or configs[bot_id][1] != token:
+                await self._stop_bot(bot_id)
+        starts = [
+            self._start_bot(bot_id, name, token)
+            for bot_id, (name, token) in configs.items()
+            if bot_id not in self.applications and self._failed.get(bot_id) != token
+        ]
+        if starts:
+            await asyncio.gather(*starts)
+
+    def stop(self):
+        self._stopping.set()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stop)
+        if settings.PROFILING_ENABLED:
+            loop.add_signal_handler(signal.SIGUSR2, toggle_from_signal)
+
+        await self.request.initialize()
+        get_user_cache().start_invalidation_listener()
+        interaction_log.start()
+        loop_lag.start()
+        try:
+            while not self._stopping.is_set():
+                try:
+                    await self.sync()
+                except Exception as e:
+                    logger.error(f"Could not reload bot configs: {str(e)}")
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.reload_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for bot_id in list(self.applications):
+                await self._stop_bot(bot_id)
+            await interaction_log.stop()
+            await loop_lag.stop()
+            outbox = get_task_outbox()
+            await sync_to_async(outbox.stop, thread_sensitive=False)(settings.TASK_OUTBOX_SHUTDOWN_TIMEOUT)
+            await self.request.close()
+            logger.info(f"Telegram user cache stats: {get_user_cache().stats()}")
+            logger.info(f"Task outbox stats: {outbox.stats()}")
+            logger.info(f"Event loop lag: {loop_lag.stats()}")
+            logger.info(f"Update dedup stats: {get_update_deduplicator().stats()}")
+
+
+def run_bots():
+    """Run every configured bot in this process until interrupted"""
+    logger.info("Starting multi-bot runtime...")
+    asyncio.run(BotRuntime().run())
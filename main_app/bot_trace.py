@@ -0,0 +1,101 @@
+"""
+Synthetic update traces for load testing the bot.
+
+A trace is a list of (offset_seconds, update) pairs: Poisson arrivals at
+a target rate, users drawn with a power-law so a few are very active,
+and a configurable mix of /start, /help and inline button presses. The
+callback_data comes from the bot's own CallbackRouter, so traces stay
+valid when buttons change. Traces can be saved as NDJSON and replayed.
+"""
+import json
+import random
+import time
+
+DEFAULT_MIX = {'start': 0.2, 'help': 0.1, 'callback': 0.7}
+# Relative weights of buttons; bot_stats enqueues a Celery task per press
+DEFAULT_CALLBACKS = {'stats': 0.3, 'endpoints': 0.3, 'help': 0.15, 'back_to_menu': 0.2, 'bot_stats': 0.05}
+FIRST_USER_ID = 7_000_000_000
+
+
+def _user(user_id):
+    return {
+        'id': user_id,
+        'is_bot': False,
+        'first_name': f"Load{user_id % 100000}",
+        'username': f"load_{user_id}",
+        'language_code': 'en',
+    }
+
+
+def _command(user_id, command, message_id, now):
+    return {
+        'message': {
+            'message_id': message_id,
+            'date': now,
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': _user(user_id),
+            'text': f"/{command}",
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command) + 1}],
+        }
+    }
+
+
+def _callback(user_id, data, message_id, now):
+    return {
+        'callback_query': {
+            'id': f"{user_id}-{message_id}",
+            'from': _user(user_id),
+            'chat_instance': str(user_id),
+            'data': data,
+            'message': {
+                'message_id': message_id,
+                'date': now,
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': {'id': 999000001, 'is_bot': True, 'first_name': 'T-Bot'},
+                'text': 'Choose an option:',
+            },
+        }
+    }
+
+
+def generate_trace(rate, duration, users=1000, mix=None, callbacks=None, skew=1.2, seed=None):
+    """Build a trace of about rate * duration updates"""
+    from .telegram_bot import callbacks as router
+
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    callback_weights = callbacks or DEFAULT_CALLBACKS
+    kinds, kind_weights = zip(*mix.items())
+    buttons, button_weights = zip(*callback_weights.items())
+    now = int(time.time())
+
+    trace = []
+    offset = 0.0
+    message_id = 1
+    while True:
+        offset += rng.expovariate(rate)
+        if offset >= duration:
+            return trace
+        # Pareto rank -> a few users produce most of the traffic
+        user_id = FIRST_USER_ID + min(int(rng.paretovariate(skew)) - 1, users - 1)
+        kind = rng.choices(kinds, kind_weights)[0]
+        if kind == 'callback':
+            button = rng.choices(buttons, button_weights)[0]
+            args = (rng.randrange(3),) if button == 'endpoints' else ()
+            update = _callback(user_id, router.encode(button, *args), message_id, now)
+        else:
+            update = _command(user_id, kind, message_id, now)
+        trace.append((offset, update))
+        message_id += 1
+
+
+def write_trace(trace, path):
+    with open(path, 'w') as fileobj:
+        for offset, update in trace:
+            fileobj.write(json.dumps({'offset': round(offset, 6), 'update': update}) + '\n')
+
+
+def read_trace(path):
+    with open(path) as fileobj:
+        rows = [json.loads(line) for line in fileobj if line.strip()]
+    return [(row['offset'], row['update']) for row in rows]
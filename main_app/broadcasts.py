@@ -0,0 +1,205 @@
+"""
+Scheduled broadcast delivery.
+
+plan_broadcast() snapshots the audience into BroadcastDelivery rows with
+one INSERT ... SELECT. Each recipient gets a send_at evenly spaced across
+[scheduled_at, scheduled_at + send window], so the send rate is
+recipients / window, however large the audience. With spread_by_activity,
+recipients are ordered by the UTC hour they are usually active in
+(from the last ACTIVITY_LOOKBACK_DAYS of BotInteraction), counted from the
+window's start hour. The spacing stays even, and users tend to get the
+message around the time they normally use the bot.
+
+dispatch_due() runs from Celery beat. It claims due rows with
+FOR UPDATE SKIP LOCKED, so overlapping runs never send the same row
+twice. It sends them through the shared sender and records each
+outcome. Delivery is at most once: rows left in 'sending' by a crashed
+worker are marked failed, not resent.
+"""
+import logging
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_LOOKBACK_DAYS = 30
+STALE_SENDING = timedelta(minutes=15)
+
+
+def plan_broadcast(broadcast):
+    """Create delivery rows for every active user of the broadcast's bot; returns the number planned"""
+    from .models import BotInteraction, BroadcastDelivery, BroadcastMessage, TelegramUser
+
+    start = broadcast.scheduled_at or timezone.now()
+    window = timedelta(minutes=broadcast.send_window_minutes)
+    if broadcast.spread_by_activity:
+        # Hours after the window's start hour; users without history are spread over the day
+        activity_join = f"""
+            LEFT JOIN (
+                SELECT DISTINCT ON (telegram_user_id) telegram_user_id, hour
+                FROM (
+                    SELECT telegram_user_id, EXTRACT(HOUR FROM timestamp AT TIME ZONE 'UTC')::int AS hour, COUNT(*) AS n
+                    FROM {BotInteraction._meta.db_table}
+                    WHERE timestamp >= %(since)s
+                    GROUP BY 1, 2
+                ) per_hour
+                ORDER BY telegram_user_id, n DESC
+            ) a ON a.telegram_user_id = u.id
+        """
+        order_by = "(COALESCE(a.hour, u.id %% 24) - %(start_hour)s + 24) %% 24, u.id"
+    else:
+        activity_join = ''
+        order_by = 'u.id'
+
+    with transaction.atomic():
+        locked = BroadcastMessage.objects.select_for_update().get(pk=broadcast.pk)
+        if locked.planned_at is not None or locked.is_sent:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {BroadcastDelivery._meta.db_table} (broadcast_id, telegram_user_id, send_at, status, error)
+                SELECT %(broadcast_id)s, u.telegram_user_id,
+                       %(start)s + %(window)s * ((ROW_NUMBER() OVER (ORDER BY {order_by}) - 1)::float
+                                                 / GREATEST(COUNT(*) OVER (), 1)),
+                       'pending', ''
+                FROM {TelegramUser._meta.db_table} u
+                {activity_join}
+                WHERE u.is_active AND u.bot_id IS NOT DISTINCT FROM %(bot_id)s
+            """, {
+                'broadcast_id': broadcast.pk,
+                'bot_id': broadcast.bot_id,
+                'start': start,
+                'window': window,
+                'since': timezone.now() - timedelta(days=ACTIVITY_LOOKBACK_DAYS),
+                'start_hour': start.astimezone(dt_timezone.utc).hour,
+            })
+            planned = cursor.rowcount
+        BroadcastMessage.objects.filter(pk=broadcast.pk).update(
+            planned_at=timezone.now(), total_recipients=planned
+        )
+
+    if window and planned / window.total_seconds() > settings.TELEGRAM_SEND_RATE:
+        logger.warning(
+            f"Broadcast {broadcast.pk} needs {planned / window.total_seconds():.1f} msg/s, above "
+            f"TELEGRAM_SEND_RATE={settings.TELEGRAM_SEND_RATE}; it will finish after its window"
+        )
+    logger.info(f"Planned broadcast {broadcast.pk}: {planned} recipients from {start} over {window}")
+    return planned
+
+
+def _claim_due(batch_size):
+    from .models import BroadcastDelivery
+
+    table = BroadcastDelivery._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {table} SET status = 'sending', attempted_at = now()
+            WHERE id IN (
+                SELECT id FROM {table}
+                WHERE status = 'pending' AND send_at <= now()
+                ORDER BY send_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, broadcast_id, telegram_user_id
+        """, [batch_size])
+        return cursor.fetchall()
+
+
+def _record_results(sent_ids, failures):
+    from .models import BroadcastDelivery
+
+    if sent_ids:
+        BroadcastDelivery.objects.filter(id__in=sent_ids).update(status='sent')
+    if failures:
+        placeholders = ', '.join(['(%s::bigint, %s)'] * len(failures))
+        params = [value for row in failures for value in row]
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE {BroadcastDelivery._meta.db_table} AS d
+                SET status = 'failed', error = v.error
+                FROM (VALUES {placeholders}) AS v(id, error)
+                WHERE d.id = v.id
+            """, params)
+
+
+def _expire_stale_sends():
+    from .models import BroadcastDelivery
+
+    return BroadcastDelivery.objects.filter(
+        status='sending', attempted_at__lt=timezone.now() - STALE_SENDING
+    ).update(status='failed', error='Interrupted while sending')
+
+
+def finalize_broadcasts():
+    """Mark planned broadcasts with no pending deliveries as sent and store their totals"""
+    from .models import BroadcastDelivery, BroadcastMessage
+
+    finalized = 0
+    now = timezone.now()
+    for broadcast in BroadcastMessage.objects.filter(planned_at__isnull=False, is_sent=False):
+        # Nothing can be finished before its window has passed
+        window_end = (broadcast.scheduled_at or broadcast.planned_at) + timedelta(minutes=broadcast.send_window_minutes)
+        if window_end > now:
+            continue
+        deliveries = BroadcastDelivery.objects.filter(broadcast=broadcast)
+        if deliveries.filter(status__in=['pending', 'sending']).exists():
+            continue
+        counts = deliveries.aggregate(
+            sent=Count('id', filter=Q(status='sent')),
+            failed=Count('id', filter=Q(status='failed')),
+        )
+        BroadcastMessage.objects.filter(pk=broadcast.pk).update(
+            is_sent=True,
+            sent_at=now,
+            successful_sends=counts['sent'],
+            failed_sends=counts['failed'],
+            total_recipients=counts['sent'] + counts['failed'],
+        )
+        logger.info(f"Broadcast {broadcast.pk} completed: {counts['sent']} sent, {counts['failed']} failed")
+        finalized += 1
+    return finalized
+
+
+def dispatch_due(batch_size=None, max_batches=None):
+    """Send deliveries whose send_at has passed; returns (sent, failed)"""
+    from .models import BroadcastMessage
+    from .telegram_sender import bot_token, get_sender
+
+    batch_size = batch_size or settings.TELEGRAM_BROADCAST_BATCH_SIZE
+    max_batches = max_batches or settings.BROADCAST_DISPATCH_MAX_BATCHES
+    _expire_stale_sends()
+
+    sent = failed = 0
+    broadcasts = {}  # pk -> (message, bot token)
+    for _ in range(max_batches):
+        claimed = _claim_due(batch_size)
+        if not claimed:
+            break
+        missing = {broadcast_id for _, broadcast_id, _ in claimed} - broadcasts.keys()
+        for pk, message, bot_id in BroadcastMessage.objects.filter(pk__in=missing).values_list('pk', 'message', 'bot_id'):
+            broadcasts[pk] = (message, bot_token(bot_id))
+
+        # Each bot sends its own users' messages under its own rate limit
+        by_token = {}
+        for delivery in claimed:
+            by_token.setdefault(broadcasts[delivery[1]][1], []).append(delivery)
+        sent_ids, failures = [], []
+        for token, deliveries in by_token.items():
+            results = get_sender(token).send_many([(chat_id, broadcasts[broadcast_id][0]) for _, broadcast_id, chat_id in deliveries])
+            for (delivery_id, _, chat_id), result in zip(deliveries, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to send broadcast message to {chat_id}: {str(result)}")
+                    failures.append((delivery_id, str(result)[:200]))
+                else:
+                    sent_ids.append(delivery_id)
+        _record_results(sent_ids, failures)
+        sent += len(sent_ids)
+        failed += len(failures)
+
+    finalize_broadcasts()
+    return sent, failed
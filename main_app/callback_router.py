@@ -0,0 +1,120 @@
+"""
+Routing for inline keyboard callbacks.
+
+Buttons carry a compact, versioned callback_data instead of free-form
+strings, which keeps well under Telegram's 64 byte limit while passing
+parameters such as page numbers or ids:
+
+    <version>|<code>[|<arg>...]      e.g. '1|e|2'
+
+Integer arguments are base36 encoded. Routes are kept in a dict keyed by
+code, so dispatch is one lookup however many buttons the bot has. Data
+from keyboards sent before this encoding existed is mapped through
+legacy aliases, and anything else gets an "expired" answer instead of
+an exception. Every routed callback is queued on the InteractionBuffer
+as a BotInteraction.
+"""
+import logging
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+CALLBACK_VERSION = '1'
+SEPARATOR = '|'
+MAX_CALLBACK_DATA = 64
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def to_base36(value):
+    if value < 0:
+        return '-' + to_base36(-value)
+    encoded = ''
+    while True:
+        value, digit = divmod(value, 36)
+        encoded = DIGITS[digit] + encoded
+        if not value:
+            return encoded
+
+
+class CallbackRoute(NamedTuple):
+    name: str
+    code: str
+    handler: object
+    arg_types: tuple
+
+
+class CallbackRouter:
+    def __init__(self, interaction_log=None, version=CALLBACK_VERSION):
+        self.version = version
+        self.interaction_log = interaction_log
+        self._by_code = {}
+        self._by_name = {}
+        self._legacy = {}
+
+    def route(self, name, code, args=()):
+        """Decorator registering `handler(update, context, *args)` for a button"""
+        if SEPARATOR in code or code in self._by_code:
+            raise ValueError(f"Invalid or duplicate callback code {code!r}")
+
+        def register(handler):
+            route = CallbackRoute(name, code, handler, tuple(args))
+            self._by_code[code] = route
+            self._by_name[name] = route
+            return handler
+        return register
+
+    def legacy(self, data, name, *args):
+        """Keep routing an old plain-string callback_data to a named route"""
+        self._legacy[data] = (name, args)
+
+    def encode(self, name, *args):
+        """callback_data for a button that triggers route `name` with `args`"""
+        route = self._by_name[name]
+        if len(args) != len(route.arg_types):
+            raise ValueError(f"Callback {name} takes {len(route.arg_types)} arguments, got {len(args)}")
+        parts = [self.version, route.code]
+        for arg_type, arg in zip(route.arg_types, args):
+            value = to_base36(arg) if arg_type is int else str(arg)
+            if SEPARATOR in value:
+                raise ValueError(f"Callback argument {value!r} contains {SEPARATOR!r}")
+            parts.append(value)
+        data = SEPARATOR.join(parts)
+        if len(data.encode('utf-8')) > MAX_CALLBACK_DATA:
+            raise ValueError(f"callback_data for {name} is longer than {MAX_CALLBACK_DATA} bytes")
+        return data
+
+    def decode(self, data):
+        """Return (route, args) for callback_data, or (None, ()) if it is unknown or stale"""
+        if data in self._legacy:
+            name, args = self._legacy[data]
+            return self._by_name[name], args
+
+        parts = (data or '').split(SEPARATOR)
+        if len(parts) < 2 or parts[0] != self.version:
+            return None, ()
+        route = self._by_code.get(parts[1])
+        if route is None or len(parts) - 2 != len(route.arg_types):
+            return None, ()
+        try:
+            args = tuple(
+                int(value, 36) if arg_type is int else value
+                for arg_type, value in zip(route.arg_types, parts[2:])
+            )
+        except ValueError:
+            return None, ()
+        return route, args
+
+    async def dispatch(self, update, context):
+        """CallbackQueryHandler callback routing every button press"""
+        query = update.callback_query
+        route, args = self.decode(query.data)
+        if route is None:
+            logger.info(f"Unknown callback data {query.data!r} from {query.from_user.id}")
+            await query.answer('This button has expired, send /start for a fresh menu.')
+            return
+
+        if self.interaction_log is not None:
+            label = ':'.join([route.name, *map(str, args)])
+            bot_id = context.bot_data.get('bot_id') if context is not None else None
+            self.interaction_log.add(query.from_user.id, 'callback', label, bot_id=bot_id)
+        await route.handler(update, context, *args)
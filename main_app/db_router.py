@@ -0,0 +1,195 @@
+"""
+Read-replica routing for reporting workloads.
+
+Only code that opts in with replica_reads() reads from the 'replica'
+alias; everything else keeps using the primary. Inside replica_reads():
+
+* reads fall back to the primary while the replica is missing, unhealthy
+  or lagging more than REPLICA_MAX_LAG_SECONDS (checked at most every
+  REPLICA_LAG_CHECK_INTERVAL seconds per process);
+* after any write in the same context, reads stay on the primary
+  (read-your-writes);
+* ReplicaPinMiddleware keeps a client on the primary for
+  REPLICA_PIN_SECONDS after it made a write request, so reports opened
+  right after a change include it. Browsers are pinned with a cookie;
+  authenticated users also get a short-lived Redis key, which covers JWT
+  clients that do not keep cookies and the same user on other devices.
+"""
+import logging
+import threading
+import time
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'db_pin'
+USER_PIN_KEY = 'tbot:db_pin:user'
+UNSAFE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+_use_replica = ContextVar('use_replica', default=False)
+_pinned = ContextVar('pinned_to_primary', default=False)
+_wrote = ContextVar('wrote_to_primary', default=False)
+
+_lag_lock = threading.Lock()
+_lag_checked_at = 0.0
+_replica_fresh = False
+
+LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def replica_is_fresh():
+    """Whether the replica is reachable and within REPLICA_MAX_LAG_SECONDS (cached)"""
+    global _lag_checked_at, _replica_fresh
+    now = time.monotonic()
+    if now - _lag_checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return _replica_fresh
+    with _lag_lock:
+        if now - _lag_checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+            try:
+                with connections[REPLICA_ALIAS].cursor() as cursor:
+                    cursor.execute(LAG_QUERY)
+                    lag = float(cursor.fetchone()[0] or 0)
+                _replica_fresh = lag <= settings.REPLICA_MAX_LAG_SECONDS
+                if not _replica_fresh:
+                    logger.warning(f"Replica lag {lag:.1f}s exceeds limit, reading from primary")
+            except Exception as e:
+                logger.warning(f"Replica unavailable, reading from primary: {str(e)}")
+                _replica_fresh = False
+            _lag_checked_at = time.monotonic()
+    return _replica_fresh
+
+
+def read_alias():
+    """Database alias reads should use right now (for raw cursors)"""
+    if _use_replica.get() and not _pinned.get() and not _wrote.get() and replica_configured() and replica_is_fresh():
+        return REPLICA_ALIAS
+    return 'default'
+
+
+class replica_reads(ContextDecorator):
+    """Context manager / decorator that routes reads in its scope to the replica when safe"""
+
+    def _recreate_cm(self):
+        # A fresh instance per decorated call, so concurrent calls don't share tokens
+        return type(self)()
+
+    def __enter__(self):
+        # Writes made inside the block pin it to the primary but do not leak out of it
+        self._tokens = (_use_replica.set(True), _wrote.set(_wrote.get()))
+        return self
+
+    def __exit__(self, *exc):
+        use_token, wrote_token = self._tokens
+        _wrote.reset(wrote_token)
+        _use_replica.reset(use_token)
+        return False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = read_alias()
+        return alias if alias != 'default' else None
+
+    def db_for_write(self, model, **hints):
+        if _use_replica.get():
+            _wrote.set(True)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
+
+
+def pin_user(user_id):
+    """Keep the user's reads on the primary for REPLICA_PIN_SECONDS, in every process"""
+    get_redis().set(f"{USER_PIN_KEY}:{user_id}", 1, ex=settings.REPLICA_PIN_SECONDS)
+
+
+def user_is_pinned(user_id):
+    try:
+        return bool(get_redis().exists(f"{USER_PIN_KEY}:{user_id}"))
+    except Exception as e:
+        # The primary is always correct, only busier
+        logger.warning(f"Could not check replica pin, reading from primary: {str(e)}")
+        return True
+
+
+def _cookie_pinned(request):
+    pinned_until = request.COOKIES.get(PIN_COOKIE)
+    try:
+        return pinned_until is not None and float(pinned_until) > time.time()
+    except ValueError:
+        return False
+
+
+def _request_user_id(request):
+    # DRF stores the user it authenticated (e.g. from a JWT) on the Django request
+    user = getattr(request, 'user', None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+class _RequestPin:
+    """
+    Whether a request must read from the primary, decided on first use.
+
+    JWT users are only known once DRF authenticates them inside the view,
+    so the user pin cannot be checked before the request runs.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self._pinned = None
+
+    def __bool__(self):
+        if self._pinned is None:
+            user_id = _request_user_id(self.request)
+            self._pinned = _cookie_pinned(self.request) or (user_id is not None and user_is_pinned(user_id))
+        return self._pinned
+
+
+class ReplicaPinMiddleware:
+    """Keeps clients that just made a write request on the primary for REPLICA_PIN_SECONDS"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pin_token = _pinned.set(_RequestPin(request))
+        try:
+            response = self.get_response(request)
+            if request.method in UNSAFE_METHODS:
+                response.set_cookie(
+                    PIN_COOKIE,
+                    str(time.time() + settings.REPLICA_PIN_SECONDS),
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                    samesite='Lax',
+                )
+                user_id = _request_user_id(request)
+                if user_id is not None:
+                    try:
+                        pin_user(user_id)
+                    except Exception as e:
+                        logger.warning(f"Could not pin user {user_id} to the primary: {str(e)}")
+            return response
+        finally:
+            _pinned.reset(pin_token)
@@ -0,0 +1,221 @@
+"""
+Local stand-in for the Telegram Bot API, for load testing the bot.
+
+Point TELEGRAM_API_BASE_URL at the server and the bot talks to it
+instead of Telegram. Injected updates are served through getUpdates
+long polling or, once the bot calls setWebhook, POSTed to the webhook.
+Outgoing calls are answered with realistic payloads after a simulated
+latency, and a share of them can be rejected with 429 / retry_after.
+
+Every update is timestamped on injection; the first sendMessage or
+editMessageText back to the same chat completes it, which gives
+end-to-end latency without instrumenting the bot itself.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+from urllib.request import Request, urlopen
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {'id': 999000001, 'is_bot': True, 'first_name': 'T-Bot', 'username': 't_bot_loadtest'}
+COMPLETING_METHODS = {'sendmessage', 'editmessagetext'}
+NO_FAULT_METHODS = {'getupdates', 'getme', 'setwebhook', 'deletewebhook', 'getwebhookinfo'}
+
+
+def _parse_value(value):
+    # PTB sends form fields with objects (and numbers) JSON-encoded
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+class FakeBotAPI:
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=(20, 80), error_rate=0.0, retry_after=1):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.webhook_url = None
+        self.webhook_secret = None
+
+        self._updates = deque()
+        self._condition = threading.Condition()
+        # Like Telegram, start somewhere new each run so the shared update dedup window does not drop a rerun
+        self._next_update_id = int(time.time() * 1000) % (1 << 31)
+        self._next_message_id = 1
+        self._pending = defaultdict(deque)  # chat_id -> injection times
+        self._webhook_pool = ThreadPoolExecutor(max_workers=32)
+
+        self.calls = Counter()
+        self.rate_limited = Counter()
+        self.latencies = []
+        self.completed_at = []
+        self.injected = 0
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-bot-api', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._webhook_pool.shutdown(wait=False)
+
+    @property
+    def in_flight(self):
+        with self._condition:
+            return sum(len(times) for times in self._pending.values())
+
+    def inject(self, update):
+        """Queue an update (without update_id) for the bot and start its latency clock"""
+        chat_id = self._chat_id(update)
+        with self._condition:
+            update = {'update_id': self._next_update_id, **update}
+            self._next_update_id += 1
+            self._pending[chat_id].append(time.perf_counter())
+            self.injected += 1
+            if self.webhook_url:
+                self._webhook_pool.submit(self._deliver, update)
+            else:
+                self._updates.append(update)
+                self._condition.notify_all()
+
+    @staticmethod
+    def _chat_id(update):
+        if 'callback_query' in update:
+            return update['callback_query']['message']['chat']['id']
+        return update['message']['chat']['id']
+
+    def _deliver(self, update):
+        headers = {'Content-Type': 'application/json'}
+        if self.webhook_secret:
+            headers['X-Telegram-Bot-Api-Secret-Token'] = self.webhook_secret
+        try:
+            urlopen(Request(self.webhook_url, json.dumps(update).encode(), headers), timeout=30).read()
+        except Exception as e:
+            logger.warning(f"Webhook delivery of update {update['update_id']} failed: {str(e)}")
+
+    def _get_updates(self, params):
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        deadline = time.monotonic() + float(params.get('timeout') or 0)
+        with self._condition:
+            # Updates below the offset were confirmed by the bot
+            while self._updates and self._updates[0]['update_id'] < offset:
+                self._updates.popleft()
+            while not self._updates:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return [update for _, update in zip(range(limit), self._updates)]
+
+    def _message(self, params):
+        with self._condition:
+            message_id = params.get('message_id') or self._next_message_id
+            self._next_message_id += 1
+        return {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': params.get('chat_id'), 'type': 'private'},
+            'from': BOT_USER,
+            'text': params.get('text', ''),
+        }
+
+    def _complete(self, chat_id):
+        now = time.perf_counter()
+        with self._condition:
+            pending = self._pending.get(chat_id)
+            if not pending:
+                return
+            self.latencies.append(now - pending.popleft())
+            self.completed_at.append(now)
+
+    def handle(self, method, params):
+        """Return (status, response body) for a Bot API call"""
+        method = method.lower()
+        self.calls[method] += 1
+
+        if method not in NO_FAULT_METHODS:
+            low, high = self.latency_ms
+            time.sleep(random.uniform(low, high) / 1000)
+            if self.error_rate and random.random() < self.error_rate:
+                self.rate_limited[method] += 1
+                return 429, {
+                    'ok': False,
+                    'error_code': 429,
+                    'description': f"Too Many Requests: retry after {self.retry_after}",
+                    'parameters': {'retry_after': self.retry_after},
+                }
+
+        if method == 'getupdates':
+            result = self._get_updates(params)
+        elif method == 'getme':
+            result = BOT_USER
+        elif method == 'setwebhook':
+            self.webhook_url = params.get('url') or None
+            self.webhook_secret = params.get('secret_token')
+            result = True
+        elif method == 'deletewebhook':
+            self.webhook_url = None
+            result = True
+        elif method == 'getwebhookinfo':
+            result = {'url': self.webhook_url or '', 'has_custom_certificate': False, 'pending_update_count': len(self._updates)}
+        elif method in ('sendmessage', 'editmessagetext'):
+            result = self._message(params)
+        else:
+            result = True
+
+        if method in COMPLETING_METHODS:
+            try:
+                self._complete(int(params.get('chat_id')))
+            except (TypeError, ValueError):
+                pass
+        return 200, {'ok': True, 'result': result}
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                content_type = self.headers.get('Content-Type', '')
+                if 'json' in content_type:
+                    params = json.loads(body or b'{}')
+                else:
+                    params = {key: _parse_value(value) for key, value in parse_qsl(body.decode())}
+                # Path is /bot<token>/<method>
+                method = self.path.rstrip('/').rsplit('/', 1)[-1]
+                status, payload = api.handle(method, params)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,103 @@
+"""
+Batched BotInteraction logging for the bot process.
+
+Handlers only append a tuple to an in-memory buffer; a background task
+in the bot's event loop writes the buffer every few seconds (or sooner
+when it fills up) with one INSERT ... SELECT FROM (VALUES ...) per batch,
+resolving Telegram ids to TelegramUser rows inside the statement.
+Logging is best effort: a failed batch is logged and dropped rather than
+retried, so a database outage cannot grow the bot's memory.
+"""
+import asyncio
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class InteractionBuffer:
+    def __init__(self, batch_size=500, flush_interval=2.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup = None
+        self._task = None
+        self.written = 0
+        self.dropped = 0
+
+    def add(self, telegram_user_id, interaction_type, command_or_data, bot_id=None):
+        """Queue one interaction; never touches the database"""
+        with self._lock:
+            self._pending.append((bot_id, telegram_user_id, interaction_type, command_or_data[:100], timezone.now()))
+            full = len(self._pending) >= self.batch_size
+        if full and self._wakeup is not None:
+            self._wakeup.set()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        return pending
+
+    def _insert(self, batch):
+        from .models import BotInteraction, TelegramUser
+
+        placeholders = ', '.join(['(%s::bigint, %s::bigint, %s, %s, %s::timestamptz)'] * len(batch))
+        params = [value for row in batch for value in row]
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {BotInteraction._meta.db_table} (bot_id, telegram_user_id, interaction_type, command_or_data, timestamp)
+                SELECT v.bot_id, u.id, v.interaction_type, v.command_or_data, v.ts
+                FROM (VALUES {placeholders}) AS v(bot_id, telegram_user_id, interaction_type, command_or_data, ts)
+                JOIN {TelegramUser._meta.db_table} u
+                  ON u.telegram_user_id = v.telegram_user_id AND u.bot_id IS NOT DISTINCT FROM v.bot_id
+            """, params)
+            return cursor.rowcount
+
+    def flush(self):
+        """Write everything queued so far; returns the number of rows inserted"""
+        pending = self._drain()
+        inserted = 0
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            try:
+                inserted += self._insert(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                logger.error(f"Dropped {len(batch)} bot interactions: {str(e)}")
+        self.written += inserted
+        return inserted
+
+    async def _run(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._pending:
+                await sync_to_async(self.flush, thread_sensitive=False)()
+
+    def start(self):
+        """Start the periodic flush in the running event loop"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the periodic flush and write whatever is still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await sync_to_async(self.flush, thread_sensitive=False)()
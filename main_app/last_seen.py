@@ -0,0 +1,98 @@
+"""
+Coalesced last-seen tracking for Telegram users.
+
+Every update only writes the user's latest activity time into a Redis
+hash, so a user sending fifty messages a minute costs one hash field,
+not fifty row updates. flush_last_seen() periodically drains the hash
+and applies it with batched UPDATE ... FROM (VALUES ...) statements.
+"""
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection
+from django.utils import timezone
+from redis.exceptions import LockError
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'tbot:last_seen:pending'
+FLUSHING_KEY = 'tbot:last_seen:flushing'
+FLUSH_LOCK_KEY = 'tbot:last_seen:flush_lock'
+
+
+def record_last_seen(telegram_user_id, when=None, bot_id=None):
+    """Remember the latest activity time for a Telegram user of a bot"""
+    # Hash field is "<telegram id>" for the default bot, "<bot id>:<telegram id>" otherwise
+    field = telegram_user_id if bot_id is None else f"{bot_id}:{telegram_user_id}"
+    get_redis().hset(PENDING_KEY, field, (when or timezone.now()).timestamp())
+
+
+def _parse_field(field):
+    if isinstance(field, bytes):
+        field = field.decode()
+    bot_id, _, telegram_user_id = field.rpartition(':')
+    return (int(bot_id) if bot_id else None), int(telegram_user_id)
+
+
+def _apply_batch(batch):
+    from .models import TelegramUser
+    
+    placeholders = ', '.join(['(%s::bigint, %s::bigint, %s::timestamptz)'] * len(batch))
+    params = [value for row in batch for value in row]
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {TelegramUser._meta.db_table} AS t
+            SET last_interaction = v.seen
+            FROM (VALUES {placeholders}) AS v(bot_id, telegram_user_id, seen)
+            WHERE t.telegram_user_id = v.telegram_user_id
+              AND t.bot_id IS NOT DISTINCT FROM v.bot_id
+              AND (t.last_interaction IS NULL OR t.last_interaction < v.seen)
+        """, params)
+        return cursor.rowcount
+
+
+def flush_last_seen(batch_size=1000, lock_timeout=600):
+    """
+    Write pending last-seen times to the database.
+    
+    The pending hash is atomically renamed before it is read, so updates
+    recorded during the flush land in a fresh hash for the next run. A
+    hash left behind by a failed flush is picked up again first; batches
+    commit independently and are idempotent, so replaying one is harmless.
+    Only one flush runs at a time: a second one finds the lock taken and
+    returns 0 instead of renaming a new hash over the one being read.
+    """
+    client = get_redis()
+    lock = client.lock(FLUSH_LOCK_KEY, timeout=lock_timeout)
+    if not lock.acquire(blocking=False):
+        logger.info('Last-seen flush already in progress, skipping')
+        return 0
+    
+    try:
+        if not client.exists(FLUSHING_KEY):
+            if not client.exists(PENDING_KEY):
+                return 0
+            # NX as well, in case a flush outlived its lock and is still reading
+            client.renamenx(PENDING_KEY, FLUSHING_KEY)
+        
+        updated = 0
+        batch = []
+        for field, seen in client.hscan_iter(FLUSHING_KEY, count=batch_size):
+            bot_id, telegram_user_id = _parse_field(field)
+            batch.append((bot_id, telegram_user_id, datetime.fromtimestamp(float(seen), tz=dt_timezone.utc)))
+            if len(batch) >= batch_size:
+                updated += _apply_batch(batch)
+                batch = []
+        if batch:
+            updated += _apply_batch(batch)
+        client.delete(FLUSHING_KEY)
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            logger.warning(f"Last-seen flush took longer than its {lock_timeout}s lock")
+    
+    logger.info(f"Flushed last-seen times: {updated} users updated")
+    return updated
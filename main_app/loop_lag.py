@@ -0,0 +1,67 @@
+"""
+Event loop lag monitor.
+
+A coroutine sleeps for a short interval and measures how late it wakes
+up. Any time the loop spends in blocking code (a synchronous broker
+publish, a DB call outside a thread, heavy CPU work) shows up directly
+as lag. Recent samples are kept for percentiles, and lag above
+LOOP_LAG_WARN_MS is logged as it happens.
+"""
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class LoopLagMonitor:
+    def __init__(self, interval=0.1, warn_ms=100, samples=3000):
+        self.interval = interval
+        self.warn_ms = warn_ms
+        self._samples = deque(maxlen=samples)
+        self._task = None
+        self.max_lag = 0.0
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self._samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if self.warn_ms and lag * 1000 > self.warn_ms:
+                logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def reset(self):
+        self._samples.clear()
+        self.max_lag = 0.0
+
+    def stats(self):
+        """Lag percentiles over the recent samples, in milliseconds"""
+        lags = sorted(self._samples)
+        return {
+            'samples': len(lags),
+            'p50_ms': round(_percentile(lags, 0.5) * 1000, 2),
+            'p99_ms': round(_percentile(lags, 0.99) * 1000, 2),
+            'max_ms': round(self.max_lag * 1000, 2),
+        }
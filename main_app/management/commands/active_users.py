@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from main_app.active_users import ALL_BOTS, backfill_active_users, count_active_users, validate_active_users
+
+WINDOWS = (('DAU', 1), ('WAU', 7), ('MAU', 30))
+
+
+class Command(BaseCommand):
+    help = 'Report daily/weekly/monthly active users from the HyperLogLog sketches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Report for the window ending on this day (YYYY-MM-DD, default today)')
+        parser.add_argument('--validate', action='store_true',
+                            help='Also compute exact counts and report the estimate error')
+        parser.add_argument('--bot', help="Only count users of this bot config id ('default' for TELEGRAM_BOT_TOKEN)")
+        parser.add_argument('--backfill-days', type=int, default=0,
+                            help='Rebuild sketches for the last N days from BotInteraction before reporting')
+
+    def handle(self, *args, **options):
+        try:
+            end = date.fromisoformat(options['date']) if options['date'] else timezone.now().date()
+        except ValueError:
+            raise CommandError('--date must be in YYYY-MM-DD format')
+        bot_id = self._bot_id(options['bot'])
+
+        for offset in range(options['backfill_days']):
+            day = end - timedelta(days=offset)
+            total = backfill_active_users(day)
+            self.stdout.write(f"Backfilled {day}: {total} (bot, user) pairs")
+
+        scope = 'all bots' if bot_id == ALL_BOTS else f"bot {options['bot']}"
+        self.stdout.write(self.style.SUCCESS(f"Active users of {scope} for window ending {end}:"))
+        for label, days in WINDOWS:
+            if options['validate']:
+                result = validate_active_users(days, end, bot_id)
+                self.stdout.write(
+                    f"{label}: estimate {result['estimate']}, exact {result['exact']} "
+                    f"({result['exact_source']}), error {result['error_pct']:+.3f}%"
+                )
+            else:
+                self.stdout.write(f"{label}: {count_active_users(days, end, bot_id)}")
+
+    @staticmethod
+    def _bot_id(value):
+        if value is None:
+            return ALL_BOTS
+        if value == 'default':
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise CommandError("--bot must be a bot config id or 'default'")
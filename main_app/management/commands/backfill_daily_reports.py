@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+from celery import group
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from main_app.models import DailyReport
+from main_app.reports import compute_daily_report
+from main_app.tasks import compute_daily_report as compute_daily_report_task
+
+
+class Command(BaseCommand):
+    help = 'Compute stored daily reports for past days, in parallel across Celery workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day (YYYY-MM-DD, default INTERACTION_RETENTION_DAYS ago)')
+        parser.add_argument('--end', help='Last day (YYYY-MM-DD, default yesterday)')
+        parser.add_argument('--overwrite', action='store_true', help='Recompute days that already have a report')
+        parser.add_argument('--sync', action='store_true', help='Compute in this process instead of on the workers')
+        parser.add_argument('--wait', action='store_true', help='Wait for the workers and report failures')
+        parser.add_argument('--timeout', type=int, default=3600, help='Seconds to wait with --wait')
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else today - timedelta(days=settings.INTERACTION_RETENTION_DAYS)
+            end = date.fromisoformat(options['end']) if options['end'] else today - timedelta(days=1)
+        except ValueError:
+            raise CommandError('--start and --end must be in YYYY-MM-DD format')
+        if start > end:
+            raise CommandError('--start must not be after --end')
+
+        retained_from = today - timedelta(days=settings.INTERACTION_RETENTION_DAYS)
+        if start < retained_from:
+            self.stdout.write(self.style.WARNING(
+                f"Interactions before {retained_from} have been archived; "
+                f"those days will only have user counts (and active users from the sketches)"
+            ))
+
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        if not options['overwrite']:
+            existing = set(DailyReport.objects.filter(date__gte=start, date__lte=end).values_list('date', flat=True))
+            days = [day for day in days if day not in existing]
+        if not days:
+            self.stdout.write('Nothing to backfill')
+            return
+
+        if options['sync']:
+            for day in days:
+                report = compute_daily_report(day)
+                self.stdout.write(f"{day}: {report.active_users} active, {report.interactions} interactions")
+            self.stdout.write(self.style.SUCCESS(f"Computed {len(days)} daily reports"))
+            return
+
+        # One task per day; each is an independent set of range queries, so workers run them side by side
+        result = group(compute_daily_report_task.s(day.isoformat()) for day in days).apply_async()
+        self.stdout.write(f"Queued {len(days)} daily reports ({days[0]} to {days[-1]})")
+        if options['wait']:
+            outcomes = result.get(timeout=options['timeout'])
+            failed = [outcome for outcome in outcomes if outcome.startswith('Error')]
+            for outcome in failed:
+                self.stdout.write(self.style.ERROR(outcome))
+            self.stdout.write(self.style.SUCCESS(f"Computed {len(days) - len(failed)} daily reports, {len(failed)} failed"))
@@ -0,0 +1,81 @@
+import asyncio
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from main_app.callback_router import CallbackRouter
+from main_app.interaction_log import InteractionBuffer
+
+
+async def _noop_handler(update, context, *args):
+    pass
+
+
+async def _noop_answer(*args, **kwargs):
+    pass
+
+
+def _fake_update(data, user_id):
+    query = SimpleNamespace(data=data, from_user=SimpleNamespace(id=user_id), answer=_noop_answer)
+    return SimpleNamespace(callback_query=query)
+
+
+class Command(BaseCommand):
+    help = 'Measure per-update overhead of callback dispatch (no network or database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--routes', type=int, default=50, help='Registered callback routes')
+        parser.add_argument('--updates', type=int, default=100000, help='Updates per run')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per variant (median is reported)')
+
+    def handle(self, *args, **options):
+        routes = options['routes']
+        names = [f"action_{n}" for n in range(routes)]
+
+        # The buffer is never flushed here, so only the append cost is measured
+        buffer = InteractionBuffer(batch_size=options['updates'] * options['repeat'] * 4)
+        router = CallbackRouter(interaction_log=buffer)
+        for n, name in enumerate(names):
+            router.route(name, format(n, 'x'), args=(int,))(_noop_handler)
+        router_unlogged = CallbackRouter()
+        for n, name in enumerate(names):
+            router_unlogged.route(name, format(n, 'x'), args=(int,))(_noop_handler)
+
+        # Equivalent of the old if/elif chain over plain string callback_data
+        async def linear_dispatch(update, context):
+            data = update.callback_query.data
+            for name in names:
+                if data == name:
+                    await _noop_handler(update, context)
+                    return
+
+        rng = random.Random(0)
+        picks = [rng.randrange(routes) for _ in range(options['updates'])]
+        encoded = [_fake_update(router.encode(names[n], rng.randrange(1000)), 1000 + n) for n in picks]
+        plain = [_fake_update(names[n], 1000 + n) for n in picks]
+
+        variants = [
+            ('if/elif chain', linear_dispatch, plain),
+            ('registry', router_unlogged.dispatch, encoded),
+            ('registry + logging', router.dispatch, encoded),
+        ]
+
+        async def run(dispatch, updates):
+            for update in updates:
+                await dispatch(update, None)
+
+        self.stdout.write(
+            f"{routes} routes, {options['updates']} updates, median of {options['repeat']} runs:"
+        )
+        for name, dispatch, updates in variants:
+            asyncio.run(run(dispatch, updates[:1000]))  # warm up
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                asyncio.run(run(dispatch, updates))
+                timings.append(time.perf_counter() - started)
+            per_update = statistics.median(timings) / len(updates) * 1e6
+            self.stdout.write(f"  {name:<20} {per_update:7.2f} µs/update")
@@ -0,0 +1,47 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from main_app.models import TelegramUser
+from main_app.renderers import ORJSONRenderer
+from main_app.serializers import TelegramUserSerializer, TelegramUserReadSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare TelegramUser list serialization paths (query + serialize + render)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows per run')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per variant (median is reported)')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        available = TelegramUser.objects.count()
+        if available < rows:
+            raise CommandError(
+                f"Only {available} Telegram users in the database; "
+                f"run generate_synthetic_data or pass a smaller --rows"
+            )
+
+        queryset = lambda: TelegramUser.objects.order_by('id')[:rows]
+        variants = [
+            ('ModelSerializer + json', lambda: JSONRenderer().render(TelegramUserSerializer(queryset(), many=True).data)),
+            ('values() + json', lambda: JSONRenderer().render(TelegramUserReadSerializer(queryset()).data)),
+            ('ModelSerializer + orjson', lambda: ORJSONRenderer().render(TelegramUserSerializer(queryset(), many=True).data)),
+            ('values() + orjson', lambda: ORJSONRenderer().render(TelegramUserReadSerializer(queryset()).data)),
+        ]
+
+        baseline = None
+        self.stdout.write(f"{rows} rows, median of {options['repeat']} runs (ms per 10k rows):")
+        for name, run in variants:
+            run()  # warm up
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - started)
+            per_10k = statistics.median(timings) * 1000 * 10000 / rows
+            baseline = baseline or per_10k
+            self.stdout.write(f"  {name:<26} {per_10k:9.1f} ms  ({baseline / per_10k:.1f}x)")
@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from celery import current_app
+from django.core.management.base import BaseCommand
+
+from main_app.loop_lag import LoopLagMonitor
+from main_app.task_outbox import TaskOutbox
+from main_app.tasks import flush_last_seen
+
+
+class Command(BaseCommand):
+    help = 'Measure event loop lag while dispatching Celery tasks with .delay() vs the task outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=500, help='Tasks dispatched per variant')
+        parser.add_argument('--rate', type=float, default=200.0, help='Dispatches per second')
+        parser.add_argument(
+            '--broker-url', default=None,
+            help='Override the broker, e.g. redis://127.0.0.1:1/0 to measure an unreachable broker'
+        )
+        parser.add_argument('--drain-timeout', type=float, default=10.0, help='Seconds to wait for the outbox to drain')
+
+    def handle(self, *args, **options):
+        if options['broker_url']:
+            current_app.conf.broker_url = options['broker_url']
+        count = options['tasks']
+        interval = 1 / options['rate']
+        # flush_last_seen is idempotent, so the dispatched tasks are harmless if a worker runs them
+        task = flush_last_seen
+
+        async def direct():
+            errors = 0
+            for _ in range(count):
+                try:
+                    task.delay()
+                except Exception:
+                    errors += 1
+                await asyncio.sleep(interval)
+            return f"{errors} publish errors"
+
+        async def outboxed():
+            outbox = TaskOutbox(maxsize=count, batch_size=100)
+            for _ in range(count):
+                outbox.submit(task)
+                await asyncio.sleep(interval)
+            await asyncio.get_running_loop().run_in_executor(None, outbox.stop, options['drain_timeout'])
+            return f"outbox {outbox.stats()}"
+
+        async def measure(variant):
+            monitor = LoopLagMonitor(interval=0.005, warn_ms=0, samples=100000)
+            monitor.start()
+            started = time.perf_counter()
+            detail = await variant()
+            elapsed = time.perf_counter() - started
+            await monitor.stop()
+            return elapsed, monitor.stats(), detail
+
+        self.stdout.write(
+            f"{count} tasks at {options['rate']:.0f}/s, broker {current_app.conf.broker_url}:"
+        )
+        for name, variant in [('.delay()', direct), ('outbox', outboxed)]:
+            elapsed, lag, detail = asyncio.run(measure(variant))
+            self.stdout.write(
+                f"  {name:<9} {elapsed:6.2f}s  loop lag p50 {lag['p50_ms']} ms, "
+                f"p99 {lag['p99_ms']} ms, max {lag['max_ms']} ms  ({detail})"
+            )
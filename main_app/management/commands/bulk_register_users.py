@@ -0,0 +1,71 @@
+import csv
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.accounts import ACCOUNT_FIELDS, bulk_register_users
+
+
+def _csv_rows(fileobj):
+    reader = csv.DictReader(fileobj)
+    unknown = set(reader.fieldnames or ()) - set(ACCOUNT_FIELDS)
+    if unknown:
+        raise CommandError(f"Unknown columns: {', '.join(sorted(unknown))}")
+    yield from reader
+
+
+def _ndjson_rows(fileobj):
+    for line_no, line in enumerate(fileobj, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise CommandError(f"Line {line_no} is not valid JSON: {str(e)}")
+
+
+class Command(BaseCommand):
+    help = 'Create API users (with profiles) in bulk from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file with username, email, password, first_name, last_name, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='Input format (defaults to the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users created per transaction')
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing threads (default: CPU count)')
+        parser.add_argument('--no-email', action='store_true', help='Do not send welcome emails')
+        parser.add_argument('--rejects', help='Write rejected rows (row_no, username, reason) to this CSV file')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        read_rows = _ndjson_rows if input_format == 'ndjson' else _csv_rows
+
+        source = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        started = time.perf_counter()
+        try:
+            result = bulk_register_users(
+                read_rows(source),
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                send_emails=not options['no_email'],
+            )
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        elapsed = time.perf_counter() - started
+
+        if options['rejects']:
+            with open(options['rejects'], 'w', newline='', encoding='utf-8') as rejects_file:
+                rejects = csv.writer(rejects_file)
+                rejects.writerow(['row_no', 'username', 'reason'])
+                rejects.writerows([error['row'], error['username'], error['reason']] for error in result['errors'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {result['rows']} rows in {elapsed:.1f}s: {result['created']} users created, "
+            f"{result['rejected']} rejected ({result['created'] / max(elapsed, 1e-9):.0f} users/s)"
+        ))
+        if result['rejected'] and not options['rejects']:
+            self.stdout.write(self.style.WARNING('Pass --rejects <file> to see why rows were rejected'))
@@ -0,0 +1,230 @@
+import io
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+
+from main_app.models import TelegramUser, BotInteraction, BroadcastMessage
+from main_app.pg_copy import copy_text_row
+
+FIRST_NAMES = ['Alex', 'Maria', 'Ivan', 'Priya', 'John', 'Aisha', 'Chen', 'Sofia', 'Omar', 'Lena',
+               'Rahul', 'Emma', 'Yuki', 'Carlos', 'Fatima', 'Noah', 'Olga', 'Arjun', 'Mia', 'Leo']
+LAST_NAMES = ['Smith', 'Ivanova', 'Sharma', 'Garcia', 'Kim', 'Müller', 'Rossi', 'Khan', 'Silva', 'Tanaka',
+              'Novak', 'Brown', 'Patel', 'Lopez', 'Nguyen', 'Cohen', 'Dubois', 'Costa', 'Singh', 'Lee']
+COMMANDS = ['/start', '/help']
+CALLBACKS = ['stats', 'endpoints', 'bot_stats', 'help', 'back_to_menu']
+MESSAGES = ['hi', 'hello', 'thanks', 'how does this work?', 'ok', '👍']
+
+USER_COLUMNS = ('id', 'telegram_username', 'telegram_user_id', 'first_name', 'last_name',
+                'created_at', 'last_interaction', 'is_active')
+INTERACTION_COLUMNS = ('telegram_user_id', 'interaction_type', 'command_or_data', 'timestamp')
+GENERATOR_OPTIONS = ('users', 'interactions', 'broadcasts', 'days', 'active_ratio', 'username_ratio',
+                     'callback_ratio', 'message_ratio', 'skew', 'telegram_id_base', 'chunk_size', 'workers', 'seed')
+BROADCAST_COLUMNS = ('title', 'message', 'created_by_id', 'created_at', 'sent_at', 'total_recipients',
+                     'successful_sends', 'failed_sends', 'is_sent', 'send_window_minutes', 'spread_by_activity')
+
+
+def _random_moment(rng, now, days):
+    return now - timedelta(seconds=rng.random() * days * 86400)
+
+
+def _user_rows(rng, first_id, count, options, now):
+    for pk in range(first_id, first_id + count):
+        created_at = _random_moment(rng, now, options['days'])
+        last_interaction = created_at + (now - created_at) * rng.random()
+        username = f"synthetic_{pk}" if rng.random() < options['username_ratio'] else None
+        yield (
+            pk,
+            username,
+            options['telegram_id_base'] + pk,
+            rng.choice(FIRST_NAMES),
+            rng.choice(LAST_NAMES) if rng.random() < 0.7 else None,
+            created_at,
+            last_interaction,
+            rng.random() < options['active_ratio'],
+        )
+
+
+def _interaction_rows(rng, user_ids, count, options, now):
+    n_users = len(user_ids)
+    skew = options['skew']
+    callback_ratio = options['callback_ratio']
+    message_ratio = options['message_ratio'] + callback_ratio
+    for _ in range(count):
+        # rng.random() ** skew concentrates activity on a small set of heavy users
+        user_id = user_ids[min(int(n_users * rng.random() ** skew), n_users - 1)]
+        roll = rng.random()
+        if roll < callback_ratio:
+            interaction_type, data = 'callback', rng.choice(CALLBACKS)
+        elif roll < message_ratio:
+            interaction_type, data = 'message', rng.choice(MESSAGES)
+        else:
+            interaction_type, data = 'command', rng.choice(COMMANDS)
+        yield user_id, interaction_type, data, _random_moment(rng, now, options['days'])
+
+
+def _broadcast_rows(rng, count, created_by_id, options, now):
+    for i in range(count):
+        created_at = _random_moment(rng, now, options['days'])
+        is_sent = rng.random() < 0.8
+        total = rng.randint(100, 100000) if is_sent else 0
+        failed = int(total * rng.random() * 0.05)
+        yield (
+            f"Synthetic broadcast #{i + 1}",
+            f"Synthetic broadcast body #{i + 1}",
+            created_by_id,
+            created_at,
+            created_at + timedelta(minutes=rng.randint(1, 120)) if is_sent else None,
+            total,
+            total - failed,
+            failed,
+            is_sent,
+            0,
+            False,
+        )
+
+
+# Populated in the parent before forking so workers inherit the id list instead of unpickling it per chunk
+_shared_user_ids = None
+
+
+def _share_user_ids(user_ids):
+    global _shared_user_ids
+    _shared_user_ids = user_ids
+
+
+def _copy_chunk(kind, chunk_index, start, count, options, extra):
+    """Render one chunk as COPY text and stream it in (runs in a worker process)"""
+    rng = random.Random(f"{options['seed']}:{kind}:{chunk_index}")
+    now = options['now']
+
+    if kind == 'users':
+        table, columns = TelegramUser._meta.db_table, USER_COLUMNS
+        rows = _user_rows(rng, start, count, options, now)
+    elif kind == 'interactions':
+        table, columns = BotInteraction._meta.db_table, INTERACTION_COLUMNS
+        rows = _interaction_rows(rng, _shared_user_ids, count, options, now)
+    else:
+        table, columns = BroadcastMessage._meta.db_table, BROADCAST_COLUMNS
+        rows = _broadcast_rows(rng, count, extra, options, now)
+
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(copy_text_row(row))
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+    return count
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic TelegramUser, BotInteraction and BroadcastMessage data with COPY'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, help='Number of Telegram users to create')
+        parser.add_argument('--interactions', type=int, default=1000000, help='Number of bot interactions to create')
+        parser.add_argument('--broadcasts', type=int, default=0, help='Number of broadcast messages to create')
+        parser.add_argument('--days', type=int, default=90, help='Spread timestamps over the last N days')
+        parser.add_argument('--active-ratio', type=float, default=0.9, help='Share of users with is_active=True')
+        parser.add_argument('--username-ratio', type=float, default=0.75, help='Share of users that have a username')
+        parser.add_argument('--callback-ratio', type=float, default=0.5, help='Share of interactions that are callbacks')
+        parser.add_argument('--message-ratio', type=float, default=0.1, help='Share of interactions that are messages')
+        parser.add_argument('--skew', type=float, default=3.0,
+                            help='Activity skew across users (1 = uniform, higher = more power-law)')
+        parser.add_argument('--telegram-id-base', type=int, default=9_000_000_000,
+                            help='Offset added to row ids to build synthetic telegram_user_id values')
+        parser.add_argument('--chunk-size', type=int, default=50000, help='Rows per COPY chunk')
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Parallel COPY workers')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for reproducible datasets')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('generate_synthetic_data requires PostgreSQL (it streams rows with COPY)')
+        if options['callback_ratio'] + options['message_ratio'] > 1:
+            raise CommandError('--callback-ratio and --message-ratio must add up to at most 1')
+        if options['skew'] < 1:
+            raise CommandError('--skew must be >= 1')
+
+        options = {name: options[name] for name in GENERATOR_OPTIONS}
+        options['now'] = timezone.now()
+        started = time.monotonic()
+        total_rows = 0
+
+        if options['users']:
+            first_id = self._reserve_user_ids(options['users'], options['telegram_id_base'])
+            total_rows += self._run_parallel('users', options['users'], options, lambda start: start + first_id)
+            self._sync_sequence(TelegramUser)
+            user_ids = range(first_id, first_id + options['users'])
+        else:
+            user_ids = list(TelegramUser.objects.values_list('id', flat=True))
+
+        if options['interactions']:
+            if not user_ids:
+                raise CommandError('Cannot generate interactions without any Telegram users')
+            _share_user_ids(user_ids)
+            total_rows += self._run_parallel('interactions', options['interactions'], options)
+
+        if options['broadcasts']:
+            admin = User.objects.filter(is_superuser=True).order_by('id').first() or User.objects.order_by('id').first()
+            if admin is None:
+                raise CommandError('Cannot generate broadcasts without at least one Django user')
+            total_rows += self._run_parallel('broadcasts', options['broadcasts'], options, extra=admin.id)
+
+        with connection.cursor() as cursor:
+            for model in (TelegramUser, BotInteraction, BroadcastMessage):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {total_rows} rows in {elapsed:.1f}s ({total_rows / max(elapsed, 1e-9) * 60:,.0f} rows/min)"
+        ))
+
+    def _reserve_user_ids(self, count, telegram_id_base):
+        """Pick the block of primary keys this run will write explicitly"""
+        table = TelegramUser._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+            first_id = cursor.fetchone()[0] + 1
+        # Synthetic telegram ids are derived from the row id, so a clash means an older run used the same base
+        first_telegram_id = telegram_id_base + first_id
+        if TelegramUser.objects.filter(
+            telegram_user_id__range=(first_telegram_id, first_telegram_id + count - 1)
+        ).exists():
+            raise CommandError('Synthetic telegram_user_id range already in use; pass a different --telegram-id-base')
+        return first_id
+
+    def _sync_sequence(self, model):
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"
+            )
+
+    def _run_parallel(self, kind, total, options, start_for=None, extra=None):
+        chunk_size = options['chunk_size']
+        chunks = [(index, offset, min(chunk_size, total - offset))
+                  for index, offset in enumerate(range(0, total, chunk_size))]
+
+        # Forked workers must not share the parent's database socket
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        written = 0
+        started = time.monotonic()
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=context) as pool:
+            futures = [
+                pool.submit(_copy_chunk, kind, index, start_for(offset) if start_for else offset, count, options, extra)
+                for index, offset, count in chunks
+            ]
+            for future in as_completed(futures):
+                written += future.result()
+                self.stdout.write(f"\r{kind}: {written}/{total}", ending='')
+        self.stdout.write('')
+        self.stdout.write(f"{kind}: {written} rows in {time.monotonic() - started:.1f}s")
+        return written
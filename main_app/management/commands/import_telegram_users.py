@@ -0,0 +1,54 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from main_app.user_import import ImportFormatError, USERNAME_CONFLICT_POLICIES, import_telegram_users
+
+
+class Command(BaseCommand):
+    help = 'Bulk import Telegram users from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='Input format (defaults to the file extension)')
+        parser.add_argument('--on-username-conflict', choices=USERNAME_CONFLICT_POLICIES, default='null',
+                            help='Clear usernames owned by another user, or reject those rows')
+        parser.add_argument('--rejects', help='Write rejected rows (row_no, telegram_user_id, reason) to this CSV file')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('import_telegram_users requires PostgreSQL (it loads rows with COPY)')
+
+        path = options['path']
+        import_format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+
+        rejects_file = open(options['rejects'], 'w', newline='', encoding='utf-8') if options['rejects'] else None
+        source = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            rejects = None
+            if rejects_file:
+                rejects = csv.writer(rejects_file)
+                rejects.writerow(['row_no', 'telegram_user_id', 'reason'])
+            result = import_telegram_users(
+                source,
+                import_format=import_format,
+                on_username_conflict=options['on_username_conflict'],
+                rejects=rejects,
+            )
+        except ImportFormatError as e:
+            raise CommandError(str(e))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if rejects_file:
+                rejects_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['rows']} rows: {result['inserted']} inserted, {result['updated']} updated, "
+            f"{result['rejected']} rejected, {result['usernames_cleared']} usernames cleared"
+        ))
+        if result['rejected'] and not options['rejects']:
+            self.stdout.write(self.style.WARNING('Pass --rejects <file> to see why rows were rejected'))
@@ -0,0 +1,184 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from main_app.bot_trace import DEFAULT_MIX, generate_trace, read_trace, write_trace
+from main_app.fake_bot_api import FakeBotAPI
+
+DB_COUNTERS = ('xact_commit', 'tup_returned', 'tup_fetched', 'tup_inserted', 'tup_updated', 'tup_deleted', 'blks_read', 'blks_hit')
+
+
+def _db_counters():
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join(DB_COUNTERS)} FROM pg_stat_database WHERE datname = current_database()")
+        return dict(zip(DB_COUNTERS, cursor.fetchone()))
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def _parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        kind, _, weight = part.partition('=')
+        if kind not in DEFAULT_MIX:
+            raise CommandError(f"Unknown update kind {kind!r} in --mix (use {', '.join(DEFAULT_MIX)})")
+        mix[kind] = float(weight)
+    return mix
+
+
+class Command(BaseCommand):
+    help = 'Replay a synthetic update trace against the bot through a local fake Bot API server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=float, default=50.0, help='Target updates per second')
+        parser.add_argument('--duration', type=float, default=60.0, help='Trace length in seconds')
+        parser.add_argument('--users', type=int, default=1000, help='Distinct Telegram users in the trace')
+        parser.add_argument('--mix', type=_parse_mix, default=None, help='e.g. start=0.2,help=0.1,callback=0.7')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--trace-in', help='Replay a trace saved with --trace-out instead of generating one')
+        parser.add_argument('--trace-out', help='Save the generated trace as NDJSON')
+        parser.add_argument('--port', type=int, default=8081, help='Fake Bot API port')
+        parser.add_argument('--latency-ms', default='20,80', help='Simulated Bot API latency range (min,max)')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of bot calls answered with 429')
+        parser.add_argument('--spawn-bot', action='store_true', help='Start run_telegram_bot against the fake server')
+        parser.add_argument('--bot-settings', default='internship_project.settings_bot', help='Settings module for --spawn-bot')
+        parser.add_argument('--webhook', action='store_true', help='Have the spawned bot use a webhook instead of polling')
+        parser.add_argument('--webhook-port', type=int, default=8444)
+        parser.add_argument('--drain-timeout', type=float, default=30.0, help='Seconds to wait for in-flight updates')
+
+    def handle(self, *args, **options):
+        if options['trace_in']:
+            trace = read_trace(options['trace_in'])
+        else:
+            trace = generate_trace(
+                options['rate'], options['duration'], users=options['users'],
+                mix=options['mix'], seed=options['seed'],
+            )
+        if options['trace_out']:
+            write_trace(trace, options['trace_out'])
+        if not trace:
+            raise CommandError('The trace is empty')
+
+        low, _, high = options['latency_ms'].partition(',')
+        api = FakeBotAPI(
+            port=options['port'],
+            latency_ms=(float(low), float(high or low)),
+            error_rate=options['error_rate'],
+        ).start()
+        self.stdout.write(f"Fake Bot API listening on {api.base_url}")
+
+        bot = None
+        try:
+            if options['spawn_bot']:
+                bot = self._spawn_bot(api, options)
+            self._wait_for_bot(api, options['webhook'])
+            self._run(api, trace, options)
+        finally:
+            if bot is not None:
+                bot.terminate()
+                bot.wait(timeout=30)
+            api.stop()
+
+    def _spawn_bot(self, api, options):
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': options['bot_settings'],
+            'TELEGRAM_API_BASE_URL': api.base_url,
+            'TELEGRAM_BOT_TOKEN': settings.TELEGRAM_BOT_TOKEN or '123456:loadtest',
+        }
+        if options['webhook']:
+            env.update(
+                TELEGRAM_WEBHOOK_URL=f"http://127.0.0.1:{options['webhook_port']}/telegram",
+                TELEGRAM_WEBHOOK_LISTEN='127.0.0.1',
+                TELEGRAM_WEBHOOK_PORT=str(options['webhook_port']),
+                TELEGRAM_WEBHOOK_PATH='telegram',
+            )
+        manage_py = os.path.join(settings.BASE_DIR, 'manage.py')
+        return subprocess.Popen([sys.executable, manage_py, 'run_telegram_bot'], env=env)
+
+    def _wait_for_bot(self, api, webhook, timeout=60):
+        self.stdout.write('Waiting for the bot to connect...')
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if (api.webhook_url if webhook else api.calls['getupdates']):
+                return
+            time.sleep(0.2)
+        raise CommandError(f"The bot did not connect to {api.base_url} within {timeout}s")
+
+    def _run(self, api, trace, options):
+        peak_connections = [0]
+        sampling = threading.Event()
+
+        def sample_connections():
+            from django.db import connection as sampler_connection
+            try:
+                while not sampling.wait(1.0):
+                    with sampler_connection.cursor() as cursor:
+                        cursor.execute('SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()')
+                        peak_connections[0] = max(peak_connections[0], cursor.fetchone()[0])
+            finally:
+                sampler_connection.close()
+
+        sampler = threading.Thread(target=sample_connections, daemon=True)
+        before = _db_counters()
+        sampler.start()
+
+        self.stdout.write(f"Replaying {len(trace)} updates over {trace[-1][0]:.1f}s...")
+        started = time.perf_counter()
+        max_behind = 0.0
+        for offset, update in trace:
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                max_behind = max(max_behind, -delay)
+            api.inject(update)
+        injected_in = time.perf_counter() - started
+
+        deadline = time.monotonic() + options['drain_timeout']
+        while api.in_flight and time.monotonic() < deadline:
+            time.sleep(0.1)
+        sampling.set()
+        sampler.join()
+        # pg_stat_database is updated asynchronously
+        time.sleep(1.0)
+        after = _db_counters()
+
+        self._report(api, started, injected_in, max_behind, before, after, peak_connections[0])
+
+    def _report(self, api, started, injected_in, max_behind, before, after, peak_connections):
+        completed = len(api.latencies)
+        elapsed = (max(api.completed_at) - started) if completed else 0.0
+        latencies = sorted(value * 1000 for value in api.latencies)
+
+        self.stdout.write('')
+        self.stdout.write(f"Updates:     {api.injected} injected in {injected_in:.1f}s "
+                          f"({api.injected / injected_in:.1f}/s offered, injector max {max_behind * 1000:.0f} ms behind)")
+        self.stdout.write(f"Completed:   {completed} ({api.in_flight} still in flight)")
+        if completed:
+            self.stdout.write(f"Throughput:  {completed / elapsed:.1f} updates/s")
+            self.stdout.write(
+                'Latency:     ' + '  '.join(
+                    f"{label} {_percentile(latencies, fraction):.0f} ms"
+                    for label, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))
+                )
+            )
+        self.stdout.write('Bot API:     ' + ', '.join(f"{method} {count}" for method, count in api.calls.most_common()))
+        if api.rate_limited:
+            self.stdout.write(f"429s served: {sum(api.rate_limited.values())}")
+
+        per_update = max(completed, 1)
+        self.stdout.write(f"Database:    peak {peak_connections} connections")
+        for counter in DB_COUNTERS:
+            delta = after[counter] - before[counter]
+            self.stdout.write(f"  {counter:<13} {delta:>10}  ({delta / per_update:.1f} per update)")
@@ -0,0 +1,86 @@
+import os
+import statistics
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# What each process type imports before it can serve its first request/update/task
+PROCESS_PROFILES = {
+    'web': ('internship_project.settings', ['internship_project.wsgi', 'internship_project.urls']),
+    'bot': ('internship_project.settings_bot', ['main_app.telegram_bot']),
+    'worker': ('internship_project.settings_worker', ['internship_project.celery', 'main_app.tasks']),
+}
+
+STARTUP_SCRIPT = """
+import time
+started = time.perf_counter()
+import django
+django.setup()
+import importlib
+for module in {modules!r}:
+    importlib.import_module(module)
+print(time.perf_counter() - started)
+"""
+
+
+def _parse_importtime(stderr):
+    """Parse `python -X importtime` output into (module, self_us, cumulative_us, depth)"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # One separator space, then two more per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Measure cold-start time and the most expensive imports for each process type'
+
+    def add_arguments(self, parser):
+        parser.add_argument('process', nargs='?', choices=sorted(PROCESS_PROFILES),
+                            help='Process type to profile (default: all)')
+        parser.add_argument('--settings-module', help='Override the settings module used for the run')
+        parser.add_argument('--repeat', type=int, default=3, help='Number of cold starts to time')
+        parser.add_argument('--top', type=int, default=15, help='Number of imports to list')
+
+    def handle(self, *args, **options):
+        processes = [options['process']] if options['process'] else sorted(PROCESS_PROFILES)
+        for process in processes:
+            settings_module, modules = PROCESS_PROFILES[process]
+            self._profile(process, options['settings_module'] or settings_module, modules, options)
+
+    def _run(self, settings_module, modules, importtime):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+        command = [sys.executable]
+        if importtime:
+            command += ['-X', 'importtime']
+        command += ['-c', STARTUP_SCRIPT.format(modules=modules)]
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise CommandError(f"Startup failed with {settings_module}:\n{result.stderr[-2000:]}")
+        return float(result.stdout.strip().splitlines()[-1]), result.stderr
+
+    def _profile(self, process, settings_module, modules, options):
+        timings = [self._run(settings_module, modules, importtime=False)[0] for _ in range(options['repeat'])]
+        _, stderr = self._run(settings_module, modules, importtime=True)
+        rows = _parse_importtime(stderr)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{process} ({settings_module}): median {statistics.median(timings) * 1000:.0f} ms "
+            f"over {len(timings)} cold starts, {len(rows)} modules imported"
+        ))
+
+        top_level = sorted((row for row in rows if row[3] == 0), key=lambda row: row[2], reverse=True)
+        self.stdout.write(f"  Top {options['top']} top-level imports by cumulative time:")
+        for name, _, cumulative_us, _ in top_level[:options['top']]:
+            self.stdout.write(f"    {cumulative_us / 1000:8.1f} ms  {name}")
+
+        by_self = sorted(rows, key=lambda row: row[1], reverse=True)
+        self.stdout.write(f"  Top {options['top']} modules by self time:")
+        for name, self_us, _, _ in by_self[:options['top']]:
+            self.stdout.write(f"    {self_us / 1000:8.1f} ms  {name}")
+        self.stdout.write('')
@@ -0,0 +1,76 @@
+import json
+import statistics
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main_app.management.commands.slow_tasks import _parse_window
+
+
+class Command(BaseCommand):
+    help = 'Summarize profiles written by the sampling profiler and merge their stacks for a flamegraph'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=['api', 'bot'], help='Only API views or only bot handlers')
+        parser.add_argument('--name', help='Only profiles of this view/handler (e.g. start_command)')
+        parser.add_argument('--since', default='24h', help='Only profiles newer than this (e.g. 30m, 6h, 2d)')
+        parser.add_argument('--top', type=int, default=15, help='Functions to list by self time')
+        parser.add_argument('--merge', metavar='PATH', help='Write all matching stacks to one .folded file')
+
+    def handle(self, *args, **options):
+        since = time.time() - _parse_window(options['since'])
+
+        targets = [options['target']] if options['target'] else ['api', 'bot']
+        summaries, stacks = [], Counter()
+        for target in targets:
+            directory = settings.PROFILING_DIR / target
+            if not directory.is_dir():
+                continue
+            for summary_path in directory.glob('*.json'):
+                if summary_path.stat().st_mtime < since:
+                    continue
+                summary = json.loads(summary_path.read_text(encoding='utf-8'))
+                if options['name'] and summary['name'] != options['name']:
+                    continue
+                summaries.append(summary)
+                folded_path = summary_path.with_suffix('.folded')
+                if folded_path.exists():
+                    for line in folded_path.read_text(encoding='utf-8').splitlines():
+                        stack, _, count = line.rpartition(' ')
+                        stacks[stack] += int(count)
+
+        if not summaries:
+            self.stdout.write('No profiles found')
+            return
+
+        by_name = {}
+        for summary in summaries:
+            by_name.setdefault((summary['target'], summary['name']), []).append(summary)
+        self.stdout.write(self.style.SUCCESS(f"{len(summaries)} profiles since {options['since']} ago:"))
+        for (target, name), group in sorted(by_name.items(), key=lambda item: -len(item[1])):
+            durations = sorted(summary['duration_ms'] for summary in group)
+            p99 = durations[min(len(durations) - 1, int(0.99 * len(durations)))]
+            sql_ms = statistics.mean(summary['sql_time_ms'] for summary in group)
+            queries = statistics.mean(summary['sql_queries'] for summary in group)
+            self.stdout.write(
+                f"  [{target}] {name}: {len(group)} profiles, p50 {statistics.median(durations):.1f} ms, "
+                f"p99 {p99:.1f} ms, SQL {sql_ms:.1f} ms in {queries:.1f} queries on average"
+            )
+
+        # Self time: samples where the function is the innermost frame
+        leaves = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        total = sum(leaves.values())
+        if total:
+            self.stdout.write(self.style.SUCCESS(f"Top functions by self samples ({total} samples):"))
+            for function, count in leaves.most_common(options['top']):
+                self.stdout.write(f"  {count / total:6.1%}  {function}")
+
+        if options['merge']:
+            with open(options['merge'], 'w', encoding='utf-8') as merged:
+                for stack, count in stacks.most_common():
+                    merged.write(f"{stack} {count}\n")
+            self.stdout.write(f"Merged stacks written to {options['merge']} (render with flamegraph.pl or speedscope)")
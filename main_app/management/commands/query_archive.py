@@ -0,0 +1,46 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.archive import archive_interactions, summarize_archive
+
+GROUP_BY = {
+    'day': 'day',
+    'type': 'interaction_type',
+    'command': 'command_or_data',
+}
+
+
+class Command(BaseCommand):
+    help = 'Summarize archived bot interactions without querying PostgreSQL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('start', help='First day to include (YYYY-MM-DD)')
+        parser.add_argument('end', help='Last day to include (YYYY-MM-DD)')
+        parser.add_argument('--group-by', choices=sorted(GROUP_BY), default='day')
+        parser.add_argument('--top', type=int, default=0, help='Only show the N largest groups')
+        parser.add_argument('--archive-now', action='store_true',
+                            help='Archive interactions past the retention window before querying')
+
+    def handle(self, *args, **options):
+        try:
+            start, end = date.fromisoformat(options['start']), date.fromisoformat(options['end'])
+        except ValueError:
+            raise CommandError('start and end must be in YYYY-MM-DD format')
+
+        if options['archive_now']:
+            self.stdout.write(f"Archived {archive_interactions()} interactions")
+
+        counts, unique_users = summarize_archive(start, end, group_by=GROUP_BY[options['group_by']])
+        if options['group_by'] == 'day':
+            groups = sorted(counts.items())
+        else:
+            groups = counts.most_common()
+        if options['top']:
+            groups = sorted(groups, key=lambda item: item[1], reverse=True)[:options['top']]
+
+        for key, count in groups:
+            self.stdout.write(f"{key}\t{count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(counts.values())} interactions from {unique_users} unique users between {start} and {end}"
+        ))
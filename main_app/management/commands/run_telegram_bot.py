@@ -1,13 +1,20 @@
 from django.core.management.base import BaseCommand
-from main_app.telegram_bot import run_telegram_bot
 
 class Command(BaseCommand):
     help = 'Run the Telegram bot'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--multi', action='store_true', help='Host every active BotConfig bot in this process')
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting Telegram bot...'))
         try:
-            run_telegram_bot()
+            if options['multi']:
+                from main_app.bot_runtime import run_bots
+                run_bots()
+            else:
+                from main_app.telegram_bot import run_telegram_bot
+                run_telegram_bot()
         except KeyboardInterrupt:
             self.stdout.write(self.style.SUCCESS('Telegram bot stopped.'))
         except Exception as e:
@@ -0,0 +1,76 @@
+import json
+import statistics
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+
+
+def _parse_window(value):
+    try:
+        return float(value[:-1]) * UNITS[value[-1]]
+    except (KeyError, ValueError, IndexError):
+        raise CommandError('--since must look like 30m, 24h or 7d')
+
+
+class Command(BaseCommand):
+    help = 'Summarize slow Celery tasks recorded in the slow task log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', default='24h', help='Time window to summarize (e.g. 30m, 24h, 7d)')
+        parser.add_argument('--task', help='Only include this task name')
+        parser.add_argument('--top', type=int, default=10, help='Number of slowest runs to list')
+        parser.add_argument('--log', default=None, help='Slow task log path (default: TASK_SLOW_LOG_PATH)')
+
+    def handle(self, *args, **options):
+        path = options['log'] or settings.TASK_SLOW_LOG_PATH
+        cutoff = time.time() - _parse_window(options['since'])
+
+        records = []
+        try:
+            with open(path, encoding='utf-8') as log_file:
+                for line in log_file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record['ts'] >= cutoff and (not options['task'] or record['task'] == options['task']):
+                        records.append(record)
+        except FileNotFoundError:
+            raise CommandError(f"No slow task log at {path}")
+
+        if not records:
+            self.stdout.write(f"No slow tasks in the last {options['since']}")
+            return
+
+        by_task = defaultdict(list)
+        for record in records:
+            by_task[record['task']].append(record)
+
+        self.stdout.write(self.style.SUCCESS(f"Slow tasks in the last {options['since']}:"))
+        self.stdout.write(f"{'task':<50} {'runs':>5} {'p50 ms':>10} {'max ms':>10} {'queue ms':>10} {'queries':>8} {'db ms':>10}")
+        for task, runs in sorted(by_task.items(), key=lambda item: -max(r['runtime_ms'] for r in item[1])):
+            latencies = [r['queue_latency_ms'] for r in runs if r['queue_latency_ms'] is not None]
+            self.stdout.write(
+                f"{task:<50} {len(runs):>5} "
+                f"{statistics.median(r['runtime_ms'] for r in runs):>10.0f} "
+                f"{max(r['runtime_ms'] for r in runs):>10.0f} "
+                f"{statistics.median(latencies) if latencies else 0:>10.0f} "
+                f"{statistics.mean(r['db_queries'] for r in runs):>8.0f} "
+                f"{statistics.mean(r['db_time_ms'] for r in runs):>10.0f}"
+            )
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f"Slowest {options['top']} runs:"))
+        for record in sorted(records, key=lambda r: r['runtime_ms'], reverse=True)[:options['top']]:
+            when = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(record['ts']))
+            self.stdout.write(
+                f"{when} {record['task']} [{record['task_id']}] {record['runtime_ms']:.0f} ms, "
+                f"{record['db_queries']} queries / {record['db_time_ms']:.0f} ms, "
+                f"RSS {record.get('rss_delta_kb', '?')} KB, new peak +{record['maxrss_delta_kb']} KB"
+            )
+            for query in record.get('top_queries', [])[:3]:
+                self.stdout.write(f"    {query['total_ms']:>8.1f} ms x{query['count']:<5} {query['sql'][:120]}")
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0003_dataexport'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='telegramuser',
+            name='last_interaction',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.3 on 2026-10-19 14:20
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('main_app', '0004_alter_telegramuser_last_interaction'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='telegramuser',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('telegram_username'), name='gin_trgm_ops'), name='tguser_username_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='telegramuser',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('first_name'), name='gin_trgm_ops'), name='tguser_first_name_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='telegramuser',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('last_name'), name='gin_trgm_ops'), name='tguser_last_name_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='botinteraction',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('command_or_data'), name='gin_trgm_ops'), name='botinteraction_command_trgm'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0005_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='broadcastmessage',
+            name='scheduled_at',
+            field=models.DateTimeField(blank=True, help_text='Start of delivery (empty: when scheduled)', null=True),
+        ),
+        migrations.AddField(
+            model_name='broadcastmessage',
+            name='send_window_minutes',
+            field=models.PositiveIntegerField(default=0, help_text='Spread delivery evenly over this many minutes'),
+        ),
+        migrations.AddField(
+            model_name='broadcastmessage',
+            name='spread_by_activity',
+            field=models.BooleanField(default=False, help_text='Order recipients by their usual active hour'),
+        ),
+        migrations.AddField(
+            model_name='broadcastmessage',
+            name='planned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='BroadcastDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('telegram_user_id', models.BigIntegerField()),
+                ('send_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempted_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.CharField(blank=True, max_length=200)),
+                ('broadcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='main_app.broadcastmessage')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('broadcast', 'telegram_user_id'), name='broadcastdelivery_unique_recipient')],
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['send_at'], name='broadcastdelivery_due')],
+            },
+        ),
+    ]
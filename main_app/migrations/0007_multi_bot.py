@@ -0,0 +1,71 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0006_scheduled_broadcasts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BotConfig',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('token', models.CharField(max_length=100, unique=True)),
+                ('username', models.CharField(blank=True, max_length=100)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='telegramuser',
+            name='bot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='telegram_users', to='main_app.botconfig'),
+        ),
+        migrations.AddField(
+            model_name='botinteraction',
+            name='bot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='main_app.botconfig'),
+        ),
+        migrations.AddField(
+            model_name='broadcastmessage',
+            name='bot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='main_app.botconfig'),
+        ),
+        migrations.AlterField(
+            model_name='telegramuser',
+            name='telegram_username',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='telegramuser',
+            name='telegram_user_id',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AddIndex(
+            model_name='telegramuser',
+            index=models.Index(fields=['telegram_user_id'], name='tguser_telegram_id'),
+        ),
+        migrations.AddConstraint(
+            model_name='telegramuser',
+            constraint=models.UniqueConstraint(fields=('bot', 'telegram_user_id'), name='tguser_bot_telegram_id_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='telegramuser',
+            constraint=models.UniqueConstraint(condition=models.Q(('bot__isnull', True)), fields=('telegram_user_id',), name='tguser_telegram_id_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='telegramuser',
+            constraint=models.UniqueConstraint(fields=('bot', 'telegram_username'), name='tguser_bot_username_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='telegramuser',
+            constraint=models.UniqueConstraint(condition=models.Q(('bot__isnull', True)), fields=('telegram_username',), name='tguser_username_unique'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0007_multi_bot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('new_users', models.IntegerField(default=0)),
+                ('total_users', models.IntegerField(default=0)),
+                ('active_users', models.IntegerField(default=0)),
+                ('interactions', models.IntegerField(default=0)),
+                ('commands', models.IntegerField(default=0)),
+                ('callbacks', models.IntegerField(default=0)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-19 18:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0009_profilingsession'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='telegramuser',
+            name='last_interaction',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True),
+        ),
+    ]
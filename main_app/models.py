@@ -1,16 +1,52 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import User
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.utils import timezone
 
+class BotConfig(models.Model):
+    """A white-label bot hosted by the multi-bot runtime (main_app.bot_runtime)"""
+    name = models.CharField(max_length=100, unique=True)
+    token = models.CharField(max_length=100, unique=True)
+    username = models.CharField(max_length=100, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return self.name
+
 class TelegramUser(models.Model):
-    telegram_username = models.CharField(max_length=100, unique=True, blank=True, null=True)
-    telegram_user_id = models.BigIntegerField(unique=True)
+    # Empty for the bot configured with TELEGRAM_BOT_TOKEN
+    bot = models.ForeignKey(BotConfig, on_delete=models.CASCADE, null=True, blank=True, related_name='telegram_users')
+    telegram_username = models.CharField(max_length=100, blank=True, null=True)
+    telegram_user_id = models.BigIntegerField()
     first_name = models.CharField(max_length=100, blank=True, null=True)
     last_name = models.CharField(max_length=100, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    last_interaction = models.DateTimeField(auto_now=True)
+    # Maintained in batches by main_app.last_seen rather than on every save;
+    # empty for imported users who have not talked to the bot yet
+    last_interaction = models.DateTimeField(default=timezone.now, null=True, blank=True)
     is_active = models.BooleanField(default=True)
     
+    class Meta:
+        # A Telegram account is one TelegramUser per bot; NULLs are distinct, so the
+        # default bot (bot IS NULL) needs its own partial constraints
+        constraints = [
+            models.UniqueConstraint(fields=['bot', 'telegram_user_id'], name='tguser_bot_telegram_id_unique'),
+            models.UniqueConstraint(fields=['telegram_user_id'], condition=models.Q(bot__isnull=True), name='tguser_telegram_id_unique'),
+            models.UniqueConstraint(fields=['bot', 'telegram_username'], name='tguser_bot_username_unique'),
+            models.UniqueConstraint(fields=['telegram_username'], condition=models.Q(bot__isnull=True), name='tguser_username_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['telegram_user_id'], name='tguser_telegram_id'),
+            # Trigram indexes on UPPER(column) serve Django's icontains (UPPER(col) LIKE UPPER(%s))
+            GinIndex(OpClass(Upper('telegram_username'), name='gin_trgm_ops'), name='tguser_username_trgm'),
+            GinIndex(OpClass(Upper('first_name'), name='gin_trgm_ops'), name='tguser_first_name_trgm'),
+            GinIndex(OpClass(Upper('last_name'), name='gin_trgm_ops'), name='tguser_last_name_trgm'),
+        ]
+    
     def __str__(self):
         return f"@{self.telegram_username or 'No Username'}"
     
@@ -38,12 +74,16 @@ class BotInteraction(models.Model):
     ]
     
     telegram_user = models.ForeignKey(TelegramUser, on_delete=models.CASCADE)
+    bot = models.ForeignKey(BotConfig, on_delete=models.CASCADE, null=True, blank=True)
     interaction_type = models.CharField(max_length=20, choices=INTERACTION_TYPES)
     command_or_data = models.CharField(max_length=100)
     timestamp = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            GinIndex(OpClass(Upper('command_or_data'), name='gin_trgm_ops'), name='botinteraction_command_trgm'),
+        ]
     
     def __str__(self):
         return f"{self.telegram_user} - {self.command_or_data}"
@@ -52,12 +92,142 @@ class BroadcastMessage(models.Model):
     title = models.CharField(max_length=200)
     message = models.TextField()
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Sent by this bot to its users; empty means the TELEGRAM_BOT_TOKEN bot
+    bot = models.ForeignKey(BotConfig, on_delete=models.CASCADE, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     sent_at = models.DateTimeField(null=True, blank=True)
     total_recipients = models.IntegerField(default=0)
     successful_sends = models.IntegerField(default=0)
     failed_sends = models.IntegerField(default=0)
     is_sent = models.BooleanField(default=False)
+    # Scheduled delivery (main_app.broadcasts); unset means send everything at once
+    scheduled_at = models.DateTimeField(null=True, blank=True, help_text='Start of delivery (empty: when scheduled)')
+    send_window_minutes = models.PositiveIntegerField(default=0, help_text='Spread delivery evenly over this many minutes')
+    spread_by_activity = models.BooleanField(default=False, help_text="Order recipients by their usual active hour")
+    planned_at = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
         return self.title
+    
+    @property
+    def is_scheduled(self):
+        return self.scheduled_at is not None or self.send_window_minutes > 0
+
+class BroadcastDelivery(models.Model):
+    STATUSES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    broadcast = models.ForeignKey(BroadcastMessage, on_delete=models.CASCADE, related_name='deliveries')
+    telegram_user_id = models.BigIntegerField()
+    send_at = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=STATUSES, default='pending')
+    attempted_at = models.DateTimeField(null=True, blank=True)
+    error = models.CharField(max_length=200, blank=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['broadcast', 'telegram_user_id'], name='broadcastdelivery_unique_recipient'),
+        ]
+        indexes = [
+            models.Index(fields=['send_at'], name='broadcastdelivery_due', condition=models.Q(status='pending')),
+        ]
+    
+    def __str__(self):
+        return f"{self.broadcast} -> {self.telegram_user_id} ({self.status})"
+
+class DataExport(models.Model):
+    DATASETS = [
+        ('interactions', 'Bot Interactions'),
+        ('users', 'Telegram Users'),
+    ]
+    FORMATS = [
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    ]
+    STATUSES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    dataset = models.CharField(max_length=20, choices=DATASETS)
+    export_format = models.CharField(max_length=10, choices=FORMATS, default='csv')
+    start_date = models.DateTimeField(null=True, blank=True)
+    end_date = models.DateTimeField(null=True, blank=True)
+    telegram_users = models.ManyToManyField(TelegramUser, blank=True)
+    chunk_size = models.IntegerField(default=100000)
+    status = models.CharField(max_length=20, choices=STATUSES, default='pending')
+    last_exported_id = models.BigIntegerField(default=0)
+    rows_exported = models.BigIntegerField(default=0)
+    files = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.get_dataset_display()} export #{self.pk} ({self.status})"
+    
+    @property
+    def directory(self):
+        from django.conf import settings
+        return settings.EXPORT_ROOT / f"export_{self.pk}"
+
+class DailyReport(models.Model):
+    """Bot metrics for one UTC day, written by generate_daily_report and backfill_daily_reports"""
+    date = models.DateField(unique=True)
+    new_users = models.IntegerField(default=0)
+    total_users = models.IntegerField(default=0)
+    active_users = models.IntegerField(default=0)
+    interactions = models.IntegerField(default=0)
+    commands = models.IntegerField(default=0)
+    callbacks = models.IntegerField(default=0)
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-date']
+    
+    def __str__(self):
+        return f"Daily report {self.date}"
+
+class ProfilingSession(models.Model):
+    """Switches the sampling profiler (main_app.profiling) on for a while"""
+    TARGETS = [
+        ('all', 'API views and bot handlers'),
+        ('api', 'API views'),
+        ('bot', 'Bot handlers'),
+    ]
+    
+    targets = models.CharField(max_length=10, choices=TARGETS, default='all')
+    sample_rate = models.FloatField(
+        default=0.1, validators=[MinValueValidator(0.0), MaxValueValidator(1.0)],
+        help_text='Fraction of requests/updates to profile'
+    )
+    duration_minutes = models.PositiveIntegerField(default=15)
+    started_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+    stopped_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"Profiling {self.get_targets_display()} at {self.sample_rate:.0%}"
+    
+    @property
+    def target_list(self):
+        return ('api', 'bot') if self.targets == 'all' else (self.targets,)
+    
+    @property
+    def is_running(self):
+        return self.stopped_at is None and self.ends_at is not None and self.ends_at > timezone.now()
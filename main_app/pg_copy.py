@@ -0,0 +1,88 @@
+"""Helpers for streaming data in and out of PostgreSQL with COPY"""
+import io
+from datetime import date, datetime
+
+# Characters that must be escaped in COPY's text format
+_COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+})
+
+
+def copy_text_value(value):
+    """Format a single Python value for COPY ... FROM STDIN (text format)"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def copy_text_row(values):
+    """Format an iterable of values as one COPY text-format line"""
+    return '\t'.join(copy_text_value(value) for value in values) + '\n'
+
+
+class RowStream(io.TextIOBase):
+    """
+    File-like object that renders rows lazily for cursor.copy_expert(),
+    so COPY FROM STDIN never needs the whole payload in memory.
+    """
+    
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = ''
+    
+    def readable(self):
+        return True
+    
+    def read(self, size=-1):
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            try:
+                line = copy_text_row(next(self._rows))
+            except StopIteration:
+                break
+            parts.append(line)
+            length += len(line)
+        data = ''.join(parts)
+        if size < 0:
+            self._buffer = ''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+    
+    def readline(self, size=-1):
+        return self.read(size)
+
+
+def copy_rows_in(cursor, table, columns, rows):
+    """Stream rows into table with COPY FROM STDIN and return the row count"""
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", RowStream(rows))
+    return cursor.rowcount
+
+
+def copy_query_out(cursor, query, params, fileobj, export_format='csv', header=True):
+    """
+    Stream the result of query into fileobj with COPY ... TO STDOUT.
+    
+    COPY does not take bind parameters, so the query is rendered with
+    cursor.mogrify() first. NDJSON rows are built server-side with
+    row_to_json() and emitted through CSV mode with control-character
+    quote/delimiter so the JSON text is passed through unescaped.
+    """
+    query = cursor.mogrify(query, params).decode()
+    if export_format == 'ndjson':
+        sql = (
+            f"COPY (SELECT row_to_json(t) FROM ({query}) t) TO STDOUT "
+            f"WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+        )
+    else:
+        sql = f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER {'true' if header else 'false'})"
+    cursor.copy_expert(sql, fileobj)
+    return cursor.rowcount
@@ -0,0 +1,337 @@
+"""
+On-demand sampling profiler for API views and bot handlers.
+
+Profiling is off until staff switch it on. A ProfilingSession in the
+admin applies to every process through Redis, and SIGUSR2 toggles it
+in one process for PROFILING_SIGNAL_SECONDS. While it is on, a sampled
+fraction of requests and updates is profiled:
+
+* a sampler thread records the profiled code's stack every
+  PROFILING_INTERVAL_MS. For bot handlers this is the handler task's
+  stack; while the task is suspended, the coroutine chain it is
+  awaiting in is recorded, ending in "(waiting)";
+* every SQL statement run on behalf of the request is timed. This
+  includes statements run through sync_to_async, because the profile
+  travels in a context variable.
+
+Each profile is written to PROFILING_DIR/<target>/ as a .folded file
+(one "frame;frame;frame count" line per stack, ready for flamegraph.pl
+or speedscope) and a .json summary with duration and SQL timings. The
+files are written from the sampler thread, never from the request.
+
+While profiling is off, the cost per request is a few global lookups.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+from internship_project.celery import QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = 'tbot:profiling:state'
+TARGETS = ('api', 'bot')
+
+_current = ContextVar('profile', default=None)
+_remote_state = None   # set by the admin, polled from Redis
+_signal_state = None   # toggled by SIGUSR2 in this process
+_poller = None
+_poller_lock = threading.Lock()
+
+
+def publish_state(sample_rate, targets, until):
+    """Switch profiling on in every process until the given datetime"""
+    from .redis_client import get_redis
+
+    ttl = max(int(until.timestamp() - time.time()), 1)
+    state = {'rate': sample_rate, 'targets': list(targets), 'until': until.timestamp()}
+    get_redis().set(STATE_KEY, json.dumps(state), ex=ttl)
+
+
+def clear_state():
+    from .redis_client import get_redis
+
+    get_redis().delete(STATE_KEY)
+
+
+def _poll_state():
+    global _remote_state
+    from .redis_client import get_redis
+
+    while True:
+        try:
+            raw = get_redis().get(STATE_KEY)
+            state = json.loads(raw) if raw else None
+            if bool(state) != bool(_remote_state):
+                logger.info(f"Profiling {'enabled: ' + str(state) if state else 'disabled'}")
+            _remote_state = state
+        except Exception as e:
+            # Keep the last state; it carries its own expiry
+            logger.debug(f"Could not read profiling state: {str(e)}")
+        time.sleep(settings.PROFILING_POLL_SECONDS)
+
+
+def _ensure_poller():
+    global _poller
+    if _poller is None:
+        with _poller_lock:
+            if _poller is None:
+                _poller = threading.Thread(target=_poll_state, name='profiling-poller', daemon=True)
+                _poller.start()
+
+
+def toggle_from_signal(*args):
+    """SIGUSR2 handler: profile this process for PROFILING_SIGNAL_SECONDS, or stop"""
+    global _signal_state
+    if _signal_state is not None and _signal_state['until'] > time.time():
+        _signal_state = None
+    else:
+        _signal_state = {
+            'rate': settings.PROFILING_SIGNAL_SAMPLE_RATE,
+            'targets': TARGETS,
+            'until': time.time() + settings.PROFILING_SIGNAL_SECONDS,
+        }
+
+
+def install_signal_handler():
+    """Install the SIGUSR2 toggle when running in the main thread"""
+    if not settings.PROFILING_ENABLED or threading.current_thread() is not threading.main_thread():
+        return
+    try:
+        signal.signal(signal.SIGUSR2, toggle_from_signal)
+    except (AttributeError, ValueError):
+        pass
+
+
+def should_profile(target):
+    if not settings.PROFILING_ENABLED:
+        return False
+    _ensure_poller()
+    now = time.time()
+    for state in (_signal_state, _remote_state):
+        if state is not None and state['until'] > now and target in state['targets']:
+            return random.random() < state['rate']
+    return False
+
+
+_labels = {}
+
+def _label(code):
+    label = _labels.get(code)
+    if label is None:
+        filename = '/'.join(code.co_filename.replace(os.sep, '/').rsplit('/', 2)[-2:])
+        label = _labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+    return label
+
+
+def _thread_stack(frame):
+    stack = []
+    while frame is not None:
+        stack.append(frame)
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _coroutine_frames(task):
+    frames = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, 'cr_frame', None) or getattr(awaitable, 'gi_frame', None)
+        if frame is None:
+            break
+        frames.append(frame)
+        awaitable = getattr(awaitable, 'cr_await', None) or getattr(awaitable, 'gi_yieldfrom', None)
+    return frames
+
+
+class Profile:
+    def __init__(self, target, name, thread_id, task=None):
+        self.target = target
+        self.name = name
+        self.thread_id = thread_id
+        self.task = task
+        self.stacks = Counter()
+        self.queries = QueryRecorder()
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.status = None
+
+    def sample(self, frames):
+        thread_frame = frames.get(self.thread_id)
+        if self.task is None:
+            stack = _thread_stack(thread_frame)
+            labels = [_label(frame.f_code) for frame in stack]
+        else:
+            coroutine = _coroutine_frames(self.task)
+            if not coroutine:
+                return
+            stack = _thread_stack(thread_frame)
+            if any(frame is coroutine[-1] for frame in stack):
+                # Running: the thread stack from the handler down
+                start = next(i for i, frame in enumerate(stack) if frame is coroutine[0])
+                labels = [_label(frame.f_code) for frame in stack[start:]]
+            else:
+                labels = [_label(frame.f_code) for frame in coroutine] + ['(waiting)']
+        if labels:
+            self.stacks[';'.join(labels)] += 1
+
+    def summary(self):
+        return {
+            'target': self.target,
+            'name': self.name,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(),
+            'duration_ms': round(self.duration * 1000, 2),
+            'status': self.status,
+            'pid': os.getpid(),
+            'interval_ms': settings.PROFILING_INTERVAL_MS,
+            'samples': sum(self.stacks.values()),
+            'sql_queries': self.queries.count,
+            'sql_time_ms': round(self.queries.total * 1000, 2),
+            'top_queries': self.queries.top(10),
+        }
+
+
+class Sampler:
+    """One thread samples every running profile and writes finished ones"""
+
+    def __init__(self):
+        self._active = set()
+        self._finished = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._sequence = 0
+
+    def add(self, profile):
+        with self._lock:
+            self._active.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def finish(self, profile):
+        with self._lock:
+            self._active.discard(profile)
+        self._finished.append(profile)
+        self._wakeup.set()
+
+    def _write(self, profile):
+        directory = settings.PROFILING_DIR / profile.target
+        self._sequence += 1
+        safe_name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in profile.name)[:80]
+        stem = f"{datetime.fromtimestamp(profile.started_at):%Y%m%dT%H%M%S}_{os.getpid()}_{self._sequence}_{safe_name}"
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(directory / f"{stem}.folded", 'w', encoding='utf-8') as folded:
+                for stack, count in profile.stacks.most_common():
+                    folded.write(f"{stack} {count}\n")
+            with open(directory / f"{stem}.json", 'w', encoding='utf-8') as summary:
+                json.dump(profile.summary(), summary)
+        except OSError as e:
+            logger.warning(f"Could not write profile {stem}: {str(e)}")
+
+    def _run(self):
+        interval = settings.PROFILING_INTERVAL_MS / 1000
+        while True:
+            with self._lock:
+                active = list(self._active)
+            if active:
+                frames = sys._current_frames()
+                for profile in active:
+                    try:
+                        profile.sample(frames)
+                    except Exception:
+                        # Frames change under us; a lost sample is fine
+                        pass
+                del frames
+            while self._finished:
+                self._write(self._finished.popleft())
+            if active:
+                time.sleep(interval)
+            else:
+                self._wakeup.wait()
+                self._wakeup.clear()
+
+
+sampler = Sampler()
+
+
+def start_profile(target, name, task=None):
+    profile = Profile(target, name, threading.get_ident(), task)
+    sampler.add(profile)
+    return profile, _current.set(profile)
+
+
+def finish_profile(profile, token):
+    _current.reset(token)
+    profile.duration = time.perf_counter() - profile.started
+    sampler.finish(profile)
+
+
+def _record_sql(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile.queries(execute, sql, params, many, context)
+
+
+def _install_sql_timer(sender, connection, **kwargs):
+    if settings.PROFILING_ENABLED and _record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_sql)
+
+connection_created.connect(_install_sql_timer)
+
+
+def profiled(name):
+    """Profile a sampled fraction of calls to an async bot handler"""
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(update, context, *args, **kwargs):
+            if not should_profile('bot'):
+                return await handler(update, context, *args, **kwargs)
+            profile, token = start_profile('bot', name, task=asyncio.current_task())
+            try:
+                return await handler(update, context, *args, **kwargs)
+            finally:
+                finish_profile(profile, token)
+        return wrapper
+    return decorator
+
+
+class ProfilingMiddleware:
+    """Profiles a sampled fraction of requests while profiling is on"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_signal_handler()
+
+    def __call__(self, request):
+        if not should_profile('api'):
+            return self.get_response(request)
+        profile, token = start_profile('api', request.path)
+        try:
+            response = self.get_response(request)
+            profile.status = response.status_code
+            return response
+        finally:
+            match = getattr(request, 'resolver_match', None)
+            if match is not None:
+                # Group profiles by view rather than by URL
+                profile.name = match.view_name
+            finish_profile(profile, token)
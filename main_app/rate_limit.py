@@ -0,0 +1,88 @@
+"""Token-bucket rate limiting shared across processes through Redis"""
+import logging
+import threading
+import time
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Refills the bucket from the elapsed time and takes `requested` tokens.
+# Returns 0 when the tokens were taken, otherwise the milliseconds to wait.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = math.ceil((requested - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return wait
+"""
+
+
+class LocalTokenBucket:
+    """In-process token bucket, used when Redis is unreachable"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens=1):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+
+class RedisTokenBucket:
+    """
+    Token bucket whose state lives in Redis, so every process using the
+    same key shares one budget. Falls back to a per-process bucket with
+    the same parameters while Redis is unavailable.
+    """
+
+    def __init__(self, key, rate, capacity=None):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._script = None
+        self._fallback = LocalTokenBucket(rate, self.capacity)
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available; return 0, or the seconds to wait before retrying"""
+        try:
+            if self._script is None:
+                self._script = get_redis().register_script(TOKEN_BUCKET_SCRIPT)
+            wait_ms = self._script(keys=[self.key], args=[self.rate, self.capacity, tokens])
+            return wait_ms / 1000
+        except Exception as e:
+            logger.warning(f"Rate limiter {self.key} falling back to local bucket: {str(e)}")
+            return self._fallback.try_acquire(tokens)
+
+    def acquire(self, tokens=1):
+        """Block until tokens are available"""
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
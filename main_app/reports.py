@@ -0,0 +1,177 @@
+"""
+Stored daily reports and the time series built from them.
+
+compute_daily_report() aggregates one UTC day into a DailyReport row.
+Past days can be recomputed at any time, so backfill_daily_reports fans
+them out across Celery workers. time_series() serves trends from the
+stored rows without touching raw interactions. Counts are rolled up in
+the database to day, week or month buckets. If a range has more buckets
+than max_points, adjacent buckets are merged until it fits.
+
+Rolling up a bucket sums the flow metrics, keeps the last total_users
+and averages active_users. Unique users over a week cannot be derived
+from daily counts, so weekly and monthly values are average DAU.
+"""
+import logging
+import math
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .db_router import replica_reads
+
+logger = logging.getLogger(__name__)
+
+SUMMED_METRICS = ('new_users', 'interactions', 'commands', 'callbacks')
+METRICS = SUMMED_METRICS + ('total_users', 'active_users')
+RESOLUTIONS = ('day', 'week', 'month')
+TRUNCATE = {'week': TruncWeek, 'month': TruncMonth}
+
+
+def day_bounds(day):
+    start = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+@replica_reads()
+def daily_metrics(day):
+    """Aggregate the metrics of one UTC day"""
+    from .models import BotInteraction, TelegramUser
+
+    start, end = day_bounds(day)
+    users = TelegramUser.objects.filter(created_at__lt=end).aggregate(
+        total=Count('id'),
+        new=Count('id', filter=Q(created_at__gte=start)),
+    )
+    interactions = BotInteraction.objects.filter(timestamp__gte=start, timestamp__lt=end).aggregate(
+        total=Count('id'),
+        commands=Count('id', filter=Q(interaction_type='command')),
+        callbacks=Count('id', filter=Q(interaction_type='callback')),
+    )
+
+    try:
+        from .active_users import daily_active_users
+        active_users = daily_active_users(day)
+    except Exception as e:
+        logger.warning(f"Active user sketch unavailable, counting exactly: {str(e)}")
+        active_users = None
+    if not active_users and interactions['total']:
+        # No sketch for this day (Redis down, or before sketches were recorded)
+        active_users = BotInteraction.objects.filter(
+            timestamp__gte=start, timestamp__lt=end
+        ).values('telegram_user__telegram_user_id').distinct().count()
+
+    return {
+        'new_users': users['new'],
+        'total_users': users['total'],
+        'active_users': active_users or 0,
+        'interactions': interactions['total'],
+        'commands': interactions['commands'],
+        'callbacks': interactions['callbacks'],
+    }
+
+
+def compute_daily_report(day):
+    """Compute and store the report for one day; returns the DailyReport"""
+    from .models import DailyReport
+
+    report, _ = DailyReport.objects.update_or_create(date=day, defaults=daily_metrics(day))
+    return report
+
+
+def format_report(report):
+    growth = report.new_users / max(report.total_users - report.new_users, 1) * 100
+    return f"""
+📊 Daily Bot Report - {report.date}
+
+👥 Users:
+• New Today: {report.new_users}
+• Total Users: {report.total_users}
+• Active Today: {report.active_users}
+
+💬 Interactions:
+• Today: {report.interactions}
+• Commands: {report.commands}
+• Button presses: {report.callbacks}
+
+📈 Growth Rate: {growth:.1f}%
+"""
+
+
+def _bucket_count(start, end, resolution):
+    days = (end - start).days + 1
+    if resolution == 'day':
+        return days
+    if resolution == 'week':
+        return days // 7 + 1
+    return (end.year - start.year) * 12 + end.month - start.month + 1
+
+
+def pick_resolution(start, end, max_points):
+    """Finest resolution whose bucket count fits in max_points"""
+    for resolution in RESOLUTIONS:
+        if _bucket_count(start, end, resolution) <= max_points:
+            return resolution
+    return 'month'
+
+
+def _merge(points, metrics):
+    merged = {'period': points[0]['period']}
+    for metric in metrics:
+        values = [point[metric] for point in points]
+        if metric in SUMMED_METRICS:
+            merged[metric] = sum(values)
+        elif metric == 'total_users':
+            merged[metric] = values[-1]
+        else:
+            merged[metric] = round(sum(values) / len(values), 1)
+    return merged
+
+
+def downsample(points, metrics, max_points):
+    """Merge runs of adjacent points so at most max_points remain"""
+    if len(points) <= max_points:
+        return points, 1
+    factor = math.ceil(len(points) / max_points)
+    return [_merge(points[i:i + factor], metrics) for i in range(0, len(points), factor)], factor
+
+
+@replica_reads()
+def time_series(metrics, start, end, resolution=None, max_points=200):
+    """Report metrics between two dates (inclusive) as a list of {'period', metric: value} points"""
+    from .models import DailyReport
+
+    resolution = resolution or pick_resolution(start, end, max_points)
+    reports = DailyReport.objects.filter(date__gte=start, date__lte=end)
+    if resolution == 'day':
+        points = [
+            {'period': row['date'], **{metric: row[metric] for metric in metrics}}
+            for row in reports.order_by('date').values('date', *metrics)
+        ]
+    else:
+        aggregates = {}
+        for metric in metrics:
+            if metric in SUMMED_METRICS:
+                aggregates[metric] = Sum(metric)
+            elif metric == 'total_users':
+                aggregates[metric] = Max(metric)
+            else:
+                aggregates[metric] = Avg(metric)
+        rows = (
+            reports.annotate(period=TRUNCATE[resolution]('date'))
+            .values('period')
+            .annotate(**aggregates)
+            .order_by('period')
+        )
+        points = [
+            {key: round(value, 1) if isinstance(value, float) else value for key, value in row.items()}
+            for row in rows
+        ]
+
+    points, factor = downsample(points, metrics, max_points)
+    return {
+        'resolution': resolution,
+        'bucket_size': factor,
+        'points': [{**point, 'period': point['period'].isoformat()} for point in points],
+    }
@@ -0,0 +1,106 @@
+"""
+Index-backed search over Telegram users and bot interactions.
+
+Text terms are matched with icontains, which PostgreSQL runs as
+UPPER(col) LIKE UPPER('%term%') and answers from the pg_trgm GIN indexes
+on UPPER(col) (migration 0005). Numeric terms are also treated as a
+prefix of telegram_user_id and turned into a handful of id ranges on its
+unique B-tree index, instead of casting every id to text.
+"""
+from django.contrib.postgres.lookups import TrigramSimilar
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Greatest, Upper
+
+from .models import TelegramUser
+
+TELEGRAM_USER_TEXT_FIELDS = ('telegram_username', 'first_name', 'last_name')
+# Telegram ids fit in a bigint, which has at most 19 digits
+MAX_ID_DIGITS = 19
+
+
+def telegram_id_prefix_q(prefix, field='telegram_user_id'):
+    """Q matching ids whose decimal form starts with `prefix` (a digit string)"""
+    prefix = prefix.lstrip('0')
+    if not prefix:
+        return Q(pk__in=[])
+    value = int(prefix)
+    q = Q(**{field: value})
+    for extra_digits in range(1, MAX_ID_DIGITS - len(prefix) + 1):
+        scale = 10 ** extra_digits
+        q |= Q(**{f"{field}__gte": value * scale, f"{field}__lt": (value + 1) * scale})
+    return q
+
+
+def telegram_user_term_q(term):
+    """Q matching TelegramUser rows for one search term"""
+    term = term.lstrip('@')
+    q = Q()
+    for field in TELEGRAM_USER_TEXT_FIELDS:
+        q |= Q(**{f"{field}__icontains": term})
+    if term.isdigit():
+        q |= telegram_id_prefix_q(term)
+    return q
+
+
+class TelegramUserSearchMixin:
+    """
+    ModelAdmin mixin replacing the default search with index-friendly queries.
+
+    search_text_fields are columns of the model itself (with trigram
+    indexes); search_user_field is the FK to TelegramUser, matched through
+    an id subquery, or None when the model is TelegramUser. Every term
+    must match, as with the default admin search.
+    """
+    search_text_fields = ()
+    search_user_field = None
+
+    def get_search_results(self, request, queryset, search_term):
+        for term in search_term.split():
+            q = Q()
+            for field in self.search_text_fields:
+                q |= Q(**{f"{field}__icontains": term})
+            user_q = telegram_user_term_q(term)
+            if self.search_user_field is None:
+                q |= user_q
+            else:
+                q |= Q(**{f"{self.search_user_field}__in": TelegramUser.objects.filter(user_q).values('pk')})
+            queryset = queryset.filter(q)
+        return queryset, False
+
+
+def search_telegram_users(term, limit=20):
+    """
+    Telegram users matching `term`, best match first, with a `rank` score.
+
+    Numeric terms match telegram_user_id by prefix (exact id first). Text
+    terms match substrings or trigram-similar values (tolerating typos),
+    ranked by similarity with exact and prefix username matches boosted.
+    """
+    term = term.strip().lstrip('@')
+    if not term:
+        return TelegramUser.objects.none()
+
+    if term.isdigit():
+        return TelegramUser.objects.filter(telegram_id_prefix_q(term)).annotate(
+            rank=Case(
+                When(telegram_user_id=int(term), then=Value(2.0)),
+                default=Value(1.0),
+                output_field=FloatField(),
+            )
+        ).order_by('-rank', 'telegram_user_id')[:limit]
+
+    upper = term.upper()
+    match = Q()
+    for field in TELEGRAM_USER_TEXT_FIELDS:
+        match |= Q(**{f"{field}__icontains": term}) | Q(TrigramSimilar(Upper(field), upper))
+    similarity = Greatest(*(TrigramSimilarity(Upper(field), upper) for field in TELEGRAM_USER_TEXT_FIELDS))
+    boost = Case(
+        When(telegram_username__iexact=term, then=Value(2.0)),
+        When(telegram_username__istartswith=term, then=Value(1.0)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    return TelegramUser.objects.filter(match).annotate(
+        rank=boost + similarity
+    ).order_by('-rank', 'telegram_user_id')[:limit]
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db import transaction
 from .models import TelegramUser, UserProfile
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -15,6 +16,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Passwords don't match")
         return attrs
     
+    @transaction.atomic
     def create(self, validated_data):
         validated_data.pop('password_confirm')
         user = User.objects.create_user(**validated_data)
@@ -26,6 +28,26 @@ class TelegramUserSerializer(serializers.ModelSerializer):
         model = TelegramUser
         fields = '__all__'
 
+class TelegramUserReadSerializer:
+    """
+    Read-only, values()-based counterpart of TelegramUserSerializer.
+    
+    Produces the same keys without instantiating models or running DRF
+    field machinery: rows come straight from values_list() and datetimes
+    are left for the renderer to format. extra_fields adds annotations
+    (e.g. a search rank) to each row.
+    """
+    fields = tuple(field.name for field in TelegramUser._meta.concrete_fields)
+    
+    def __init__(self, queryset, extra_fields=()):
+        self.queryset = queryset
+        self.extra_fields = tuple(extra_fields)
+    
+    @property
+    def data(self):
+        fields = self.fields + self.extra_fields
+        return [dict(zip(fields, row)) for row in self.queryset.values_list(*fields)]
+
 class PublicDataSerializer(serializers.Serializer):
     message = serializers.CharField()
     timestamp = serializers.DateTimeField()
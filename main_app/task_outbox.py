@@ -0,0 +1,172 @@
+"""
+Non-blocking Celery task dispatch for the bot's event loop.
+
+task.delay() talks to the broker synchronously: inside a coroutine every
+publish stalls the loop, and a slow or unreachable broker stalls the bot
+for every user. TaskOutbox.submit() instead appends to a bounded
+in-memory queue and returns immediately; a background thread publishes
+queued tasks in batches over one producer connection.
+
+When the broker is down the thread keeps the unpublished tasks, backs
+off exponentially and retries. Tasks older than max_age are discarded
+(nobody wants their stats an hour late), and when the queue is full new
+tasks are dropped and counted, so memory stays bounded.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TaskOutbox:
+    def __init__(self, maxsize=10000, batch_size=100, max_age=300, backoff_base=0.5, backoff_cap=30.0):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread = None
+        self.published = 0
+        self.dropped = 0
+        self.expired = 0
+        self.publish_errors = 0
+
+    def submit(self, task, *args, **kwargs):
+        """Queue task.apply_async(args, kwargs); returns False if the outbox is full"""
+        with self._lock:
+            if len(self._items) >= self.maxsize:
+                self.dropped += 1
+                dropped = self.dropped
+                accepted = False
+            else:
+                self._items.append((task, args, kwargs, time.monotonic()))
+                self._idle.clear()
+                accepted = True
+        if not accepted:
+            # Log the first drop and then every 1000th, not one line per update
+            if dropped % 1000 == 1:
+                logger.warning(f"Task outbox full ({self.maxsize}), {dropped} tasks dropped so far")
+            return False
+        self._ensure_thread()
+        self._wakeup.set()
+        return True
+
+    def __len__(self):
+        return len(self._items)
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='task-outbox', daemon=True)
+                    self._thread.start()
+
+    def _take_batch(self):
+        now = time.monotonic()
+        batch = []
+        with self._lock:
+            while self._items and len(batch) < self.batch_size:
+                item = self._items.popleft()
+                if now - item[3] > self.max_age:
+                    self.expired += 1
+                    continue
+                batch.append(item)
+        return batch
+
+    def _requeue(self, items):
+        with self._lock:
+            self._items.extendleft(reversed(items))
+            while len(self._items) > self.maxsize:
+                self._items.pop()
+                self.dropped += 1
+
+    def _publish(self, batch):
+        """Publish a batch over one producer; returns (sent, error) where error is None on success"""
+        from celery import current_app
+
+        sent = 0
+        try:
+            with current_app.producer_or_acquire() as producer:
+                for task, args, kwargs, _ in batch:
+                    # No retry here: the outbox retries the unsent rest later
+                    task.apply_async(args, kwargs, producer=producer, retry=False)
+                    sent += 1
+        except Exception as e:
+            return sent, e
+        finally:
+            self.published += sent
+        return sent, None
+
+    def _run(self):
+        failures = 0
+        while not self._stopping.is_set():
+            self._wakeup.wait(timeout=1.0)
+            self._wakeup.clear()
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                sent, error = self._publish(batch)
+                if error is None:
+                    failures = 0
+                    continue
+                # Tasks before the failure reached the broker; requeue only the rest
+                self._requeue(batch[sent:])
+                self.publish_errors += 1
+                failures += 1
+                delay = min(self.backoff_cap, self.backoff_base * 2 ** failures)
+                logger.warning(f"Task broker unavailable ({str(error)}), {len(self)} tasks queued; retrying in {delay:.1f}s")
+                self._stopping.wait(delay)
+                break
+            with self._lock:
+                if not self._items:
+                    self._idle.set()
+
+    def flush(self, timeout=5.0):
+        """Wait until everything queued has been published; returns False on timeout"""
+        self._wakeup.set()
+        return self._idle.wait(timeout)
+
+    def stop(self, timeout=5.0):
+        """Publish what is queued (up to timeout) and stop the publisher thread"""
+        flushed = self.flush(timeout)
+        self._stopping.set()
+        self._wakeup.set()
+        if not flushed:
+            logger.warning(f"Task outbox stopped with {len(self)} unpublished tasks")
+        return flushed
+
+    def stats(self):
+        return {
+            'queued': len(self),
+            'published': self.published,
+            'dropped': self.dropped,
+            'expired': self.expired,
+            'publish_errors': self.publish_errors,
+        }
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+def get_task_outbox():
+    """Return the process-wide TaskOutbox"""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = TaskOutbox(
+                maxsize=settings.TASK_OUTBOX_SIZE,
+                batch_size=settings.TASK_OUTBOX_BATCH_SIZE,
+                max_age=settings.TASK_OUTBOX_MAX_AGE,
+            )
+        return _outbox
@@ -1,23 +1,15 @@
 from celery import shared_task
-from django.core.mail import send_mail
-from django.contrib.auth.models import User
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 import logging
-import csv
-import io
 
 logger = logging.getLogger(__name__)
 
-@shared_task
-def send_welcome_email(user_id):
-    """Send welcome email to newly registered user"""
-    try:
-        user = User.objects.get(id=user_id)
-        
-        subject = 'Welcome to T-Bot!'
-        message = f'''
+def _welcome_email(user):
+    """Subject and body of the welcome email for a user"""
+    subject = 'Welcome to T-Bot!'
+    message = f'''
 Hello {user.first_name or user.username},
 
 Welcome to our T-Bot platform!
@@ -38,7 +30,18 @@ You can now access our protected endpoints using JWT authentication.
 Best regards,
 Django Internship Team
 '''
+    return subject, message
+
+@shared_task
+def send_welcome_email(user_id):
+    """Send welcome email to newly registered user"""
+    from django.contrib.auth.models import User
+    from django.core.mail import send_mail
+    
+    try:
+        user = User.objects.get(id=user_id)
         
+        subject, message = _welcome_email(user)
         send_mail(
             subject,
             message,
@@ -57,6 +60,28 @@ Django Internship Team
         logger.error(f"Error sending email: {str(e)}")
         return f"Error sending email: {str(e)}"
 
+@shared_task
+def send_welcome_emails(user_ids):
+    """Send welcome emails to a batch of new users over one SMTP connection"""
+    from django.contrib.auth.models import User
+    from django.core.mail import EmailMessage, get_connection
+    
+    try:
+        users = User.objects.filter(id__in=user_ids).exclude(email='').only('username', 'email', 'first_name')
+        messages = [
+            EmailMessage(*_welcome_email(user), settings.DEFAULT_FROM_EMAIL, [user.email])
+            for user in users
+        ]
+        with get_connection() as connection:
+            sent = connection.send_messages(messages) or 0
+        
+        logger.info(f"Welcome emails sent: {sent} of {len(user_ids)} users")
+        return f"Welcome emails sent: {sent} of {len(user_ids)} users"
+        
+    except Exception as e:
+        logger.error(f"Error sending welcome emails: {str(e)}")
+        return f"Error sending welcome emails: {str(e)}"
+
 @shared_task
 def process_telegram_user_data(telegram_user_id):
     """Process telegram user data in background"""
@@ -79,27 +104,33 @@ def process_telegram_user_data(telegram_user_id):
         return f"Error: {str(e)}"
 
 @shared_task
-def generate_user_stats(telegram_user_id):
-    """Generate and send user statistics"""
+def generate_user_stats(telegram_user_id, bot_id=None):
+    """Generate and send user statistics (bot_id: the hosted bot the user talks to)"""
     try:
+        from django.db.models import Count
+        from .db_router import replica_reads
         from .models import TelegramUser, BotInteraction
-        from .telegram_bot import send_telegram_message_direct
-        
-        user = TelegramUser.objects.get(telegram_user_id=telegram_user_id)
+        from .telegram_sender import send_telegram_message_direct
         
-        # Calculate statistics
-        total_interactions = BotInteraction.objects.filter(telegram_user=user).count()
-        recent_interactions = BotInteraction.objects.filter(
-            telegram_user=user,
-            timestamp__gte=timezone.now() - timedelta(days=7)
-        ).count()
+        # The user may have just registered, so read them from the primary
+        user = TelegramUser.objects.using('default').get(bot_id=bot_id, telegram_user_id=telegram_user_id)
         
-        most_used_commands = BotInteraction.objects.filter(
-            telegram_user=user,
-            interaction_type='command'
-        ).values('command_or_data').annotate(
-            count=models.Count('command_or_data')
-        ).order_by('-count')[:3]
+        with replica_reads():
+            # Calculate statistics
+            total_interactions = BotInteraction.objects.filter(telegram_user=user).count()
+            recent_interactions = BotInteraction.objects.filter(
+                telegram_user=user,
+                timestamp__gte=timezone.now() - timedelta(days=7)
+            ).count()
+            
+            most_used_commands = list(BotInteraction.objects.filter(
+                telegram_user=user,
+                interaction_type='command'
+            ).values('command_or_data').annotate(
+                count=Count('command_or_data')
+            ).order_by('-count')[:3])
+            
+            rank = TelegramUser.objects.filter(bot_id=bot_id, created_at__lt=user.created_at).count() + 1
         
         stats_message = f"""
 📊 Your Detailed Statistics:
@@ -107,7 +138,7 @@ def generate_user_stats(telegram_user_id):
 🎯 Total Interactions: {total_interactions}
 📅 This Week: {recent_interactions}
 📈 Member Since: {user.created_at.strftime('%B %d, %Y')}
-🏆 Rank: #{list(TelegramUser.objects.order_by('created_at')).index(user) + 1}
+🏆 Rank: #{rank}
 
 🔥 Most Used Commands:
 """
@@ -115,8 +146,7 @@ def generate_user_stats(telegram_user_id):
         for i, cmd in enumerate(most_used_commands, 1):
             stats_message += f"{i}. {cmd['command_or_data']} ({cmd['count']} times)\n"
         
-        # Send via Telegram (you'll need to implement this function)
-        # send_telegram_message_direct(telegram_user_id, stats_message)
+        send_telegram_message_direct(telegram_user_id, stats_message, bot_id=bot_id)
         
         logger.info(f"Generated stats for user {telegram_user_id}")
         return f"Stats generated for user {telegram_user_id}"
@@ -127,29 +157,38 @@ def generate_user_stats(telegram_user_id):
 
 @shared_task
 def broadcast_message_to_users(message_id):
-    """Broadcast message to all active users"""
+    """Broadcast message to all active users of the broadcast's bot"""
     try:
         from .models import BroadcastMessage, TelegramUser
+        from .telegram_sender import bot_token, get_sender
         
         broadcast = BroadcastMessage.objects.get(id=message_id)
-        active_users = TelegramUser.objects.filter(is_active=True)
+        active_users = TelegramUser.objects.filter(bot_id=broadcast.bot_id, is_active=True)
+        sender = get_sender(bot_token(broadcast.bot_id))
+        batch_size = settings.TELEGRAM_BROADCAST_BATCH_SIZE
         
         successful_sends = 0
         failed_sends = 0
         
-        for user in active_users:
-            try:
-                # Here you would send the actual Telegram message
-                # send_telegram_message_direct(user.telegram_user_id, broadcast.message)
-                successful_sends += 1
-            except Exception as e:
-                logger.error(f"Failed to send message to {user.telegram_user_id}: {str(e)}")
-                failed_sends += 1
+        chat_ids = active_users.values_list('telegram_user_id', flat=True).iterator(chunk_size=batch_size)
+        batch = []
+        for chat_id in chat_ids:
+            batch.append(chat_id)
+            if len(batch) < batch_size:
+                continue
+            sent, failed = _send_broadcast_batch(sender, batch, broadcast.message)
+            successful_sends += sent
+            failed_sends += failed
+            batch = []
+        if batch:
+            sent, failed = _send_broadcast_batch(sender, batch, broadcast.message)
+            successful_sends += sent
+            failed_sends += failed
         
         # Update broadcast statistics
         broadcast.successful_sends = successful_sends
         broadcast.failed_sends = failed_sends
-        broadcast.total_recipients = active_users.count()
+        broadcast.total_recipients = successful_sends + failed_sends
         broadcast.sent_at = timezone.now()
         broadcast.is_sent = True
         broadcast.save()
@@ -161,37 +200,57 @@ def broadcast_message_to_users(message_id):
         logger.error(f"Error broadcasting message: {str(e)}")
         return f"Error: {str(e)}"
 
+def _send_broadcast_batch(sender, chat_ids, text):
+    """Send one batch of a broadcast and return (sent, failed)"""
+    results = sender.send_many([(chat_id, text) for chat_id in chat_ids])
+    failed = 0
+    for chat_id, result in zip(chat_ids, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to send message to {chat_id}: {str(result)}")
+            failed += 1
+    return len(chat_ids) - failed, failed
+
 @shared_task
-def generate_daily_report():
-    """Generate daily analytics report"""
+def schedule_broadcast(message_id):
+    """Plan a broadcast's deliveries across its send window"""
     try:
-        from .models import TelegramUser, BotInteraction
+        from .broadcasts import plan_broadcast
+        from .models import BroadcastMessage
         
-        today = timezone.now().date()
-        yesterday = today - timedelta(days=1)
+        planned = plan_broadcast(BroadcastMessage.objects.get(id=message_id))
+        return f"Broadcast {message_id}: {planned} deliveries planned"
         
-        # Calculate metrics
-        new_users_today = TelegramUser.objects.filter(created_at__date=today).count()
-        total_users = TelegramUser.objects.count()
-        interactions_today = BotInteraction.objects.filter(timestamp__date=today).count()
+    except Exception as e:
+        logger.error(f"Error scheduling broadcast {message_id}: {str(e)}")
+        return f"Error: {str(e)}"
+
+@shared_task
+def dispatch_broadcasts():
+    """Send scheduled broadcast deliveries that are due"""
+    try:
+        from .broadcasts import dispatch_due
         
-        active_users_today = BotInteraction.objects.filter(
-            timestamp__date=today
-        ).values('telegram_user').distinct().count()
+        sent, failed = dispatch_due()
+        if sent or failed:
+            logger.info(f"Broadcast dispatch: {sent} sent, {failed} failed")
+        return f"Broadcast dispatch: {sent} sent, {failed} failed"
         
-        report = f"""
-📊 Daily Bot Report - {today}
-
-👥 Users:
-• New Today: {new_users_today}
-• Total Users: {total_users}
-• Active Today: {active_users_today}
-
-💬 Interactions:
-• Today: {interactions_today}
+    except Exception as e:
+        logger.error(f"Error dispatching broadcasts: {str(e)}")
+        return f"Error: {str(e)}"
 
-📈 Growth Rate: {((new_users_today / max(total_users - new_users_today, 1)) * 100):.1f}%
-"""
+@shared_task
+def generate_daily_report():
+    """Store yesterday's final report and today's report so far"""
+    try:
+        from .reports import compute_daily_report, format_report
+        
+        today = timezone.now().date()
+        yesterday = today - timedelta(days=1)
+        
+        # Yesterday is only complete now; today's row is refreshed on the next run
+        compute_daily_report(yesterday)
+        report = format_report(compute_daily_report(today))
         
         # You could send this to admin users or log it
         logger.info(f"Daily report generated: {report}")
@@ -201,18 +260,164 @@ def generate_daily_report():
         logger.error(f"Error generating daily report: {str(e)}")
         return f"Error: {str(e)}"
 
+@shared_task
+def compute_daily_report(day):
+    """Compute and store the report for one past day (ISO date), used by backfills"""
+    try:
+        from datetime import date
+        from .reports import compute_daily_report as compute
+        
+        report = compute(date.fromisoformat(day))
+        return f"Report for {day}: {report.active_users} active users, {report.interactions} interactions"
+        
+    except Exception as e:
+        logger.error(f"Error computing report for {day}: {str(e)}")
+        return f"Error: {str(e)}"
+
+@shared_task
+def flush_last_seen():
+    """Apply coalesced last-seen times to TelegramUser.last_interaction"""
+    try:
+        from .last_seen import flush_last_seen as flush
+        
+        updated = flush()
+        return f"Updated last seen for {updated} users"
+        
+    except Exception as e:
+        logger.error(f"Error flushing last seen times: {str(e)}")
+        return f"Error: {str(e)}"
+
 @shared_task
 def cleanup_old_interactions():
-    """Clean up old bot interactions (keep last 30 days)"""
+    """Move bot interactions older than the retention window to cold storage"""
     try:
         from .models import BotInteraction
         
-        cutoff_date = timezone.now() - timedelta(days=30)
+        archived_count = 0
+        cutoff_date = timezone.now() - timedelta(days=settings.INTERACTION_RETENTION_DAYS)
+        if settings.ARCHIVE_INTERACTIONS:
+            from .archive import archive_cutoff, archive_interactions
+            archived_count = archive_interactions(settings.INTERACTION_RETENTION_DAYS)
+            # Only whole days are archived; keep the rest of the cutoff day for the next run
+            cutoff_date = archive_cutoff(settings.INTERACTION_RETENTION_DAYS)
+        
         deleted_count = BotInteraction.objects.filter(timestamp__lt=cutoff_date).delete()[0]
         
-        logger.info(f"Cleaned up {deleted_count} old interactions")
-        return f"Cleaned up {deleted_count} old interactions"
+        logger.info(f"Archived {archived_count} and cleaned up {deleted_count} old interactions")
+        return f"Archived {archived_count} and cleaned up {deleted_count} old interactions"
         
     except Exception as e:
         logger.error(f"Error cleaning up interactions: {str(e)}")
         return f"Error: {str(e)}"
+
+EXPORT_QUERIES = {
+    'interactions': {
+        'select': """
+            SELECT i.id, u.telegram_user_id, u.telegram_username, i.interaction_type,
+                   i.command_or_data, i.timestamp, i.bot_id
+            FROM main_app_botinteraction i
+            JOIN main_app_telegramuser u ON u.id = i.telegram_user_id
+        """,
+        'id_column': 'i.id',
+        'date_column': 'i.timestamp',
+        'user_column': 'i.telegram_user_id',
+    },
+    'users': {
+        'select': """
+            SELECT u.id, u.telegram_user_id, u.telegram_username, u.first_name, u.last_name,
+                   u.created_at, u.last_interaction, u.is_active, u.bot_id
+            FROM main_app_telegramuser u
+        """,
+        'id_column': 'u.id',
+        'date_column': 'u.created_at',
+        'user_column': 'u.id',
+    },
+}
+
+def _export_filters(export, spec, last_id):
+    """Build the WHERE clause for the next chunk of an export"""
+    conditions = [f"{spec['id_column']} > %s"]
+    params = [last_id]
+    if export.start_date:
+        conditions.append(f"{spec['date_column']} >= %s")
+        params.append(export.start_date)
+    if export.end_date:
+        conditions.append(f"{spec['date_column']} < %s")
+        params.append(export.end_date)
+    user_ids = list(export.telegram_users.values_list('id', flat=True))
+    if user_ids:
+        conditions.append(f"{spec['user_column']} = ANY(%s)")
+        params.append(user_ids)
+    return ' AND '.join(conditions), params
+
+@shared_task
+def export_data(export_id):
+    """
+    Stream a DataExport to gzip-compressed chunk files with COPY TO STDOUT.
+    
+    Each chunk covers a keyset range of primary keys, so memory use is
+    constant and a failed or interrupted export resumes after the last
+    chunk that was fully written.
+    """
+    import gzip
+    import os
+    from django.db import connections
+    from .db_router import read_alias, replica_reads
+    from .models import DataExport
+    from .pg_copy import copy_query_out
+    
+    try:
+        export = DataExport.objects.get(id=export_id)
+        if export.status == 'completed':
+            return f"Export {export_id} already completed"
+        
+        spec = EXPORT_QUERIES[export.dataset]
+        export.status = 'running'
+        export.error = ''
+        export.save(update_fields=['status', 'error', 'updated_at'])
+        os.makedirs(export.directory, exist_ok=True)
+        
+        while True:
+            where, params = _export_filters(export, spec, export.last_exported_id)
+            with replica_reads(), connections[read_alias()].cursor() as cursor:
+                # Find the upper key of the next chunk first so the COPY range is exact
+                cursor.execute(
+                    f"SELECT MAX(id) FROM (SELECT {spec['id_column']} AS id {spec['select']} "
+                    f"WHERE {where} ORDER BY {spec['id_column']} LIMIT %s) chunk",
+                    params + [export.chunk_size]
+                )
+                upper_id = cursor.fetchone()[0]
+                if upper_id is None:
+                    break
+                
+                part = len(export.files) + 1
+                filename = f"part-{part:05d}.{export.export_format}.gz"
+                path = export.directory / filename
+                tmp_path = path.with_name(filename + '.tmp')
+                with gzip.open(tmp_path, 'wb') as fileobj:
+                    rows = copy_query_out(
+                        cursor,
+                        f"{spec['select']} WHERE {where} AND {spec['id_column']} <= %s ORDER BY {spec['id_column']}",
+                        params + [upper_id],
+                        fileobj,
+                        export_format=export.export_format,
+                    )
+                os.replace(tmp_path, path)
+            
+            export.files.append(filename)
+            export.last_exported_id = upper_id
+            export.rows_exported += rows
+            export.save(update_fields=['files', 'last_exported_id', 'rows_exported', 'updated_at'])
+            logger.info(f"Export {export_id}: wrote {filename} ({rows} rows, {export.rows_exported} total)")
+        
+        export.status = 'completed'
+        export.completed_at = timezone.now()
+        export.save(update_fields=['status', 'completed_at', 'updated_at'])
+        
+        logger.info(f"Export {export_id} completed: {export.rows_exported} rows in {len(export.files)} files")
+        return f"Export {export_id} completed: {export.rows_exported} rows"
+        
+    except Exception as e:
+        logger.error(f"Error exporting data: {str(e)}")
+        DataExport.objects.filter(id=export_id).update(status='failed', error=str(e))
+        return f"Error: {str(e)}"
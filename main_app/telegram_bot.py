@@ -1,11 +1,20 @@
 import logging
 import asyncio
-from telegram import Update
-from telegram.ext import Application, CommandHandler, ContextTypes
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.ext import Application, CallbackQueryHandler, CommandHandler, ContextTypes, TypeHandler
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from asgiref.sync import sync_to_async
 from .models import TelegramUser
-from .tasks import process_telegram_user_data
+from .active_users import record_active_user
+from .callback_router import CallbackRouter
+from .interaction_log import InteractionBuffer
+from .last_seen import record_last_seen
+from .loop_lag import LoopLagMonitor
+from .profiling import install_signal_handler, profiled
+from .task_outbox import get_task_outbox
+from .update_dedup import dedup_updates, get_update_deduplicator
+from .user_cache import get_user_cache
 
 # Enable logging
 logging.basicConfig(
@@ -14,15 +23,55 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+interaction_log = InteractionBuffer(
+    batch_size=settings.INTERACTION_LOG_BATCH_SIZE,
+    flush_interval=settings.INTERACTION_LOG_FLUSH_SECONDS,
+)
+callbacks = CallbackRouter(interaction_log=interaction_log)
+loop_lag = LoopLagMonitor(warn_ms=settings.LOOP_LAG_WARN_MS)
+
+ENDPOINT_PAGES = [
+    ('🌐 Public', ['GET /api/public/ - Public information']),
+    ('🔐 Authentication', [
+        'POST /api/register/ - User registration',
+        'POST /api/login/ - User login',
+        'POST /api/token/refresh/ - Refresh JWT token',
+    ]),
+    ('🛡️ Protected (requires JWT)', [
+        'GET /api/protected/ - Protected endpoint',
+        'GET /api/telegram-users/ - List Telegram users',
+        'GET /api/analytics/ - Bot analytics',
+    ]),
+]
+
+def _profile_changes(telegram_user, user_data):
+    """Return {field: value} for profile fields that differ from the incoming update"""
+    changes = {}
+    for field, key in (('telegram_username', 'username'), ('first_name', 'first_name'), ('last_name', 'last_name')):
+        value = user_data.get(key)
+        if value and getattr(telegram_user, field) != value:
+            changes[field] = value
+    return changes
+
 @sync_to_async
-def save_telegram_user(user_data):
+def save_telegram_user(user_data, bot_id=None):
     """
-    Save telegram user to database with proper null handling
+    Save telegram user to database with proper null handling.
+    
+    A cached, unchanged user costs no database round trip at all. Otherwise
+    existing rows are only written when a profile field actually changed,
+    and then only those columns; activity time is tracked by last_seen.
     """
+    cache = get_user_cache()
+    telegram_user = cache.get(user_data['id'], bot_id)
+    if telegram_user is not None and not _profile_changes(telegram_user, user_data):
+        return telegram_user, False
+    
     telegram_user, created = TelegramUser.objects.get_or_create(
+        bot_id=bot_id,
         telegram_user_id=user_data['id'],
         defaults={
-            'telegram_username': user_data.get('username') or '',
+            'telegram_username': user_data.get('username') or None,
             'first_name': user_data.get('first_name') or '',
             'last_name': user_data.get('last_name') or '',
         }
@@ -30,26 +79,48 @@ def save_telegram_user(user_data):
     
     if not created:
         # Update existing user data
-        telegram_user.telegram_username = user_data.get('username') or telegram_user.telegram_username or ''
-        telegram_user.first_name = user_data.get('first_name') or telegram_user.first_name or ''
-        telegram_user.last_name = user_data.get('last_name') or telegram_user.last_name or ''
-        telegram_user.save()
+        changes = _profile_changes(telegram_user, user_data)
+        if changes:
+            for field, value in changes.items():
+                setattr(telegram_user, field, value)
+            telegram_user.save(update_fields=list(changes))
     
+    cache.put(telegram_user)
     return telegram_user, created
 
 @sync_to_async
-def get_user_stats(telegram_user_id):
+def get_user_stats(telegram_user_id, bot_id=None):
     """Get user statistics"""
+    cache = get_user_cache()
+    user = cache.get(telegram_user_id, bot_id)
+    if user is None:
+        try:
+            user = TelegramUser.objects.get(bot_id=bot_id, telegram_user_id=telegram_user_id)
+        except TelegramUser.DoesNotExist:
+            return None
+        cache.put(user)
+    
+    bot_users = TelegramUser.objects.filter(bot_id=bot_id)
+    return {
+        'username': user.telegram_username or 'Not set',
+        'join_date': user.created_at.strftime('%Y-%m-%d'),
+        'total_users': bot_users.count(),
+        'user_rank': bot_users.filter(created_at__lt=user.created_at).count() + 1
+    }
+
+def _record_activity(telegram_user_id, bot_id):
+    record_active_user(telegram_user_id, bot_id=bot_id)
+    record_last_seen(telegram_user_id, bot_id=bot_id)
+
+async def track_activity(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Record every interacting user in today's active-user sketch and last-seen tracker"""
+    user = update.effective_user
+    if user is None:
+        return
     try:
-        user = TelegramUser.objects.get(telegram_user_id=telegram_user_id)
-        return {
-            'username': user.telegram_username or 'Not set',
-            'join_date': user.created_at.strftime('%Y-%m-%d'),
-            'total_users': TelegramUser.objects.count(),
-            'user_rank': list(TelegramUser.objects.order_by('created_at')).index(user) + 1
-        }
-    except TelegramUser.DoesNotExist:
-        return None
+        await sync_to_async(_record_activity, thread_sensitive=False)(user.id, context.bot_data.get('bot_id'))
+    except Exception as e:
+        logger.warning(f"Could not record activity for {user.id}: {str(e)}")
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Enhanced /start command with interactive menu"""
@@ -63,7 +134,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     }
     
     try:
-        telegram_user, created = await save_telegram_user(user_data)
+        telegram_user, created = await save_telegram_user(user_data, context.bot_data.get('bot_id'))
         display_name = user.first_name or user.username or f"User {user.id}"
         
         if created:
@@ -79,19 +150,12 @@ Hello {display_name}! Your account has been registered.
 
 Choose an option below:
 """
-            process_telegram_user_data.delay(telegram_user.id)
+            from .tasks import process_telegram_user_data
+            get_task_outbox().submit(process_telegram_user_data, telegram_user.id)
         else:
             message = f"👋 Welcome back, {display_name}!\n\nChoose an option:"
         
-        # Create inline keyboard
-        keyboard = [
-            [InlineKeyboardButton("📊 My Stats", callback_data='stats')],
-            [InlineKeyboardButton("🔗 API Endpoints", callback_data='endpoints')],
-            [InlineKeyboardButton("📈 Bot Statistics", callback_data='bot_stats')],
-            [InlineKeyboardButton("❓ Help", callback_data='help')]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
+        reply_markup = main_menu_markup()
         await update.message.reply_text(message, reply_markup=reply_markup)
         logger.info(f"User @{user.username or user.id} used /start command")
         
@@ -101,17 +165,28 @@ Choose an option below:
             "Sorry, there was an error processing your request. Please try again later."
         )
 
-async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle button callbacks"""
+def main_menu_markup():
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton("📊 My Stats", callback_data=callbacks.encode('stats'))],
+        [InlineKeyboardButton("🔗 API Endpoints", callback_data=callbacks.encode('endpoints', 0))],
+        [InlineKeyboardButton("📈 Bot Statistics", callback_data=callbacks.encode('bot_stats'))],
+        [InlineKeyboardButton("❓ Help", callback_data=callbacks.encode('help'))]
+    ])
+
+def back_markup(*extra_buttons):
+    rows = [list(extra_buttons)] if extra_buttons else []
+    rows.append([InlineKeyboardButton("🔙 Back to Menu", callback_data=callbacks.encode('back_to_menu'))])
+    return InlineKeyboardMarkup(rows)
+
+@callbacks.route('stats', 's')
+async def stats_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show the user's own statistics"""
     query = update.callback_query
     await query.answer()
     
-    user_id = query.from_user.id
-    
-    if query.data == 'stats':
-        stats = await get_user_stats(user_id)
-        if stats:
-            message = f"""
+    stats = await get_user_stats(query.from_user.id, context.bot_data.get('bot_id'))
+    if stats:
+        message = f"""
 📊 Your Statistics:
 
 👤 Username: @{stats['username']}
@@ -119,35 +194,46 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 🏆 User Rank: #{stats['user_rank']} of {stats['total_users']}
 📈 Total Bot Users: {stats['total_users']}
 """
-        else:
-            message = "❌ Unable to fetch your statistics."
-            
-    elif query.data == 'endpoints':
-        message = """
-🔗 Available API Endpoints:
-
-🌐 Public:
-• GET /api/public/ - Public information
+    else:
+        message = "❌ Unable to fetch your statistics."
+    
+    await query.edit_message_text(message, reply_markup=back_markup())
 
-🔐 Authentication:
-• POST /api/register/ - User registration
-• POST /api/login/ - User login
-• POST /api/token/refresh/ - Refresh JWT token
+@callbacks.route('endpoints', 'e', args=(int,))
+async def endpoints_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int) -> None:
+    """Page through the available API endpoints"""
+    query = update.callback_query
+    await query.answer()
+    
+    page = min(max(page, 0), len(ENDPOINT_PAGES) - 1)
+    title, lines = ENDPOINT_PAGES[page]
+    message = f"🔗 API Endpoints ({page + 1}/{len(ENDPOINT_PAGES)})\n\n{title}:\n" + "\n".join(f"• {line}" for line in lines)
+    message += "\n\nBase URL: http://localhost:8000"
+    
+    paging = []
+    if page > 0:
+        paging.append(InlineKeyboardButton("⬅️ Previous", callback_data=callbacks.encode('endpoints', page - 1)))
+    if page < len(ENDPOINT_PAGES) - 1:
+        paging.append(InlineKeyboardButton("Next ➡️", callback_data=callbacks.encode('endpoints', page + 1)))
+    await query.edit_message_text(message, reply_markup=back_markup(*paging))
 
-🛡️ Protected (requires JWT):
-• GET /api/protected/ - Protected endpoint
-• GET /api/telegram-users/ - List Telegram users
+@callbacks.route('bot_stats', 'b')
+async def bot_stats_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Trigger async task to generate bot stats"""
+    query = update.callback_query
+    await query.answer()
+    
+    from .tasks import generate_user_stats
+    get_task_outbox().submit(generate_user_stats, query.from_user.id, context.bot_data.get('bot_id'))
+    message = "📈 Generating bot statistics... You'll receive them shortly!"
+    await query.edit_message_text(message, reply_markup=back_markup())
 
-Base URL: http://localhost:8000
-"""
+@callbacks.route('help', 'h')
+async def help_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    await query.answer()
     
-    elif query.data == 'bot_stats':
-        # Trigger async task to generate bot stats
-        generate_user_stats.delay(user_id)
-        message = "📈 Generating bot statistics... You'll receive them shortly!"
-        
-    elif query.data == 'help':
-        message = """
+    message = """
 🤖 T-Bot
 
 Available commands:
@@ -162,29 +248,23 @@ This bot demonstrates:
 ✅ PostgreSQL Database
 ✅ Interactive Telegram Bot
 """
-    
-    # Back button for navigation
-    keyboard = [[InlineKeyboardButton("🔙 Back to Menu", callback_data='back_to_menu')]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await query.edit_message_text(message, reply_markup=reply_markup)
+    await query.edit_message_text(message, reply_markup=back_markup())
 
+@callbacks.route('back_to_menu', 'm')
 async def back_to_menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle back to menu button"""
     query = update.callback_query
     await query.answer()
     
-    # Recreate main menu
-    keyboard = [
-        [InlineKeyboardButton("📊 My Stats", callback_data='stats')],
-        [InlineKeyboardButton("🔗 API Endpoints", callback_data='endpoints')],
-        [InlineKeyboardButton("📈 Bot Statistics", callback_data='bot_stats')],
-        [InlineKeyboardButton("❓ Help", callback_data='help')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
     message = "🏠 Main Menu - Choose an option:"
-    await query.edit_message_text(message, reply_markup=reply_markup)
+    await query.edit_message_text(message, reply_markup=main_menu_markup())
+
+# Menus sent before callback_data was versioned still work
+callbacks.legacy('stats', 'stats')
+callbacks.legacy('endpoints', 'endpoints', 0)
+callbacks.legacy('bot_stats', 'bot_stats')
+callbacks.legacy('help', 'help')
+callbacks.legacy('back_to_menu', 'back_to_menu')
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
@@ -209,20 +289,84 @@ For more information, check out the API documentation!
     
     await update.message.reply_text(help_text)
 
+async def start_background_tasks(application: Application) -> None:
+    interaction_log.start()
+    loop_lag.start()
+
+async def stop_background_tasks(application: Application) -> None:
+    await interaction_log.stop()
+    await loop_lag.stop()
+    # Give queued tasks a last chance to reach the broker, off the loop
+    outbox = get_task_outbox()
+    await sync_to_async(outbox.stop, thread_sensitive=False)(settings.TASK_OUTBOX_SHUTDOWN_TIMEOUT)
+    logger.info(f"Interaction log: {interaction_log.written} written, {interaction_log.dropped} dropped")
+    logger.info(f"Task outbox stats: {outbox.stats()}")
+    logger.info(f"Event loop lag: {loop_lag.stats()}")
+    logger.info(f"Update dedup stats: {get_update_deduplicator().stats()}")
+    logger.info(f"Telegram user cache stats: {get_user_cache().stats()}")
+
+def build_application(token, bot_id=None, request=None, standalone=True):
+    """
+    Build an Application with all handlers for one bot.
+    
+    bot_id is stored in bot_data so handlers scope users to their bot.
+    request lets several bots share one HTTP connection pool; standalone
+    applications also own the shared background tasks.
+    """
+    builder = (
+        Application.builder()
+        .token(token)
+        .base_url(f"{settings.TELEGRAM_API_BASE_URL.rstrip('/')}/bot")
+    )
+    if request is not None:
+        builder = builder.request(request)
+    if standalone:
+        builder = builder.post_init(start_background_tasks).post_shutdown(stop_background_tasks)
+    application = builder.build()
+    application.bot_data['bot_id'] = bot_id
+    
+    # Redelivered updates are stopped before anything else sees them
+    if settings.UPDATE_DEDUP_ENABLED:
+        application.add_handler(TypeHandler(Update, dedup_updates), group=-2)
+    
+    # Runs before the command handlers for every update
+    application.add_handler(TypeHandler(Update, track_activity), group=-1)
+    
+    # Add command handlers
+    # Handlers are profiled for a sampled fraction of updates while profiling is on
+    application.add_handler(CommandHandler("start", profiled('start_command')(start_command)))
+    application.add_handler(CommandHandler("help", profiled('help_command')(help_command)))
+    application.add_handler(CallbackQueryHandler(profiled('button_callback')(callbacks.dispatch)))
+    return application
+
 def run_telegram_bot():
     """
     Run the telegram bot
     """
+    if not settings.TELEGRAM_BOT_TOKEN:
+        raise ImproperlyConfigured('TELEGRAM_BOT_TOKEN must be set to run the Telegram bot')
+    
     # Create the Application
-    application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).build()
+    application = build_application(settings.TELEGRAM_BOT_TOKEN)
     
-    # Add command handlers
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("help", help_command))
+    get_user_cache().start_invalidation_listener()
+    install_signal_handler()
     
     # Run the bot
-    logger.info("Starting Telegram bot...")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if settings.TELEGRAM_WEBHOOK_URL:
+        # Needs python-telegram-bot[webhooks]
+        logger.info(f"Starting Telegram bot with webhook {settings.TELEGRAM_WEBHOOK_URL}...")
+        application.run_webhook(
+            listen=settings.TELEGRAM_WEBHOOK_LISTEN,
+            port=settings.TELEGRAM_WEBHOOK_PORT,
+            url_path=settings.TELEGRAM_WEBHOOK_PATH,
+            webhook_url=settings.TELEGRAM_WEBHOOK_URL,
+            secret_token=settings.TELEGRAM_WEBHOOK_SECRET or None,
+            allowed_updates=Update.ALL_TYPES,
+        )
+    else:
+        logger.info("Starting Telegram bot...")
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 if __name__ == '__main__':
     run_telegram_bot()
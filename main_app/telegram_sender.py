@@ -0,0 +1,171 @@
+"""
+Outbound Telegram Bot API sender for Celery tasks.
+
+Each worker process keeps one httpx client with a keep-alive connection
+pool to the Bot API, shared by the senders of every bot token, so tasks
+reuse TLS sessions instead of building a bot client per message. All
+processes share one Redis token bucket per bot to stay under Telegram's
+send limit. Failed calls are retried with
+full-jitter backoff, honouring retry_after on 429s.
+
+Point TELEGRAM_API_BASE_URL at a local fake server to test without
+hitting Telegram.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from django.conf import settings
+
+from .rate_limit import RedisTokenBucket
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_KEY = 'tbot:telegram:send_bucket'
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TelegramSendError(Exception):
+    def __init__(self, description, error_code=None, retry_after=None):
+        super().__init__(description)
+        self.error_code = error_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self):
+        return self.error_code is None or self.error_code in RETRYABLE_STATUS_CODES
+
+
+def build_client(base_url='https://api.telegram.org', pool_size=20, timeout=10.0):
+    """Keep-alive client on the bare API URL, so senders for any token can share it"""
+    return httpx.Client(
+        base_url=f"{base_url.rstrip('/')}/",
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        timeout=timeout,
+    )
+
+
+class TelegramSender:
+    def __init__(self, token, base_url='https://api.telegram.org', pool_size=20, timeout=10.0,
+                 max_retries=4, backoff_base=0.5, backoff_cap=30.0, rate_limiter=None, client=None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.pool_size = pool_size
+        self.rate_limiter = rate_limiter
+        # Leading slash: otherwise httpx reads the "bot123" before the token's colon as a URL scheme
+        self._path = f"/bot{token}/"
+        self._owns_client = client is None
+        self._client = client if client is not None else build_client(base_url, pool_size, timeout)
+
+    def close(self):
+        # A shared client outlives any one sender
+        if self._owns_client:
+            self._client.close()
+
+    def _backoff(self, attempt):
+        # Full jitter: spreads retries from many workers instead of synchronizing them
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _call_once(self, method, payload):
+        try:
+            response = self._client.post(self._path + method, json=payload)
+        except httpx.TransportError as e:
+            raise TelegramSendError(f"{method} failed: {e}") from e
+        try:
+            data = response.json()
+        except ValueError:
+            raise TelegramSendError(f"{method} returned HTTP {response.status_code}", response.status_code)
+        if not data.get('ok'):
+            raise TelegramSendError(
+                data.get('description', f"{method} failed"),
+                data.get('error_code', response.status_code),
+                (data.get('parameters') or {}).get('retry_after'),
+            )
+        return data['result']
+
+    def call(self, method, **payload):
+        """Call a Bot API method, retrying transient failures"""
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                return self._call_once(method, payload)
+            except TelegramSendError as e:
+                if not e.retryable or attempt == self.max_retries:
+                    raise
+                delay = e.retry_after + random.uniform(0, 1) if e.retry_after else self._backoff(attempt)
+                logger.warning(f"Telegram {method} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def send_message(self, chat_id, text, **kwargs):
+        return self.call('sendMessage', chat_id=chat_id, text=text, **kwargs)
+
+    def send_many(self, messages, concurrency=None):
+        """
+        Send a batch of (chat_id, text) messages over the shared pool.
+
+        Returns a list aligned with `messages` holding either the sent
+        Message dict or the exception that made that send fail.
+        """
+        def send(message):
+            chat_id, text = message
+            try:
+                return self.send_message(chat_id, text)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=concurrency or self.pool_size) as executor:
+            return list(executor.map(send, messages))
+
+
+_client = None
+_senders = {}
+_senders_pid = None
+_senders_lock = threading.Lock()
+
+
+def get_sender(token=None):
+    """
+    Return this process's TelegramSender for `token` (TELEGRAM_BOT_TOKEN by
+    default), creating it after a fork if needed. Senders share one pool.
+    """
+    global _client, _senders, _senders_pid
+    token = token or settings.TELEGRAM_BOT_TOKEN
+    with _senders_lock:
+        if _senders_pid != os.getpid():
+            _client = build_client(settings.TELEGRAM_API_BASE_URL, settings.TELEGRAM_SEND_POOL_SIZE)
+            _senders = {}
+            _senders_pid = os.getpid()
+        sender = _senders.get(token)
+        if sender is None:
+            sender = _senders[token] = TelegramSender(
+                token,
+                pool_size=settings.TELEGRAM_SEND_POOL_SIZE,
+                max_retries=settings.TELEGRAM_SEND_MAX_RETRIES,
+                # Telegram limits each bot separately; the numeric bot id prefixes the token
+                rate_limiter=RedisTokenBucket(
+                    f"{RATE_LIMIT_KEY}:{token.split(':', 1)[0]}",
+                    rate=settings.TELEGRAM_SEND_RATE,
+                    capacity=settings.TELEGRAM_SEND_BURST,
+                ),
+                client=_client,
+            )
+        return sender
+
+
+def bot_token(bot_id=None):
+    """Token of a hosted bot, or TELEGRAM_BOT_TOKEN for the default bot (None)"""
+    if bot_id is None:
+        return settings.TELEGRAM_BOT_TOKEN
+    from .models import BotConfig
+    return BotConfig.objects.values_list('token', flat=True).get(pk=bot_id)
+
+
+def send_telegram_message_direct(chat_id, text, bot_id=None, **kwargs):
+    """Send a single Telegram message from synchronous code (e.g. Celery tasks)"""
+    return get_sender(bot_token(bot_id)).send_message(chat_id, text, **kwargs)
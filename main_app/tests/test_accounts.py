@@ -0,0 +1,99 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from main_app import accounts
+from main_app.accounts import bulk_register_users
+from main_app.models import UserProfile
+
+
+def row(username, **fields):
+    return {'username': username, 'password': 'correct horse', 'email': f"{username}@example.com", **fields}
+
+
+@mock.patch('main_app.accounts.enqueue_welcome_emails')
+class BulkRegisterUsersTests(TestCase):
+    def test_creates_users_profiles_and_queues_emails_after_commit(self, enqueue):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = bulk_register_users([row('ann'), row('bob', email='')], workers=2)
+
+        self.assertEqual((result['created'], result['rejected']), (2, 0))
+        ann = User.objects.get(username='ann')
+        self.assertTrue(ann.check_password('correct horse'))
+        self.assertEqual(UserProfile.objects.filter(user__username__in=['ann', 'bob']).count(), 2)
+        # Only users with an address get a welcome email
+        enqueue.assert_called_once_with([ann.id])
+
+    def test_invalid_rows_are_reported(self, enqueue):
+        User.objects.create_user('taken', password='secret')
+        result = bulk_register_users([
+            row('ok'),
+            row('taken'),
+            row('ok'),
+            row('bad name!'),
+            row('nomail', email='not-an-email'),
+            row(123),
+            row('nopass', password=''),
+            row('listy', first_name=['x']),
+            row('longmail', email=f"{'a' * 64}@{'b' * 63}.{'c' * 63}.{'d' * 63}.com"),
+        ])
+
+        self.assertEqual(result['usernames'], ['ok'])
+        # Existing usernames are found when the batch is flushed, after the row checks
+        self.assertEqual(sorted((error['row'], error['reason']) for error in result['errors']), [
+            (2, 'username already exists'),
+            (3, 'duplicate username in input'),
+            (4, 'username may only contain letters, digits and @/./+/-/_'),
+            (5, 'email is not valid'),
+            (6, 'username must be a string'),
+            (7, 'password is required'),
+            (8, 'first_name must be a string'),
+            (9, 'email is longer than 254 characters'),
+        ])
+        self.assertEqual(result['rows'], 9)
+
+    def test_username_taken_during_insert_is_retried_once(self, enqueue):
+        register_batch = accounts._register_batch
+        calls = []
+
+        def racing_register(batch, *args):
+            if not calls:
+                # Another request creates 'bob' after the existence check
+                User.objects.create_user('bob', password='secret')
+            calls.append([r['username'] for _, r in batch])
+            return register_batch(batch, *args)
+
+        with mock.patch('main_app.accounts._register_batch', side_effect=racing_register):
+            result = bulk_register_users([row('ann'), row('bob'), row('cid')])
+
+        self.assertEqual(calls, [['ann', 'bob', 'cid'], ['ann', 'cid']])
+        self.assertEqual(sorted(result['usernames']), ['ann', 'cid'])
+        self.assertEqual(result['errors'], [{'row': 2, 'username': 'bob', 'reason': 'username already exists'}])
+        self.assertEqual(User.objects.filter(username__in=['ann', 'bob', 'cid']).count(), 3)
+
+
+@mock.patch('main_app.accounts.enqueue_welcome_emails')
+class RegisterUsersBulkViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', password='secret', is_staff=True))
+
+    def post(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/register/bulk/', data, format='json')
+
+    def test_send_welcome_email_false_string_sends_nothing(self, enqueue):
+        response = self.post(users=[row('ann')], send_welcome_email='false')
+        self.assertEqual(response.status_code, 201)
+        enqueue.assert_not_called()
+
+    def test_send_welcome_email_must_be_boolean(self, enqueue):
+        response = self.post(users=[row('ann')], send_welcome_email='maybe')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.filter(username='ann').exists())
+
+    def test_staff_only(self, enqueue):
+        self.client.force_authenticate(User.objects.create_user('plain', password='secret'))
+        self.assertEqual(self.post(users=[row('ann')]).status_code, 403)
@@ -0,0 +1,38 @@
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.test import TestCase, override_settings
+
+from main_app.active_users import HLL_KEY_PREFIX, count_active_users, exact_active_users, record_active_user
+from main_app.models import BotConfig, BotInteraction, TelegramUser
+from main_app.tests.utils import delete_keys, requires_redis
+
+# A day long gone keeps the test's sketches apart from real ones
+DAY = date(2001, 1, 1)
+WHEN = datetime(2001, 1, 1, 12, tzinfo=dt_timezone.utc)
+
+
+@override_settings(ACTIVE_USERS_EXACT_TRACKING=False)
+class ActiveUsersPerBotTests(TestCase):
+    def setUp(self):
+        self.bot = BotConfig.objects.create(name='second', token='999:second')
+
+    @requires_redis
+    def test_user_of_two_bots_counts_once_overall(self):
+        delete_keys(f"{HLL_KEY_PREFIX}:*{DAY:%Y%m%d}")
+        self.addCleanup(delete_keys, f"{HLL_KEY_PREFIX}:*{DAY:%Y%m%d}")
+        record_active_user(1, when=WHEN)
+        record_active_user(1, when=WHEN, bot_id=self.bot.id)
+        record_active_user(2, when=WHEN, bot_id=self.bot.id)
+
+        self.assertEqual(count_active_users(1, DAY), 2)
+        self.assertEqual(count_active_users(1, DAY, bot_id=None), 1)
+        self.assertEqual(count_active_users(1, DAY, bot_id=self.bot.id), 2)
+
+    def test_exact_count_is_of_telegram_ids_like_the_sketch(self):
+        for bot in (None, self.bot):
+            user = TelegramUser.objects.create(bot=bot, telegram_user_id=1)
+            interaction = BotInteraction.objects.create(telegram_user=user, interaction_type='command', command_or_data='/start')
+            BotInteraction.objects.filter(id=interaction.id).update(timestamp=WHEN)
+
+        self.assertEqual(exact_active_users(1, DAY), (1, 'database'))
+        self.assertEqual(exact_active_users(1, DAY, bot_id=self.bot.id), (1, 'database'))
@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+from datetime import date, datetime, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from main_app.archive import archive_cutoff, scan_archive, summarize_archive
+from main_app.models import BotInteraction, TelegramUser
+from main_app.tasks import cleanup_old_interactions
+
+NOW = datetime(2026, 3, 31, 12, 0, tzinfo=dt_timezone.utc)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+@mock.patch('django.utils.timezone.now', return_value=NOW)
+class ArchiveCleanupTests(TestCase):
+    def setUp(self):
+        self.archive_root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.archive_root, ignore_errors=True)
+        settings_override = override_settings(ARCHIVE_ROOT=self.archive_root, INTERACTION_RETENTION_DAYS=30)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        user = TelegramUser.objects.create(telegram_user_id=42, telegram_username='archived')
+        self.ids = {}
+        for name, moment in (
+            ('old', utc(2026, 2, 27, 10, 0)),
+            ('last_archived_day', utc(2026, 2, 28, 23, 59)),
+            # Older than now - 30 days, but on the first day that is not archived
+            ('cutoff_day', utc(2026, 3, 1, 6, 0)),
+            ('recent', utc(2026, 3, 2, 9, 0)),
+        ):
+            interaction = BotInteraction.objects.create(
+                telegram_user=user, interaction_type='command', command_or_data='/start'
+            )
+            BotInteraction.objects.filter(id=interaction.id).update(timestamp=moment)
+            self.ids[name] = interaction.id
+
+    def remaining(self):
+        return set(BotInteraction.objects.values_list('id', flat=True))
+
+    def test_cutoff_is_midnight_of_cutoff_day(self, now):
+        self.assertEqual(archive_cutoff(30), utc(2026, 3, 1))
+
+    def test_cleanup_keeps_unarchived_part_of_cutoff_day(self, now):
+        cleanup_old_interactions()
+
+        self.assertEqual(self.remaining(), {self.ids['cutoff_day'], self.ids['recent']})
+        archived = list(scan_archive(date(2026, 2, 1), date(2026, 3, 31)))
+        self.assertEqual(
+            sorted(int(row['id']) for row in archived),
+            sorted([self.ids['old'], self.ids['last_archived_day']])
+        )
+        self.assertEqual({row['bot_id'] for row in archived}, {''})
+        self.assertEqual({row['telegram_user_id'] for row in archived}, {'42'})
+
+    def test_cutoff_day_is_archived_on_the_next_run(self, now):
+        cleanup_old_interactions()
+        now.return_value = utc(2026, 4, 1, 0, 30)
+        cleanup_old_interactions()
+
+        self.assertEqual(self.remaining(), {self.ids['recent']})
+        counts, unique_users = summarize_archive(date(2026, 2, 1), date(2026, 3, 31))
+        self.assertEqual(counts, {'2026-02-27': 1, '2026-02-28': 1, '2026-03-01': 1})
+        self.assertEqual(unique_users, 1)
+
+    @override_settings(ARCHIVE_INTERACTIONS=False)
+    def test_plain_cleanup_deletes_everything_past_retention(self, now):
+        cleanup_old_interactions()
+        self.assertEqual(self.remaining(), {self.ids['recent']})
+        self.assertFalse(any(self.archive_root.iterdir()))
@@ -0,0 +1,128 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from main_app.broadcasts import dispatch_due, plan_broadcast
+from main_app.models import BotConfig, BotInteraction, BroadcastDelivery, BroadcastMessage, TelegramUser
+
+
+class FakeSender:
+    """Stands in for the Telegram sender; chats in `failing` raise like a blocked bot"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.sent = []
+
+    def send_many(self, messages, concurrency=None):
+        results = []
+        for chat_id, text in messages:
+            if chat_id in self.failing:
+                results.append(RuntimeError('Forbidden: bot was blocked by the user'))
+            else:
+                self.sent.append(chat_id)
+                results.append({'chat': {'id': chat_id}, 'text': text})
+        return results
+
+
+class BroadcastTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('broadcaster', password='secret')
+        self.users = [TelegramUser.objects.create(telegram_user_id=1000 + i) for i in range(4)]
+        TelegramUser.objects.create(telegram_user_id=2000, is_active=False)
+        other_bot = BotConfig.objects.create(name='other', token='999:other')
+        TelegramUser.objects.create(bot=other_bot, telegram_user_id=1000)
+
+    def broadcast(self, scheduled_at, window=60, **kwargs):
+        return BroadcastMessage.objects.create(
+            title='News', message='Hello', created_by=self.admin,
+            scheduled_at=scheduled_at, send_window_minutes=window, **kwargs
+        )
+
+
+class PlanBroadcastTests(BroadcastTestCase):
+    def test_deliveries_are_spread_evenly_over_the_window(self):
+        start = timezone.now().replace(microsecond=0) + timedelta(hours=1)
+        broadcast = self.broadcast(start)
+
+        self.assertEqual(plan_broadcast(broadcast), 4)
+        deliveries = list(BroadcastDelivery.objects.filter(broadcast=broadcast).order_by('send_at'))
+        # Only active users of the broadcast's own bot
+        self.assertEqual([d.telegram_user_id for d in deliveries], [1000, 1001, 1002, 1003])
+        self.assertEqual([d.send_at - start for d in deliveries], [timedelta(minutes=m) for m in (0, 15, 30, 45)])
+        broadcast.refresh_from_db()
+        self.assertIsNotNone(broadcast.planned_at)
+        self.assertEqual(broadcast.total_recipients, 4)
+
+    def test_planning_twice_does_nothing(self):
+        broadcast = self.broadcast(timezone.now() + timedelta(hours=1))
+        plan_broadcast(broadcast)
+        self.assertEqual(plan_broadcast(broadcast), 0)
+        self.assertEqual(BroadcastDelivery.objects.filter(broadcast=broadcast).count(), 4)
+
+    def test_spread_by_activity_orders_by_usual_hour(self):
+        yesterday = timezone.now() - timedelta(days=1)
+        for user, hour in zip(self.users, (12, 9, 10, 11)):
+            interaction = BotInteraction.objects.create(
+                telegram_user=user, interaction_type='command', command_or_data='/start'
+            )
+            BotInteraction.objects.filter(id=interaction.id).update(
+                timestamp=yesterday.replace(hour=hour, minute=30)
+            )
+        start = (timezone.now() + timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+        broadcast = self.broadcast(start, spread_by_activity=True)
+
+        plan_broadcast(broadcast)
+        order = list(
+            BroadcastDelivery.objects.filter(broadcast=broadcast).order_by('send_at')
+            .values_list('telegram_user_id', flat=True)
+        )
+        # Hours counted from the window's start hour (10 UTC): 10, 11, 12, then 9 the next morning
+        self.assertEqual(order, [1002, 1003, 1000, 1001])
+
+
+@mock.patch('main_app.telegram_sender.get_sender')
+class DispatchDueTests(BroadcastTestCase):
+    def test_due_deliveries_are_sent_once_and_broadcast_finalized(self, get_sender):
+        sender = get_sender.return_value = FakeSender(failing={1001})
+        broadcast = self.broadcast(timezone.now() - timedelta(hours=2))
+        plan_broadcast(broadcast)
+
+        self.assertEqual(dispatch_due(batch_size=3), (3, 1))
+        self.assertEqual(sorted(sender.sent), [1000, 1002, 1003])
+        failed = BroadcastDelivery.objects.get(broadcast=broadcast, telegram_user_id=1001)
+        self.assertEqual(failed.status, 'failed')
+        self.assertIn('blocked', failed.error)
+
+        broadcast.refresh_from_db()
+        self.assertTrue(broadcast.is_sent)
+        self.assertEqual((broadcast.successful_sends, broadcast.failed_sends), (3, 1))
+
+        self.assertEqual(dispatch_due(), (0, 0))
+        self.assertEqual(len(sender.sent), 3)
+
+    def test_deliveries_wait_for_their_send_time(self, get_sender):
+        sender = get_sender.return_value = FakeSender()
+        broadcast = self.broadcast(timezone.now() + timedelta(hours=1))
+        plan_broadcast(broadcast)
+
+        self.assertEqual(dispatch_due(), (0, 0))
+        self.assertEqual(sender.sent, [])
+        self.assertEqual(BroadcastDelivery.objects.filter(broadcast=broadcast, status='pending').count(), 4)
+        broadcast.refresh_from_db()
+        self.assertFalse(broadcast.is_sent)
+
+    def test_interrupted_sends_are_failed_not_resent(self, get_sender):
+        sender = get_sender.return_value = FakeSender()
+        broadcast = self.broadcast(timezone.now() - timedelta(hours=2))
+        plan_broadcast(broadcast)
+        BroadcastDelivery.objects.filter(broadcast=broadcast, telegram_user_id=1000).update(
+            status='sending', attempted_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(dispatch_due(), (3, 0))
+        self.assertNotIn(1000, sender.sent)
+        interrupted = BroadcastDelivery.objects.get(broadcast=broadcast, telegram_user_id=1000)
+        self.assertEqual((interrupted.status, interrupted.error), ('failed', 'Interrupted while sending'))
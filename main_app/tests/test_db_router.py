@@ -0,0 +1,113 @@
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from main_app import db_router
+from main_app.db_router import PIN_COOKIE, ReplicaPinMiddleware, read_alias, replica_configured, replica_reads
+from main_app.models import TelegramUser
+
+
+class FakeRedis:
+    """The few Redis commands the pin uses, kept in a dict"""
+
+    def __init__(self):
+        self.keys = {}
+
+    def set(self, key, value, ex=None):
+        self.keys[key] = value
+
+    def exists(self, key):
+        return int(key in self.keys)
+
+
+@mock.patch('main_app.db_router.replica_is_fresh', return_value=True)
+@mock.patch('main_app.db_router.replica_configured', return_value=True)
+class ReadAliasTests(TestCase):
+    def test_reads_use_primary_outside_replica_reads(self, *mocks):
+        self.assertEqual(read_alias(), 'default')
+
+    def test_reads_use_replica_inside_replica_reads(self, *mocks):
+        with replica_reads():
+            self.assertEqual(read_alias(), 'replica')
+        self.assertEqual(read_alias(), 'default')
+
+    def test_write_pins_rest_of_scope_to_primary(self, *mocks):
+        with replica_reads():
+            db_router.ReplicaRouter().db_for_write(TelegramUser)
+            self.assertEqual(read_alias(), 'default')
+        with replica_reads():
+            self.assertEqual(read_alias(), 'replica')
+
+    def test_stale_replica_falls_back_to_primary(self, configured, fresh):
+        fresh.return_value = False
+        with replica_reads():
+            self.assertEqual(read_alias(), 'default')
+
+
+@override_settings(REPLICA_PIN_SECONDS=15)
+@mock.patch('main_app.db_router.replica_is_fresh', return_value=True)
+@mock.patch('main_app.db_router.replica_configured', return_value=True)
+class ReplicaPinMiddlewareTests(TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = mock.patch('main_app.db_router.get_redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user('replica-pin', password='secret')
+
+    def _run(self, request, user=None):
+        seen = {}
+
+        def view(request):
+            # DRF authenticates inside the view and stores the user on the Django request
+            request.user = user or AnonymousUser()
+            with replica_reads():
+                seen['alias'] = read_alias()
+            return HttpResponse()
+
+        response = ReplicaPinMiddleware(view)(request)
+        return response, seen['alias']
+
+    def test_write_request_sets_cookie_and_user_pin(self, *mocks):
+        response, _ = self._run(self.factory.post('/api/register/'), user=self.user)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertTrue(db_router.user_is_pinned(self.user.pk))
+
+    def test_pinned_cookie_reads_from_primary(self, *mocks):
+        response, _ = self._run(self.factory.post('/api/register/'))
+        request = self.factory.get('/api/analytics/')
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        _, alias = self._run(request)
+        self.assertEqual(alias, 'default')
+
+    def test_pinned_user_without_cookie_reads_from_primary(self, *mocks):
+        # A JWT client sends no cookies back
+        self._run(self.factory.post('/api/register/'), user=self.user)
+        _, alias = self._run(self.factory.get('/api/analytics/'), user=self.user)
+        self.assertEqual(alias, 'default')
+
+    def test_other_users_read_from_replica(self, *mocks):
+        self._run(self.factory.post('/api/register/'), user=self.user)
+        other = User.objects.create_user('replica-other', password='secret')
+        _, alias = self._run(self.factory.get('/api/analytics/'), user=other)
+        self.assertEqual(alias, 'replica')
+
+
+@skipUnless(replica_configured(), 'set POSTGRES_REPLICA_HOST to run against a second database')
+class ReplicaDatabaseTests(TestCase):
+    """Runs against the real 'replica' alias (a test mirror of the primary)"""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        db_router._lag_checked_at = 0.0
+
+    def test_lag_check_runs_on_replica(self):
+        self.assertTrue(db_router.replica_is_fresh())
+
+    def test_reporting_reads_are_routed_to_replica(self):
+        with replica_reads():
+            self.assertEqual(TelegramUser.objects.all().db, 'replica')
+        self.assertEqual(TelegramUser.objects.all().db, 'default')
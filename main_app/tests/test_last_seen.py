@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.test import TestCase
+
+from main_app.last_seen import FLUSH_LOCK_KEY, FLUSHING_KEY, PENDING_KEY, flush_last_seen, record_last_seen
+from main_app.models import BotConfig, TelegramUser
+from main_app.redis_client import get_redis
+from main_app.tests.utils import delete_keys, requires_redis
+
+EARLIER = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+
+@requires_redis
+class FlushLastSeenTests(TestCase):
+    def setUp(self):
+        delete_keys(PENDING_KEY, FLUSHING_KEY, FLUSH_LOCK_KEY)
+        self.addCleanup(delete_keys, PENDING_KEY, FLUSHING_KEY, FLUSH_LOCK_KEY)
+        self.user = TelegramUser.objects.create(telegram_user_id=100, last_interaction=EARLIER)
+
+    def last_interaction(self, user):
+        user.refresh_from_db()
+        return user.last_interaction
+
+    def test_flush_applies_latest_time_once(self):
+        seen = EARLIER + timedelta(hours=3)
+        record_last_seen(100, when=EARLIER + timedelta(hours=1))
+        record_last_seen(100, when=seen)
+
+        self.assertEqual(flush_last_seen(), 1)
+        self.assertEqual(self.last_interaction(self.user), seen)
+        self.assertFalse(get_redis().exists(PENDING_KEY, FLUSHING_KEY))
+        self.assertEqual(flush_last_seen(), 0)
+
+    def test_flush_never_moves_last_interaction_back(self):
+        record_last_seen(100, when=EARLIER - timedelta(days=1))
+        self.assertEqual(flush_last_seen(), 0)
+        self.assertEqual(self.last_interaction(self.user), EARLIER)
+
+    def test_flush_updates_the_right_bot(self):
+        bot = BotConfig.objects.create(name='second', token='123:abc')
+        other = TelegramUser.objects.create(bot=bot, telegram_user_id=100, last_interaction=EARLIER)
+        seen = EARLIER + timedelta(hours=1)
+        record_last_seen(100, when=seen, bot_id=bot.id)
+
+        self.assertEqual(flush_last_seen(), 1)
+        self.assertEqual(self.last_interaction(other), seen)
+        self.assertEqual(self.last_interaction(self.user), EARLIER)
+
+    def test_flush_in_progress_is_not_overwritten(self):
+        record_last_seen(100, when=EARLIER + timedelta(hours=1))
+        get_redis().set(FLUSH_LOCK_KEY, 'another-flush')
+
+        self.assertEqual(flush_last_seen(), 0)
+        # The pending hash is left alone for the flush that holds the lock
+        self.assertTrue(get_redis().exists(PENDING_KEY))
+        self.assertEqual(self.last_interaction(self.user), EARLIER)
+
+    def test_leftover_flushing_hash_is_applied_before_new_times(self):
+        leftover = EARLIER + timedelta(hours=1)
+        get_redis().hset(FLUSHING_KEY, '100', leftover.timestamp())
+        record_last_seen(100, when=EARLIER + timedelta(hours=2))
+
+        self.assertEqual(flush_last_seen(), 1)
+        self.assertEqual(self.last_interaction(self.user), leftover)
+        self.assertTrue(get_redis().exists(PENDING_KEY))
+
+        self.assertEqual(flush_last_seen(), 1)
+        self.assertEqual(self.last_interaction(self.user), EARLIER + timedelta(hours=2))
@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from main_app.models import DailyReport
+from main_app.reports import downsample, pick_resolution, time_series
+
+MONDAY = date(2026, 1, 5)
+
+
+class DownsampleTests(SimpleTestCase):
+    metrics = ('new_users', 'total_users', 'active_users')
+
+    def points(self, count):
+        return [
+            {'period': MONDAY + timedelta(days=i), 'new_users': 1, 'total_users': 10 + i, 'active_users': i}
+            for i in range(count)
+        ]
+
+    def test_points_that_fit_are_returned_unchanged(self):
+        points = self.points(3)
+        self.assertEqual(downsample(points, self.metrics, 3), (points, 1))
+
+    def test_adjacent_points_are_merged_by_metric_kind(self):
+        merged, factor = downsample(self.points(5), self.metrics, 2)
+        self.assertEqual(factor, 3)
+        self.assertEqual(merged, [
+            # Flows are summed, totals keep the last value, active users are averaged
+            {'period': MONDAY, 'new_users': 3, 'total_users': 12, 'active_users': 1.0},
+            {'period': MONDAY + timedelta(days=3), 'new_users': 2, 'total_users': 14, 'active_users': 3.5},
+        ])
+
+    def test_pick_resolution_prefers_the_finest_that_fits(self):
+        self.assertEqual(pick_resolution(MONDAY, MONDAY + timedelta(days=99), 200), 'day')
+        self.assertEqual(pick_resolution(MONDAY, MONDAY + timedelta(days=399), 200), 'week')
+        self.assertEqual(pick_resolution(MONDAY, MONDAY + timedelta(days=3000), 50), 'month')
+
+
+class TimeSeriesTests(TestCase):
+    def setUp(self):
+        # Two full weeks starting on a Monday
+        for i in range(14):
+            DailyReport.objects.create(
+                date=MONDAY + timedelta(days=i),
+                new_users=1, total_users=10 + i, active_users=i, interactions=10, commands=6, callbacks=4,
+            )
+
+    def test_daily_points(self):
+        series = time_series(['new_users', 'total_users'], MONDAY, MONDAY + timedelta(days=2), resolution='day')
+        self.assertEqual(series['resolution'], 'day')
+        self.assertEqual(series['points'], [
+            {'period': '2026-01-05', 'new_users': 1, 'total_users': 10},
+            {'period': '2026-01-06', 'new_users': 1, 'total_users': 11},
+            {'period': '2026-01-07', 'new_users': 1, 'total_users': 12},
+        ])
+
+    def test_weekly_rollup_in_the_database(self):
+        series = time_series(
+            ['new_users', 'total_users', 'active_users', 'interactions'],
+            MONDAY, MONDAY + timedelta(days=13), resolution='week'
+        )
+        self.assertEqual(series['bucket_size'], 1)
+        self.assertEqual(series['points'], [
+            {'period': '2026-01-05', 'new_users': 7, 'total_users': 16, 'active_users': 3.0, 'interactions': 70},
+            {'period': '2026-01-12', 'new_users': 7, 'total_users': 23, 'active_users': 10.0, 'interactions': 70},
+        ])
+
+    def test_range_is_downsampled_to_max_points(self):
+        series = time_series(['interactions'], MONDAY, MONDAY + timedelta(days=13), resolution='day', max_points=5)
+        self.assertEqual(series['bucket_size'], 3)
+        self.assertEqual([point['interactions'] for point in series['points']], [30, 30, 30, 30, 20])
+        self.assertEqual(series['points'][1]['period'], '2026-01-08')
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin', password='secret', is_staff=True))
+
+        response = client.get('/api/reports/timeseries/', {
+            'metrics': 'new_users', 'start': '2026-01-05', 'end': '2026-01-18', 'resolution': 'week',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['points'], [
+            {'period': '2026-01-05', 'new_users': 7},
+            {'period': '2026-01-12', 'new_users': 7},
+        ])
+
+        response = client.get('/api/reports/timeseries/', {'metrics': 'passwords'})
+        self.assertEqual(response.status_code, 400)
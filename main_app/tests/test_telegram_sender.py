@@ -0,0 +1,45 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from main_app import telegram_sender
+from main_app.fake_bot_api import FakeBotAPI
+from main_app.telegram_sender import TelegramSendError, get_sender
+
+
+class GetSenderTests(SimpleTestCase):
+    def setUp(self):
+        self.api = FakeBotAPI(latency_ms=(0, 0)).start()
+        self.addCleanup(self.api.stop)
+        override = override_settings(TELEGRAM_API_BASE_URL=self.api.base_url, TELEGRAM_SEND_MAX_RETRIES=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        # Start from a fresh process-wide pool and put the real one back afterwards
+        for name, value in (('_client', None), ('_senders', {}), ('_senders_pid', None)):
+            patcher = mock.patch.object(telegram_sender, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        if telegram_sender._client is not None:
+            telegram_sender._client.close()
+
+    def test_send_many_reaches_the_bot_api(self):
+        results = get_sender('123:first').send_many([(1, 'one'), (2, 'two')])
+        self.assertEqual([(r['chat']['id'], r['text']) for r in results], [(1, 'one'), (2, 'two')])
+        self.assertEqual(self.api.calls['sendmessage'], 2)
+
+    def test_senders_of_every_token_share_one_client(self):
+        first, second = get_sender('123:first'), get_sender('456:second')
+        self.assertIsNot(first, second)
+        self.assertIs(first._client, second._client)
+        self.assertEqual(second.send_message(3, 'hi')['chat']['id'], 3)
+        # Closing one sender leaves the shared pool usable for the others
+        second.close()
+        self.assertEqual(first.send_message(4, 'still there')['chat']['id'], 4)
+
+    def test_api_errors_are_returned_per_message(self):
+        self.api.error_rate = 1.0
+        results = get_sender('123:first').send_many([(1, 'one')])
+        self.assertIsInstance(results[0], TelegramSendError)
+        self.assertEqual(results[0].error_code, 429)
@@ -0,0 +1,89 @@
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from main_app.redis_client import get_redis
+from main_app.tests.utils import delete_keys, requires_redis
+from main_app.throttling import EndpointIPThrottle, LoginThrottle, LoginUsernameThrottle
+
+
+class ThreePerMinuteThrottle(EndpointIPThrottle):
+    scope = 'test_three'
+    rate = '3/min'
+
+
+@requires_redis
+class SlidingWindowThrottleTests(TestCase):
+    def setUp(self):
+        delete_keys('tbot:throttle:test_three:*', 'tbot:throttle:login*')
+        self.addCleanup(delete_keys, 'tbot:throttle:test_three:*', 'tbot:throttle:login*')
+        self.factory = APIRequestFactory()
+
+    def allow(self, ip='10.0.0.1'):
+        throttle = ThreePerMinuteThrottle()
+        request = Request(self.factory.get('/api/public/', REMOTE_ADDR=ip))
+        return throttle.allow_request(request, None), throttle.wait()
+
+    def test_blocks_after_limit_with_wait(self):
+        self.assertEqual([self.allow()[0] for _ in range(3)], [True, True, True])
+        allowed, wait = self.allow()
+        self.assertFalse(allowed)
+        self.assertTrue(0 < wait <= 60)
+
+    def test_limits_are_per_ip(self):
+        for _ in range(3):
+            self.allow()
+        self.assertFalse(self.allow()[0])
+        self.assertTrue(self.allow(ip='10.0.0.2')[0])
+
+    def test_spoofed_forwarded_for_does_not_get_a_fresh_limit(self):
+        def allow_spoofed(attempt):
+            request = self.factory.get('/api/public/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=f"203.0.113.{attempt}")
+            return ThreePerMinuteThrottle().allow_request(Request(request), None)
+
+        self.assertEqual([allow_spoofed(attempt) for attempt in range(4)], [True, True, True, False])
+
+    def test_spoofed_forwarded_for_still_gets_429(self):
+        client = APIClient()
+        limit = LoginThrottle().num_requests
+        statuses = [
+            client.post(
+                '/api/login/', {'username': f"user{attempt}", 'password': 'wrong'},
+                REMOTE_ADDR='10.2.0.1', HTTP_X_FORWARDED_FOR=f"203.0.113.{attempt}",
+            ).status_code
+            for attempt in range(limit + 1)
+        ]
+        self.assertNotIn(429, statuses[:limit])
+        self.assertEqual(statuses[-1], 429)
+
+    def test_rejected_requests_do_not_count(self):
+        for _ in range(10):
+            self.allow()
+        # Only the three allowed requests were recorded in the current window
+        counts = [int(value) for value in self._window_counts()]
+        self.assertEqual(sum(counts), 3)
+
+    def _window_counts(self):
+        client = get_redis()
+        return [client.get(key) for key in client.scan_iter(match='tbot:throttle:test_three:*')]
+
+    def test_fails_open_without_redis(self):
+        with mock.patch('main_app.throttling._sliding_window', side_effect=ConnectionError('down')):
+            self.assertTrue(all(self.allow()[0] for _ in range(10)))
+
+    def test_login_is_limited_per_username_across_ips(self):
+        client = APIClient()
+        limit = LoginUsernameThrottle().num_requests
+        statuses = []
+        for attempt in range(limit + 1):
+            response = client.post(
+                '/api/login/',
+                {'username': 'Victim' if attempt % 2 else 'victim', 'password': 'wrong'},
+                REMOTE_ADDR=f"10.1.0.{attempt + 1}",
+            )
+            statuses.append(response.status_code)
+        self.assertNotIn(429, statuses[:limit])
+        self.assertEqual(statuses[-1], 429)
+        self.assertIn('Retry-After', response)
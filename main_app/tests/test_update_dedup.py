@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+from telegram.ext import ApplicationHandlerStop
+
+from main_app.tests.utils import delete_keys, requires_redis
+from main_app.update_dedup import CHUNK_BITS, KEY_PREFIX, UpdateDeduplicator, dedup_updates
+
+BOT_ID = 987654  # keeps the test's Redis keys apart from real bots
+
+
+class LocalWindowTests(SimpleTestCase):
+    def setUp(self):
+        # Local window only: every Redis call fails
+        patcher = mock.patch.object(UpdateDeduplicator, '_seen_shared', side_effect=ConnectionError('down'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_repeated_update_is_a_duplicate(self):
+        deduplicator = UpdateDeduplicator()
+        self.assertFalse(await deduplicator.is_duplicate(BOT_ID, 1))
+        self.assertTrue(await deduplicator.is_duplicate(BOT_ID, 1))
+        self.assertEqual(deduplicator.stats()['local_duplicates'], 1)
+
+    async def test_bots_have_separate_windows(self):
+        deduplicator = UpdateDeduplicator()
+        self.assertFalse(await deduplicator.is_duplicate(1, 7))
+        self.assertFalse(await deduplicator.is_duplicate(2, 7))
+
+    async def test_window_is_bounded_and_redis_errors_let_updates_through(self):
+        deduplicator = UpdateDeduplicator(local_size=2)
+        for update_id in (1, 2, 3):
+            await deduplicator.is_duplicate(BOT_ID, update_id)
+        # 1 fell out of the window; without Redis it is let through
+        self.assertFalse(await deduplicator.is_duplicate(BOT_ID, 1))
+        self.assertTrue(await deduplicator.is_duplicate(BOT_ID, 3))
+        self.assertEqual(deduplicator.stats()['redis_errors'], 4)
+
+
+@requires_redis
+class SharedBitmapTests(SimpleTestCase):
+    def setUp(self):
+        delete_keys(f"{KEY_PREFIX}:{BOT_ID}:*")
+        self.addCleanup(delete_keys, f"{KEY_PREFIX}:{BOT_ID}:*")
+
+    async def test_update_seen_by_another_replica_is_a_duplicate(self):
+        first, second = UpdateDeduplicator(), UpdateDeduplicator()
+        self.assertFalse(await first.is_duplicate(BOT_ID, 42))
+        self.assertTrue(await second.is_duplicate(BOT_ID, 42))
+        self.assertEqual(second.stats()['shared_duplicates'], 1)
+
+    async def test_ids_on_chunk_boundary_are_distinct(self):
+        first, second = UpdateDeduplicator(), UpdateDeduplicator()
+        self.assertFalse(await first.is_duplicate(BOT_ID, CHUNK_BITS - 1))
+        self.assertFalse(await second.is_duplicate(BOT_ID, CHUNK_BITS))
+        self.assertTrue(await second.is_duplicate(BOT_ID, CHUNK_BITS - 1))
+
+    async def test_dedup_handler_stops_redelivered_updates(self):
+        context = SimpleNamespace(bot_data={'bot_id': BOT_ID})
+        update = SimpleNamespace(update_id=500)
+        with mock.patch('main_app.update_dedup._deduplicator', UpdateDeduplicator()):
+            await dedup_updates(update, context)
+            with self.assertRaises(ApplicationHandlerStop):
+                await dedup_updates(update, context)
@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+
+from django.db import DataError
+from django.test import TestCase
+
+from main_app.models import TelegramUser
+from main_app.user_import import ImportFormatError, import_telegram_users
+
+
+def csv_file(*lines):
+    return io.StringIO('\n'.join(lines) + '\n')
+
+
+class ImportTelegramUsersTests(TestCase):
+    def test_inserts_new_users_and_updates_existing_ones(self):
+        TelegramUser.objects.create(telegram_user_id=1, first_name='Old', last_name='Name')
+        result = import_telegram_users(csv_file(
+            'telegram_user_id,first_name,last_name',
+            '1,New,',
+            '2,Second,User',
+        ))
+
+        self.assertEqual((result['inserted'], result['updated'], result['rejected']), (1, 1, 0))
+        first = TelegramUser.objects.get(telegram_user_id=1)
+        # Blank values keep what is stored
+        self.assertEqual((first.first_name, first.last_name), ('New', 'Name'))
+        self.assertTrue(TelegramUser.objects.get(telegram_user_id=2).is_active)
+
+    def test_import_is_not_activity(self):
+        seen = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+        TelegramUser.objects.create(telegram_user_id=1, last_interaction=seen)
+        import_telegram_users(csv_file('telegram_user_id,first_name', '1,Ann', '2,Bob'))
+
+        self.assertEqual(TelegramUser.objects.get(telegram_user_id=1).last_interaction, seen)
+        self.assertIsNone(TelegramUser.objects.get(telegram_user_id=2).last_interaction)
+
+    @mock.patch('main_app.user_import.publish_invalidation')
+    def test_updated_users_are_invalidated_after_commit(self, publish):
+        TelegramUser.objects.create(telegram_user_id=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            import_telegram_users(csv_file('telegram_user_id,first_name', '1,Ann', '2,Bob'))
+        # Only existing users can be cached by the bots
+        publish.assert_called_once_with([1])
+
+    def test_is_active_is_applied_per_row(self):
+        TelegramUser.objects.create(telegram_user_id=1, is_active=False)
+        TelegramUser.objects.create(telegram_user_id=2, is_active=True)
+        TelegramUser.objects.create(telegram_user_id=3, is_active=False)
+        import_telegram_users(csv_file(
+            'telegram_user_id,is_active',
+            '1,',
+            '2,false',
+            '3,yes',
+            '4,',
+        ))
+
+        active = dict(TelegramUser.objects.values_list('telegram_user_id', 'is_active'))
+        # A blank is_active must not re-activate a user switched off by an admin
+        self.assertEqual(active, {1: False, 2: False, 3: True, 4: True})
+
+    def test_file_without_is_active_keeps_existing_flags(self):
+        TelegramUser.objects.create(telegram_user_id=1, is_active=False)
+        import_telegram_users(csv_file('telegram_user_id,first_name', '1,Ann'))
+        self.assertFalse(TelegramUser.objects.get(telegram_user_id=1).is_active)
+
+    def test_invalid_rows_are_reported_not_imported(self):
+        output = io.StringIO()
+        result = import_telegram_users(csv_file(
+            'telegram_user_id,is_active',
+            'abc,true',
+            '5,maybe',
+            '007,true',
+            '7,false',
+        ), rejects=csv.writer(output))
+
+        self.assertEqual((result['rows'], result['inserted'], result['rejected']), (4, 1, 3))
+        rejects = list(csv.reader(io.StringIO(output.getvalue())))
+        self.assertEqual([row[0] for row in rejects], ['1', '2', '3'])
+        # '007' and '7' are the same user; the later row wins
+        self.assertFalse(TelegramUser.objects.get(telegram_user_id=7).is_active)
+
+    def test_taken_username_is_cleared_or_rejected(self):
+        TelegramUser.objects.create(telegram_user_id=1, telegram_username='taken')
+        result = import_telegram_users(csv_file('telegram_user_id,telegram_username', '2,@taken'))
+        self.assertEqual(result['usernames_cleared'], 1)
+        self.assertIsNone(TelegramUser.objects.get(telegram_user_id=2).telegram_username)
+
+        result = import_telegram_users(
+            csv_file('telegram_user_id,telegram_username', '3,taken'), on_username_conflict='reject'
+        )
+        self.assertEqual(result['rejected'], 1)
+        self.assertFalse(TelegramUser.objects.filter(telegram_user_id=3).exists())
+
+    def test_ndjson_import(self):
+        lines = [json.dumps({'telegram_user_id': 9, 'first_name': 'Nina', 'is_active': False}), 'not json']
+        result = import_telegram_users(io.StringIO('\n'.join(lines)), import_format='ndjson')
+        self.assertEqual((result['inserted'], result['rejected']), (1, 1))
+        self.assertFalse(TelegramUser.objects.get(telegram_user_id=9).is_active)
+
+    def test_copy_error_is_raised_unchanged(self):
+        # PostgreSQL text cannot hold NUL, so COPY itself fails
+        line = json.dumps({'telegram_user_id': 1, 'first_name': 'bad\u0000name'})
+        with self.assertRaises(DataError):
+            import_telegram_users(io.StringIO(line), import_format='ndjson')
+        # The transaction was rolled back cleanly and the next import works
+        result = import_telegram_users(csv_file('telegram_user_id', '1'))
+        self.assertEqual(result['inserted'], 1)
+
+    def test_unknown_columns_are_refused(self):
+        with self.assertRaises(ImportFormatError):
+            import_telegram_users(csv_file('telegram_user_id,password', '1,secret'))
@@ -0,0 +1,23 @@
+"""Helpers shared by the test modules"""
+from unittest import skipUnless
+
+from main_app.redis_client import get_redis
+
+
+def _redis_available():
+    try:
+        return bool(get_redis().ping())
+    except Exception:
+        return False
+
+
+# Tests using Redis delete the keys they touch: point REDIS_URL at a scratch database
+requires_redis = skipUnless(_redis_available(), 'needs a Redis server at REDIS_URL')
+
+
+def delete_keys(*patterns):
+    client = get_redis()
+    for pattern in patterns:
+        keys = list(client.scan_iter(match=pattern))
+        if keys:
+            client.delete(*keys)
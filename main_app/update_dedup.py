@@ -0,0 +1,123 @@
+"""
+Drop Telegram updates that were already processed.
+
+Telegram redelivers updates when a bot restarts before confirming its
+offset, when a webhook call times out, or when several replicas poll
+overlapping batches. dedup_updates runs before every other handler
+(group -2) and stops an update whose update_id was seen before:
+
+* a per-bot ring buffer of the last UPDATE_DEDUP_LOCAL_SIZE ids answers
+  repeats inside this process without any I/O;
+* a Redis bitmap shared by all replicas catches the rest. update_ids
+  increase per bot, so each id is one bit at offset update_id % CHUNK_BITS
+  in a chunk key that expires after UPDATE_DEDUP_TTL (Telegram keeps
+  updates for 24 hours). SETBIT returns the previous bit, so check and
+  mark are one atomic step, and a million ids take 128 KB.
+
+An update is marked when it arrives, not when its handlers finish, so a
+crash mid-update drops the redelivery (at most once). If Redis is
+unavailable, only the local window applies and updates are let through.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from telegram.ext import ApplicationHandlerStop
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'tbot:updates:seen'
+CHUNK_BITS = 1 << 20
+
+
+class UpdateDeduplicator:
+    def __init__(self, local_size=10000, ttl=86400, report_interval=300):
+        self.local_size = local_size
+        self.ttl = ttl
+        self.report_interval = report_interval
+        self._recent = {}  # bot_id -> (deque of ids, set of ids)
+        self._lock = threading.Lock()
+        self._next_report = time.monotonic() + report_interval
+        self.seen = 0
+        self.local_duplicates = 0
+        self.shared_duplicates = 0
+        self.redis_errors = 0
+
+    def _seen_locally(self, bot_id, update_id):
+        """Check and remember an id in this process's window"""
+        with self._lock:
+            ring, members = self._recent.setdefault(bot_id, (deque(), set()))
+            if update_id in members:
+                return True
+            ring.append(update_id)
+            members.add(update_id)
+            if len(ring) > self.local_size:
+                members.discard(ring.popleft())
+            return False
+
+    def _seen_shared(self, bot_id, update_id):
+        """Set the id's bit in Redis; True if it was already set"""
+        key = f"{KEY_PREFIX}:{bot_id or 'default'}:{update_id // CHUNK_BITS}"
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.setbit(key, update_id % CHUNK_BITS, 1)
+        pipe.expire(key, self.ttl)
+        previous, _ = pipe.execute()
+        return bool(previous)
+
+    async def is_duplicate(self, bot_id, update_id):
+        self.seen += 1
+        if self._seen_locally(bot_id, update_id):
+            self.local_duplicates += 1
+            return True
+        try:
+            duplicate = await sync_to_async(self._seen_shared, thread_sensitive=False)(bot_id, update_id)
+        except Exception as e:
+            self.redis_errors += 1
+            if self.redis_errors % 100 == 1:
+                logger.warning(f"Update dedup falling back to the local window: {str(e)}")
+            return False
+        if duplicate:
+            self.shared_duplicates += 1
+        return duplicate
+
+    def stats(self):
+        duplicates = self.local_duplicates + self.shared_duplicates
+        return {
+            'seen': self.seen,
+            'duplicates': duplicates,
+            'duplicate_rate': round(duplicates / self.seen, 4) if self.seen else 0.0,
+            'local_duplicates': self.local_duplicates,
+            'shared_duplicates': self.shared_duplicates,
+            'redis_errors': self.redis_errors,
+        }
+
+    def maybe_report(self):
+        if time.monotonic() >= self._next_report:
+            self._next_report = time.monotonic() + self.report_interval
+            logger.info(f"Update dedup stats: {self.stats()}")
+
+
+_deduplicator = None
+
+def get_update_deduplicator():
+    global _deduplicator
+    if _deduplicator is None:
+        _deduplicator = UpdateDeduplicator(
+            local_size=settings.UPDATE_DEDUP_LOCAL_SIZE,
+            ttl=settings.UPDATE_DEDUP_TTL,
+        )
+    return _deduplicator
+
+
+async def dedup_updates(update, context):
+    """Stop processing of updates that were already handled (registered in group -2)"""
+    deduplicator = get_update_deduplicator()
+    deduplicator.maybe_report()
+    if await deduplicator.is_duplicate(context.bot_data.get('bot_id'), update.update_id):
+        logger.debug(f"Dropped duplicate update {update.update_id}")
+        raise ApplicationHandlerStop
@@ -8,10 +8,14 @@ urlpatterns = [
     
     # Authentication endpoints
     path('register/', views.register_user, name='register_user'),
+    path('register/bulk/', views.register_users_bulk, name='register_users_bulk'),
     path('login/', views.login_user, name='login_user'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     
     # Protected endpoints
     path('protected/', views.protected_endpoint, name='protected_endpoint'),
     path('telegram-users/', views.telegram_users_list, name='telegram_users_list'),
+    path('telegram-users/search/', views.telegram_users_search, name='telegram_users_search'),
+    path('analytics/', views.bot_analytics, name='bot_analytics'),
+    path('reports/timeseries/', views.report_time_series, name='report_time_series'),
 ]
@@ -0,0 +1,152 @@
+"""
+Bounded LRU + TTL cache of TelegramUser records for the bot process.
+
+Lookups by (bot, Telegram id) are served from memory; the bot writes
+through on upsert. Other processes (e.g. the admin) publish invalidations on a
+Redis pub/sub channel which a background thread applies locally.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'tbot:telegram_user:invalidate'
+
+
+class TelegramUserCache:
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        # Bots seen so far, so an invalidation by Telegram id reaches every bot's entry
+        self._bot_ids = {None}
+        self._lock = threading.Lock()
+        self._listener = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, telegram_user_id, bot_id=None):
+        key = (bot_id, telegram_user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at < now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return user
+
+    def put(self, user):
+        key = (user.bot_id, user.telegram_user_id)
+        with self._lock:
+            self._bot_ids.add(user.bot_id)
+            self._entries[key] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, telegram_user_id):
+        """Drop the user's entries for every bot"""
+        with self._lock:
+            for bot_id in self._bot_ids:
+                if self._entries.pop((bot_id, telegram_user_id), None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+    def start_invalidation_listener(self, stats_interval=300):
+        """Apply invalidations published by other processes (runs in a daemon thread)"""
+        if self._listener is not None:
+            return
+        self._listener = threading.Thread(
+            target=self._listen, args=(stats_interval,), name='telegram-user-cache-invalidation', daemon=True
+        )
+        self._listener.start()
+
+    def _listen(self, stats_interval):
+        next_stats = time.monotonic() + stats_interval
+        while True:
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                try:
+                    pubsub.subscribe(INVALIDATION_CHANNEL)
+                    # Anything may have changed while we were not subscribed
+                    self.clear()
+                    while True:
+                        message = pubsub.get_message(timeout=1.0)
+                        if message is not None:
+                            self._apply_invalidation(message['data'])
+                        if time.monotonic() >= next_stats:
+                            logger.info(f"Telegram user cache stats: {self.stats()}")
+                            next_stats = time.monotonic() + stats_interval
+                finally:
+                    # Release the broken connection before reconnecting
+                    pubsub.close()
+            except Exception as e:
+                logger.warning(f"Telegram user cache invalidation listener error: {str(e)}")
+                time.sleep(5)
+
+    def _apply_invalidation(self, data):
+        payload = json.loads(data)
+        if payload == '*':
+            self.clear()
+        else:
+            for telegram_user_id in payload:
+                self.invalidate(telegram_user_id)
+
+
+_cache = None
+
+def get_user_cache():
+    """Return the process-wide TelegramUser cache"""
+    global _cache
+    if _cache is None:
+        _cache = TelegramUserCache(
+            maxsize=settings.TELEGRAM_USER_CACHE_SIZE,
+            ttl=settings.TELEGRAM_USER_CACHE_TTL,
+        )
+    return _cache
+
+
+def publish_invalidation(telegram_user_ids=None):
+    """Tell every bot process to drop the given users (or everything when None)"""
+    payload = '*' if telegram_user_ids is None else [int(telegram_user_id) for telegram_user_id in telegram_user_ids]
+    try:
+        get_redis().publish(INVALIDATION_CHANNEL, json.dumps(payload))
+    except Exception as e:
+        logger.warning(f"Could not publish Telegram user cache invalidation: {str(e)}")
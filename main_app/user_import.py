@@ -0,0 +1,262 @@
+"""
+Bulk import of Telegram users.
+
+Rows are streamed with COPY into a temporary staging table, validated
+with a handful of set-based UPDATEs and merged into main_app_telegramuser
+with a single INSERT ... ON CONFLICT. Bad rows are marked with a reason
+and reported instead of aborting the batch. Users are imported for the
+default bot (TELEGRAM_BOT_TOKEN).
+"""
+import csv
+import json
+import logging
+import uuid
+
+from django.db import connection, transaction
+
+from .models import TelegramUser
+from .pg_copy import copy_rows_in
+from .user_cache import publish_invalidation
+
+logger = logging.getLogger(__name__)
+
+IMPORT_COLUMNS = ('telegram_user_id', 'telegram_username', 'first_name', 'last_name', 'is_active')
+STAGING_COLUMNS = ('row_no',) + IMPORT_COLUMNS + ('reason',)
+USERNAME_CONFLICT_POLICIES = ('null', 'reject')
+# Above this many updated users the bots' whole user cache is invalidated instead
+INVALIDATION_BATCH_LIMIT = 10000
+
+
+class ImportFormatError(ValueError):
+    """Raised when the input file cannot be imported at all"""
+
+
+def _csv_rows(fileobj):
+    reader = csv.reader(fileobj)
+    header = [name.strip() for name in next(reader, [])]
+    unknown = set(header) - set(IMPORT_COLUMNS)
+    if unknown:
+        raise ImportFormatError(f"Unknown columns: {', '.join(sorted(unknown))}")
+    if 'telegram_user_id' not in header:
+        raise ImportFormatError('Missing required column: telegram_user_id')
+
+    for row_no, values in enumerate(reader, 1):
+        if len(values) != len(header):
+            yield row_no, {}, f"expected {len(header)} fields, got {len(values)}"
+            continue
+        yield row_no, dict(zip(header, values)), None
+
+
+def _ndjson_rows(fileobj):
+    for row_no, line in enumerate(fileobj, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row_no, {}, f"invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield row_no, {}, 'expected a JSON object'
+            continue
+        yield row_no, {name: record.get(name) for name in IMPORT_COLUMNS}, None
+
+
+def _normalize_telegram_user_id(value):
+    """Return the canonical text form of a Telegram id, or None if invalid"""
+    try:
+        telegram_user_id = int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+    return str(telegram_user_id) if abs(telegram_user_id) < 2 ** 63 else None
+
+
+def _staging_rows(parsed_rows):
+    for row_no, record, reason in parsed_rows:
+        values = []
+        for name in IMPORT_COLUMNS:
+            value = record.get(name)
+            values.append(None if value is None else str(value).strip())
+        if reason is None:
+            # Canonicalize ids up front so '007' and '7' are treated as the same user
+            telegram_user_id = _normalize_telegram_user_id(values[0])
+            if telegram_user_id is None:
+                reason = 'invalid telegram_user_id'
+            else:
+                values[0] = telegram_user_id
+        yield (row_no, *values, reason)
+
+
+def import_telegram_users(fileobj, import_format='csv', on_username_conflict='null', rejects=None):
+    """
+    Import Telegram users from a CSV or NDJSON text stream.
+
+    Existing users (matched on telegram_user_id) are updated, new ones are
+    inserted. is_active is only applied to existing users on rows that
+    provide it; new users without it are active. A username already owned
+    by another Telegram user is either cleared (on_username_conflict='null')
+    or the row is rejected ('reject'). Rejected rows are written to the optional rejects writer
+    as (row_no, telegram_user_id, reason) tuples.
+
+    Returns a dict of row counts.
+    """
+    if on_username_conflict not in USERNAME_CONFLICT_POLICIES:
+        raise ValueError(f"on_username_conflict must be one of {USERNAME_CONFLICT_POLICIES}")
+    if import_format == 'csv':
+        parsed_rows = _csv_rows(fileobj)
+    elif import_format == 'ndjson':
+        parsed_rows = _ndjson_rows(fileobj)
+    else:
+        raise ImportFormatError(f"Unsupported format: {import_format}")
+
+    target = TelegramUser._meta.db_table
+    staging = f"{target}_import_{uuid.uuid4().hex[:8]}"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Dropped with the transaction, so a failed COPY leaves nothing behind and
+        # its error is not masked by a cleanup statement in the aborted transaction
+        cursor.execute(f"""
+            CREATE TEMPORARY TABLE {staging} (
+                row_no bigint PRIMARY KEY,
+                telegram_user_id text,
+                telegram_username text,
+                first_name text,
+                last_name text,
+                is_active text,
+                reason text,
+                username_cleared boolean NOT NULL DEFAULT false
+            ) ON COMMIT DROP
+        """)
+        total = copy_rows_in(cursor, staging, STAGING_COLUMNS, _staging_rows(parsed_rows))
+        cursor.execute(f"ANALYZE {staging}")
+        _validate(cursor, staging, target, on_username_conflict)
+        inserted, updated, updated_ids = _merge(cursor, staging, target)
+        if updated:
+            # Bot processes cache TelegramUser rows; large imports drop the whole cache
+            transaction.on_commit(lambda: publish_invalidation(updated_ids))
+
+        cursor.execute(f"SELECT COUNT(*) FROM {staging} WHERE reason IS NOT NULL")
+        rejected = cursor.fetchone()[0]
+        if rejects is not None and rejected:
+            cursor.execute(
+                f"SELECT row_no, telegram_user_id, reason FROM {staging} WHERE reason IS NOT NULL ORDER BY row_no"
+            )
+            while True:
+                batch = cursor.fetchmany(5000)
+                if not batch:
+                    break
+                rejects.writerows(batch)
+
+        cursor.execute(f"SELECT COUNT(*) FROM {staging} WHERE reason IS NULL AND username_cleared")
+        usernames_cleared = cursor.fetchone()[0]
+        # Inside an outer transaction ON COMMIT DROP would fire only at its end
+        cursor.execute(f"DROP TABLE {staging}")
+
+    result = {
+        'rows': total,
+        'inserted': inserted,
+        'updated': updated,
+        'rejected': rejected,
+        'usernames_cleared': usernames_cleared,
+    }
+    logger.info(f"Telegram user import finished: {result}")
+    return result
+
+
+def _validate(cursor, staging, target, on_username_conflict):
+    """Mark invalid rows with a reason and normalize the remaining ones"""
+    cursor.execute(f"""
+        UPDATE {staging} SET
+            telegram_username = NULLIF(ltrim(telegram_username, '@'), ''),
+            first_name = NULLIF(first_name, ''),
+            last_name = NULLIF(last_name, ''),
+            is_active = NULLIF(lower(is_active), '')
+        WHERE reason IS NULL;
+
+        UPDATE {staging} SET reason = 'invalid is_active'
+        WHERE reason IS NULL AND is_active NOT IN ('t', 'f', 'true', 'false', '1', '0', 'yes', 'no');
+
+        UPDATE {staging} SET reason = 'value longer than 100 characters'
+        WHERE reason IS NULL AND GREATEST(length(telegram_username), length(first_name), length(last_name)) > 100;
+
+        UPDATE {staging} s SET reason = 'superseded by a later row for the same telegram_user_id'
+        FROM (
+            SELECT telegram_user_id, MAX(row_no) AS last_row_no
+            FROM {staging} WHERE reason IS NULL
+            GROUP BY telegram_user_id HAVING COUNT(*) > 1
+        ) dup
+        WHERE s.reason IS NULL AND s.telegram_user_id = dup.telegram_user_id AND s.row_no < dup.last_row_no;
+    """)
+
+    # Nullable unique usernames: a username may be claimed by one Telegram user only,
+    # either by an existing row or by the last row in the batch that uses it
+    conflict_action = (
+        "username_cleared = true, telegram_username = NULL"
+        if on_username_conflict == 'null'
+        else "reason = 'telegram_username already taken'"
+    )
+    cursor.execute(f"""
+        UPDATE {staging} s SET {conflict_action}
+        FROM (
+            SELECT telegram_username, MAX(row_no) AS last_row_no
+            FROM {staging} WHERE reason IS NULL AND telegram_username IS NOT NULL
+            GROUP BY telegram_username HAVING COUNT(*) > 1
+        ) dup
+        WHERE s.reason IS NULL AND s.telegram_username = dup.telegram_username AND s.row_no < dup.last_row_no;
+
+        UPDATE {staging} s SET {conflict_action}
+        FROM {target} t
+        WHERE s.reason IS NULL
+          AND s.telegram_username IS NOT NULL
+          AND t.bot_id IS NULL
+          AND t.telegram_username = s.telegram_username
+          AND t.telegram_user_id <> s.telegram_user_id::bigint;
+    """)
+
+    # One valid row per id remains; _merge looks rows up by id
+    cursor.execute(f"CREATE UNIQUE INDEX ON {staging} (telegram_user_id) WHERE reason IS NULL")
+
+
+def _merge(cursor, staging, target):
+    """
+    Upsert all valid staging rows in one statement.
+
+    Returns (inserted, updated, updated ids), with the ids only when there are
+    at most INVALIDATION_BATCH_LIMIT of them. New users get no last_interaction and
+    existing users keep theirs: an import is not activity.
+    """
+    # EXCLUDED.is_active already defaults blanks to true, so existing users read the
+    # row's own value: a row without is_active cannot re-activate a user an admin
+    # switched off. Ids are canonical text in staging (see _staging_rows)
+    cursor.execute(f"""
+        WITH merged AS (
+            INSERT INTO {target} AS t
+                (telegram_user_id, telegram_username, first_name, last_name, is_active, created_at, last_interaction)
+            SELECT
+                telegram_user_id::bigint,
+                telegram_username,
+                first_name,
+                last_name,
+                COALESCE(is_active::boolean, true),
+                now(),
+                NULL::timestamptz
+            FROM {staging}
+            WHERE reason IS NULL
+            ON CONFLICT (telegram_user_id) WHERE bot_id IS NULL DO UPDATE SET
+                telegram_username = COALESCE(EXCLUDED.telegram_username, t.telegram_username),
+                first_name = COALESCE(EXCLUDED.first_name, t.first_name),
+                last_name = COALESCE(EXCLUDED.last_name, t.last_name),
+                is_active = COALESCE((
+                    SELECT s.is_active::boolean FROM {staging} s
+                    WHERE s.reason IS NULL AND s.telegram_user_id = EXCLUDED.telegram_user_id::text
+                ), t.is_active)
+            RETURNING t.telegram_user_id, (xmax = 0) AS inserted
+        )
+        SELECT
+            COUNT(*) FILTER (WHERE inserted),
+            COUNT(*) FILTER (WHERE NOT inserted),
+            (array_agg(telegram_user_id) FILTER (WHERE NOT inserted))[1:%s]
+        FROM merged
+    """, [INVALIDATION_BATCH_LIMIT])
+    inserted, updated, updated_ids = cursor.fetchone()
+    return inserted, updated, (updated_ids or []) if updated <= INVALIDATION_BATCH_LIMIT else None
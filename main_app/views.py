@@ -1,17 +1,25 @@
-from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework import serializers, status
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.conf import settings
 from django.utils import timezone
 from .models import TelegramUser, UserProfile
-from .serializers import UserRegistrationSerializer, TelegramUserSerializer, PublicDataSerializer
+from .serializers import UserRegistrationSerializer, TelegramUserSerializer, TelegramUserReadSerializer, PublicDataSerializer
 from .tasks import send_welcome_email
+from .accounts import ACCOUNT_FIELDS, bulk_register_users
+from .db_router import replica_reads
+from .reports import METRICS, RESOLUTIONS, time_series
+from .search import search_telegram_users
+from .throttling import AnonIPThrottle, PublicThrottle, RegisterThrottle, LoginThrottle, LoginUsernameThrottle
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@throttle_classes([PublicThrottle])
 def public_endpoint(request):
     """
     Public endpoint accessible to everyone
@@ -50,16 +58,18 @@ def protected_endpoint(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AnonIPThrottle, RegisterThrottle])
 def register_user(request):
     """
     User registration endpoint
     """
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
-        user = serializer.save()
-        
-        # Send welcome email asynchronously
-        send_welcome_email.delay(user.id)
+        with transaction.atomic():
+            user = serializer.save()
+            
+            # Send welcome email asynchronously, once the user is visible to workers
+            transaction.on_commit(lambda: send_welcome_email.delay(user.id), robust=True)
         
         # Generate JWT tokens
         refresh = RefreshToken.for_user(user)
@@ -78,8 +88,42 @@ def register_user(request):
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def register_users_bulk(request):
+    """
+    Create many users at once (admin only)
+    """
+    if not request.user.is_staff:
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    
+    users = request.data.get('users')
+    if not isinstance(users, list) or not all(isinstance(row, dict) for row in users):
+        return Response({'error': 'users must be a list of objects'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(users) > settings.BULK_REGISTER_MAX_USERS:
+        return Response(
+            {'error': f"At most {settings.BULK_REGISTER_MAX_USERS} users per request"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        # bool('false') is True; accept only real booleans and their usual spellings
+        send_emails = serializers.BooleanField().to_internal_value(request.data.get('send_welcome_email', True))
+    except serializers.ValidationError:
+        return Response({'error': 'send_welcome_email must be a boolean'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    rows = [{field: row.get(field) for field in ACCOUNT_FIELDS} for row in users]
+    result = bulk_register_users(rows, send_emails=send_emails)
+    return Response({
+        'created': result['created'],
+        'rejected': result['rejected'],
+        'usernames': result['usernames'],
+        'errors': result['errors'],
+    }, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_400_BAD_REQUEST)
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginThrottle, LoginUsernameThrottle])
 def login_user(request):
     """
     User login endpoint
@@ -110,12 +154,30 @@ def telegram_users_list(request):
     List all telegram users (protected endpoint)
     """
     telegram_users = TelegramUser.objects.all()
-    serializer = TelegramUserSerializer(telegram_users, many=True)
+    serializer = TelegramUserReadSerializer(telegram_users)
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def telegram_users_search(request):
+    """
+    Search telegram users by username, name or Telegram id prefix, best match first
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'The q parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = TelegramUserReadSerializer(search_telegram_users(query, limit), extra_fields=('rank',))
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads()
 def bot_analytics(request):
     """Get bot analytics (admin only)"""
     if not request.user.is_staff:
@@ -127,9 +189,17 @@ def bot_analytics(request):
     
     # Calculate analytics
     total_users = TelegramUser.objects.count()
-    active_users_week = TelegramUser.objects.filter(
-        last_interaction__gte=timezone.now() - timedelta(days=7)
-    ).count()
+    try:
+        from .active_users import daily_active_users, weekly_active_users, monthly_active_users
+        active_users_today = daily_active_users()
+        active_users_week = weekly_active_users()
+        active_users_month = monthly_active_users()
+    except Exception:
+        # Sketches unavailable (e.g. Redis down) - fall back to the user table
+        now = timezone.now()
+        active_users_today = TelegramUser.objects.filter(last_interaction__gte=now - timedelta(days=1)).count()
+        active_users_week = TelegramUser.objects.filter(last_interaction__gte=now - timedelta(days=7)).count()
+        active_users_month = TelegramUser.objects.filter(last_interaction__gte=now - timedelta(days=30)).count()
     
     total_interactions = BotInteraction.objects.count()
     interactions_today = BotInteraction.objects.filter(
@@ -145,7 +215,9 @@ def bot_analytics(request):
     
     data = {
         'total_users': total_users,
+        'active_users_today': active_users_today,
         'active_users_week': active_users_week,
+        'active_users_month': active_users_month,
         'total_interactions': total_interactions,
         'interactions_today': interactions_today,
         'popular_commands': list(popular_commands),
@@ -153,3 +225,37 @@ def bot_analytics(request):
     }
     
     return Response(data, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def report_time_series(request):
+    """Stored daily report metrics as a time series (admin only)"""
+    if not request.user.is_staff:
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    
+    from datetime import date, timedelta
+    
+    params = request.query_params
+    metrics = [metric for metric in params.get('metrics', ','.join(METRICS)).split(',') if metric]
+    unknown = set(metrics) - set(METRICS)
+    if unknown or not metrics:
+        return Response({'error': f"metrics must be a comma-separated subset of {', '.join(METRICS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    resolution = params.get('resolution') or None
+    if resolution is not None and resolution not in RESOLUTIONS:
+        return Response({'error': f"resolution must be one of {', '.join(RESOLUTIONS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        end = date.fromisoformat(params['end']) if params.get('end') else timezone.now().date()
+        start = date.fromisoformat(params['start']) if params.get('start') else end - timedelta(days=90)
+        max_points = min(max(int(params.get('max_points', 200)), 2), 1000)
+    except ValueError:
+        return Response({'error': 'start and end must be YYYY-MM-DD and max_points an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    if start > end:
+        return Response({'error': 'start must not be after end'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    series = time_series(metrics, start, end, resolution, max_points)
+    return Response({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'metrics': metrics,
+        **series,
+    }, status=status.HTTP_200_OK)